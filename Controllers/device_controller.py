@@ -1,6 +1,7 @@
 import asyncio
 from fastapi import APIRouter, WebSocket
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from fastapi.responses import JSONResponse
 from dataclasses import dataclass
@@ -11,7 +12,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import models
 import schemas
-from database import get_db_direct
+from database import get_async_db_direct
 from .device_socket_manager import socket_manager
 
 @dataclass
@@ -32,17 +33,77 @@ router = APIRouter(
 
 MAX_DEVICE_NAME_LENGTH = 20
 
+# 미인증 디바이스가 승인을 기다리는 최대 시간 (초)
+AUTH_WAIT_TIMEOUT = 60
+
 #################################################
 # WebSocket 엔드포인트
 #################################################
 
+async def _find_or_request_device(device_data: models.RequestDeviceData):
+    """인증된 디바이스 조회, 미인증이면 인증 요청 등록 (짧은 세션 사용)"""
+    db = get_async_db_direct()
+    try:
+        auth_device = await db.scalar(select(models.AuthDeviceData).where(
+            models.AuthDeviceData.device_uid == device_data.device_uid
+        ))
+        if auth_device:
+            return auth_device
+        
+        # 요청 db에 이미 있는 디바이스인지 확인
+        request_device = await db.scalar(select(models.RequestDeviceData).where(
+            models.RequestDeviceData.device_uid == device_data.device_uid
+        ))
+        if not request_device:
+            db.add(device_data)
+            await db.commit()
+        return None
+    finally:
+        await db.close()
+
+async def _wait_for_auth(websocket: WebSocket, waiter: asyncio.Future, timeout: float):
+    """
+    /auth-device 승인/거절까지 대기 (DB 폴링 없음)
+    반환값: "approved", "rejected", 시간 초과 시 None, 소켓이 끊기면 "disconnected"
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return None
+        # 대기 중 소켓 종료를 감지하기 위해 수신도 함께 대기 (인증 전 메시지는 텍스트/바이너리 모두 무시)
+        # receive_text()는 바이너리 프레임에서 예외를 내므로 원시 메시지로 받아 종료 여부만 확인
+        receive_task = asyncio.create_task(websocket.receive())
+        done, _ = await asyncio.wait({waiter, receive_task}, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+        if receive_task in done:
+            if receive_task.exception() is not None or receive_task.result()["type"] == "websocket.disconnect":
+                return "disconnected"
+            continue
+        receive_task.cancel()
+        if waiter in done:
+            return waiter.result()
+        return None
+
+async def _update_device_status(device_uid: str, is_connected: bool) -> None:
+    db = get_async_db_direct()
+    try:
+        await socket_manager.update_device_status(device_uid, is_connected, db)
+    finally:
+        await db.close()
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket 엔드포인트 - 디바이스 연결 및 인증 처리
+    DB 세션은 필요한 순간에만 짧게 열고 닫습니다.
+    
+    첫 메시지에 이전 연결의 session_token과 마지막으로 받은 msg_seq(last_seq)를 보내면
+    인증/테이블/게임 스냅샷 과정 없이 끊긴 동안 놓친 메시지만 다시 받습니다.
+    첫 메시지에 "protocol": 2를 보낸 디바이스만 게임 변경을 game_patch로 받고, 나머지는 전체 스냅샷을 받습니다.
     """
     device_uid = None
-    db = None
+    connection = None
     connection_accepted = False
     
     try:
@@ -50,8 +111,6 @@ async def websocket_endpoint(websocket: WebSocket):
         await websocket.accept()
         connection_accepted = True
         
-        db = get_db_direct()
-        
         # 디바이스 데이터 수신
         try:
             device_datas_message = await websocket.receive_text()
@@ -63,8 +122,11 @@ async def websocket_endpoint(websocket: WebSocket):
                 device_uid=device_data_json["device_uid"],
             )
             device_uid = device_data.device_uid
+            session_token = device_data_json.get("session_token")
+            last_seq = int(device_data_json.get("last_seq") or 0)
+            protocol = int(device_data_json.get("protocol") or 1)
             
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, TypeError, ValueError):
             await websocket.send_text(
                 json.dumps({
                     "response": 400,
@@ -82,51 +144,47 @@ async def websocket_endpoint(websocket: WebSocket):
             return
         
         # 소켓 매니저에 연결 등록
-        await socket_manager.connect(device_uid, websocket)
-        
-        # 인증된 디바이스 확인
-        auth_device = db.query(models.AuthDeviceData).filter(
-            models.AuthDeviceData.device_uid == device_uid
-        ).first()
-        
-        # 요청 db에 이미 있는 디바이스인지 확인
-        request_device = db.query(models.RequestDeviceData).filter(
-            models.RequestDeviceData.device_uid == device_uid
-        ).first()
-        
-        # 미인증 디바이스 처리
-        if not auth_device:
-            if not request_device:
-                db.add(device_data)
-                db.commit()
-                db.refresh(device_data)
+        await socket_manager.connect(device_uid, websocket, protocol)
+        connection = socket_manager.get_connection(device_uid)
         
-        # 인증 대기
-        auth_wait_count = 0
-        while not auth_device and auth_wait_count < 60:  # 최대 60초 대기
-            auth_device = db.query(models.AuthDeviceData).filter(
-                models.AuthDeviceData.device_uid == device_uid
-            ).first()
-            
-            if auth_device:
-                break
+        # 세션 재개 (실패하면 전체 핸드셰이크)
+        if not (session_token and socket_manager.resume_session(device_uid, session_token, last_seq)):
+            # 승인 알림을 놓치지 않도록 DB 확인 전에 대기 등록
+            auth_waiter = socket_manager.register_auth_waiter(device_uid)
+            try:
+                auth_device = await _find_or_request_device(device_data)
                 
-            await socket_manager.send_message(device_uid, 201, {"event": "Wait Auth Device"})
-            await asyncio.sleep(1)
-            auth_wait_count += 1
+                # 인증 대기 (/auth-device 처리 시 바로 깨어남)
+                if not auth_device:
+                    await socket_manager.send_message(device_uid, 201, {"event": "Wait Auth Device"})
+                    connect_status = await _wait_for_auth(websocket, auth_waiter, AUTH_WAIT_TIMEOUT)
+                    if connect_status == "disconnected":
+                        return
+                    if connect_status == "rejected":
+                        await socket_manager.send_message(device_uid, 403, {"event": "Auth rejected"})
+                        return
+                    if connect_status is None:
+                        await socket_manager.send_message(device_uid, 408, {"event": "Auth timeout"})
+                        return
+                    auth_device = await _find_or_request_device(device_data)
+                    if not auth_device:
+                        await socket_manager.send_message(device_uid, 408, {"event": "Auth timeout"})
+                        return
+            finally:
+                socket_manager.remove_auth_waiter(device_uid, auth_waiter)
             
-        if not auth_device:
-            await socket_manager.send_message(device_uid, 408, {"event": "Auth timeout"})
-            return
-        
-        await socket_manager.send_message(device_uid, 200, {"event": "connected"})
-        
-        # 테이블 연결 처리
-        if auth_device.connect_table_id:
-            await socket_manager.handle_table_connection(device_uid, auth_device.connect_table_id)
-            await socket_manager.handle_game_connection(device_uid, auth_device.connect_table_id)
+            session = socket_manager.open_session(device_uid)
+            await socket_manager.send_message(device_uid, 200, {
+                "event": "connected",
+                "session_token": session.token if session else None
+            })
             
-        await socket_manager.update_device_status(device_uid, True, db)
+            # 테이블 연결 처리
+            if auth_device.connect_table_id:
+                await socket_manager.handle_table_connection(device_uid, auth_device.connect_table_id)
+                await socket_manager.handle_game_connection(device_uid, auth_device.connect_table_id)
+            
+        await _update_device_status(device_uid, True)
         
         # 메시지 수신 대기
         while True:
@@ -137,31 +195,54 @@ async def websocket_endpoint(websocket: WebSocket):
                 print(f"Error receiving message: {e}")
                 break
             
+            # 디바이스가 패치 seq 누락을 감지하면 전체 스냅샷 재요청
+            try:
+                message = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(message, dict) and message.get("event") == "request_snapshot":
+                await socket_manager.send_snapshot(device_uid)
+            
     except Exception as e:
         print(f"WebSocket error: {e}")
     finally:
+        async def cleanup():
+            try:
+                if connection is not None:
+                    # 같은 디바이스가 이미 새 소켓으로 재연결했으면 새 연결은 건드리지 않음
+                    await socket_manager.disconnect(device_uid, connection)
+                    if socket_manager.get_connection(device_uid) is None:
+                        await _update_device_status(device_uid, False)
+                if connection_accepted and not websocket.client_state.DISCONNECTED:
+                    await websocket.close()
+            except Exception as e:
+                print(f"Error in cleanup: {e}")
+        
+        # 연결 종료로 태스크가 취소되어도 커밋/세션 정리가 중간에 끊기지 않도록 보호
         try:
-            if device_uid and db:
-                await socket_manager.update_device_status(device_uid, False, db)
-                await socket_manager.disconnect(device_uid)
-            if db:
-                db.close()
-            if connection_accepted and not websocket.client_state.DISCONNECTED:
-                await websocket.close()
-        except Exception as e:
-            print(f"Error in cleanup: {e}")
+            await asyncio.shield(cleanup())
+        except asyncio.CancelledError:
+            pass
 
 #################################################
 # REST API 엔드포인트
 #################################################
 
+@router.get("/socket-stats")
+async def get_socket_stats():
+    """연결된 디바이스별 송신 대기열 깊이와 전송/버림/병합 횟수"""
+    return JSONResponse(
+        content={"response": 200, "data": socket_manager.get_queue_stats(), "sessions": socket_manager.get_session_stats()},
+        headers={"Content-Type": "application/json; charset=utf-8"}
+    )
+
 @router.get("/get-waiting-device")
 async def get_waiting_device():
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        waiting_device = db.query(models.RequestDeviceData).filter(
+        waiting_device = (await db.scalars(select(models.RequestDeviceData).where(
             models.RequestDeviceData.connect_status == "waiting"
-        ).all()
+        ))).all()
         
         if not waiting_device:
             return JSONResponse(
@@ -181,13 +262,13 @@ async def get_waiting_device():
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.get("/get-auth-device")
 async def get_auth_device():
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        auth_device = db.query(models.AuthDeviceData).all()
+        auth_device = (await db.scalars(select(models.AuthDeviceData))).all()
         auth_device_list = []
         for device in auth_device:
             device_json = device.to_json()
@@ -199,16 +280,16 @@ async def get_auth_device():
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.post("/auth-device")
 async def auth_device(device_data: schemas.RequestDeviceData):
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        request_device = db.query(models.RequestDeviceData).filter(
+        request_device = await db.scalar(select(models.RequestDeviceData).where(
             models.RequestDeviceData.device_uid == device_data.device_uid,
             models.RequestDeviceData.connect_status == "waiting"
-        ).first()
+        ))
         
         if not request_device:
             return JSONResponse(
@@ -223,8 +304,11 @@ async def auth_device(device_data: schemas.RequestDeviceData):
                 is_connected=True
             )
             db.add(auth_device)
-            db.delete(request_device)
-            db.commit()
+            await db.delete(request_device)
+            await db.commit()
+            
+            # 승인을 기다리는 디바이스 소켓 깨우기
+            socket_manager.resolve_auth_waiter(request_device.device_uid, "approved")
             
             return JSONResponse(
                 content={"response": 200, "message": "Device authorized successfully"},
@@ -233,7 +317,9 @@ async def auth_device(device_data: schemas.RequestDeviceData):
             
         elif device_data.connect_status == "rejected":
             request_device.connect_status = "rejected"
-            db.commit()
+            await db.commit()
+            
+            socket_manager.resolve_auth_waiter(request_device.device_uid, "rejected")
             
             return JSONResponse(
                 content={"response": 200, "message": "Device rejected"},
@@ -245,11 +331,11 @@ async def auth_device(device_data: schemas.RequestDeviceData):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.post("/device-name-change")
 async def device_name_change(device_data: DeviceNameChangeData):
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         if len(device_data.device_name) > MAX_DEVICE_NAME_LENGTH:
             return JSONResponse(
@@ -257,9 +343,9 @@ async def device_name_change(device_data: DeviceNameChangeData):
                 headers={"Content-Type": "application/json; charset=utf-8"}
             )
             
-        auth_device = db.query(models.AuthDeviceData).filter(
+        auth_device = await db.scalar(select(models.AuthDeviceData).where(
             models.AuthDeviceData.device_uid == device_data.device_uid
-        ).first()
+        ))
         
         if not auth_device:
             return JSONResponse(
@@ -268,22 +354,22 @@ async def device_name_change(device_data: DeviceNameChangeData):
             )
             
         auth_device.device_name = device_data.device_name
-        db.commit()
+        await db.commit()
         
         return JSONResponse(
             content={"response": 200, "message": "Device name changed successfully"},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.post("/connect-table")
 async def connect_table(device_data: schemas.ConnectTableData):
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        auth_device = db.query(models.AuthDeviceData).filter(
+        auth_device = await db.scalar(select(models.AuthDeviceData).where(
             models.AuthDeviceData.device_uid == device_data.device_uid
-        ).first()
+        ))
         
         if not auth_device:
             return JSONResponse(
@@ -291,9 +377,9 @@ async def connect_table(device_data: schemas.ConnectTableData):
                 headers={"Content-Type": "application/json; charset=utf-8"}
             )
             
-        table = db.query(models.TableData).filter(
+        table = await db.scalar(select(models.TableData).where(
             models.TableData.id == device_data.table_id
-        ).first()
+        ))
         
         if not table:
             return JSONResponse(
@@ -302,7 +388,7 @@ async def connect_table(device_data: schemas.ConnectTableData):
             )
             
         auth_device.connect_table_id = table.id
-        db.commit()
+        await db.commit()
         
         await socket_manager.handle_table_connection(device_data.device_uid, table.id)
         
@@ -311,15 +397,15 @@ async def connect_table(device_data: schemas.ConnectTableData):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.post("/disconnect-table")
 async def disconnect_table(device_data: schemas.DisconnectTableData):
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        auth_device = db.query(models.AuthDeviceData).filter(
+        auth_device = await db.scalar(select(models.AuthDeviceData).where(
             models.AuthDeviceData.device_uid == device_data.device_uid
-        ).first()
+        ))
         
         if not auth_device:
             return JSONResponse(
@@ -328,7 +414,7 @@ async def disconnect_table(device_data: schemas.DisconnectTableData):
             )
             
         auth_device.connect_table_id = None
-        db.commit()
+        await db.commit()
         
         await socket_manager.handle_table_connection(device_data.device_uid)
         
@@ -337,15 +423,15 @@ async def disconnect_table(device_data: schemas.DisconnectTableData):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.delete("/device-delete/{device_uid}")
 async def device_delete(device_uid: str):
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        auth_device = db.query(models.AuthDeviceData).filter(
+        auth_device = await db.scalar(select(models.AuthDeviceData).where(
             models.AuthDeviceData.device_uid == device_uid
-        ).first()
+        ))
         
         if not auth_device:
             return JSONResponse(
@@ -353,9 +439,10 @@ async def device_delete(device_uid: str):
                 headers={"Content-Type": "application/json; charset=utf-8"}
             )
         
-        db.delete(auth_device)
-        db.commit()
+        await db.delete(auth_device)
+        await db.commit()
         
+        socket_manager.drop_session(device_uid)
         await socket_manager.disconnect(device_uid)
         
         return JSONResponse(
@@ -363,4 +450,4 @@ async def device_delete(device_uid: str):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
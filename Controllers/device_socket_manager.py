@@ -1,53 +1,469 @@
 import asyncio
+import secrets
+import time
+from collections import deque
 from fastapi import WebSocket
-from typing import Dict, Optional
-from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
 import json
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import models
-from database import get_db_direct
+from database import get_async_db_direct, get_current_store_id
+from .game_patch import diff_game_json
+
+# 디바이스 한 대에 보내는 최대 대기 시간 (초) - 느린 태블릿이 다른 테이블 전송을 막지 않도록
+SEND_TIMEOUT = 3
+
+# 디바이스별 송신 대기열 최대 길이
+# 넘치면 가장 오래된 일반 메시지부터 버리고, 상태 메시지(병합 키가 있는 메시지)는 버리지 않습니다.
+# 일반 메시지 없이 게임 패치만 쌓여 있으면 패치를 모두 버리고 전체 스냅샷을 다시 보냅니다.
+OUTBOUND_QUEUE_SIZE = 64
+
+# 상태 메시지: 같은 키의 메시지가 아직 대기 중이면 이전 메시지를 빼고 최신 메시지를 맨 뒤에 추가 (이벤트 -> 병합 키)
+STATE_EVENT_KEYS = {
+    "game_connect": "game",
+    "game_disconnect": "game",
+    "connect_table": "table",
+    "disconnect_table": "table",
+    "clock_sync": "clock",
+    "level_changed": "clock",
+}
+
+# 게임 패치: 병합하지 않고 순서대로 쌓되, 게임 스냅샷/해제("game")가 들어오면 앞선 패치는 필요 없으므로 버림
+GAME_PATCH_KEY = "game_patch"
+
+# 세션별로 보관하는 최근 메시지 수 (재연결 시 놓친 메시지만 다시 보냄)
+REPLAY_BUFFER_SIZE = 128
+
+# 연결이 끊긴 뒤 세션을 유지하는 시간 (초) - 이 안에 재연결하면 핸드셰이크 없이 이어서 받음
+SESSION_RESUME_TTL = 120
+
+# game_patch를 받을 수 있는 디바이스 프로토콜 버전 (핸드셰이크의 "protocol" 필드)
+# 이보다 낮은(필드를 보내지 않은) 디바이스는 게임이 바뀔 때마다 전체 스냅샷(game_connect)을 받습니다.
+PATCH_PROTOCOL = 2
+
+# (매장 ID, 테이블/게임 ID) - 매장마다 ID가 겹칠 수 있으므로 매장 ID를 함께 사용
+IndexKey = Tuple[int, int]
+
+@dataclass
+class DeviceSession:
+    """
+    디바이스 세션 - 소켓이 끊겨도 SESSION_RESUME_TTL 동안 유지
+    보내는 메시지마다 msg_seq를 붙여 최근 REPLAY_BUFFER_SIZE개를 보관합니다.
+    """
+    device_uid: str
+    store_id: Optional[int]
+    protocol: int = 1
+    token: str = field(default_factory=lambda: secrets.token_urlsafe(24))
+    seq: int = 0
+    # [msg_seq, 병합 키, 메시지] 목록
+    buffer: Deque[List] = field(default_factory=lambda: deque(maxlen=REPLAY_BUFFER_SIZE))
+    # 연결이 끊긴 동안 보관하는 테이블 정보 (재연결 시 복원)
+    table_id: Optional[int] = None
+    table_title: Optional[str] = None
+    suspended_at: Optional[float] = None
+    expire_handle: Optional[asyncio.TimerHandle] = None
+    
+    def record(self, text: str, coalesce_key: Optional[str] = None) -> str:
+        """메시지에 msg_seq를 붙여 버퍼에 보관하고 붙인 메시지를 반환"""
+        self.seq += 1
+        # encode_message 결과는 항상 '{'로 시작하므로 다시 직렬화하지 않고 앞에 필드 추가
+        text = '{"msg_seq": %d, %s' % (self.seq, text[1:])
+        self.buffer.append([self.seq, coalesce_key, text])
+        return text
+    
+    def missed_since(self, last_seq: int) -> Optional[List[List]]:
+        """last_seq 이후 메시지 목록 (버퍼에서 이미 밀려난 메시지가 있으면 None)"""
+        if last_seq > self.seq or last_seq < 0:
+            return None
+        oldest = self.buffer[0][0] if self.buffer else self.seq + 1
+        if last_seq + 1 < oldest:
+            return None
+        return [entry for entry in self.buffer if entry[0] > last_seq]
 
 @dataclass
 class DeviceSocketConnection:
     device_uid: str
     websocket: WebSocket
     table_title: Optional[str] = None
+    store_id: Optional[int] = None
+    table_id: Optional[int] = None
+    protocol: int = 1
+    # 송신 대기열: [병합 키, 메시지] 목록 (병합 키가 None이면 일반 메시지)
+    outbox: Deque[List] = field(default_factory=deque)
+    outbox_event: asyncio.Event = field(default_factory=asyncio.Event)
+    writer_task: Optional[asyncio.Task] = None
+    session: Optional[DeviceSession] = None
+    sent_count: int = 0
+    dropped_count: int = 0
+    coalesced_count: int = 0
+    resync_count: int = 0
+    max_queue_depth: int = 0
+    # 대기열이 넘쳐 패치를 버렸음 - 송신 태스크가 전체 스냅샷을 다시 보냄
+    resync_pending: bool = False
+    
+    def _remove_queued(self, keys) -> int:
+        """병합 키가 keys에 속한 대기 메시지 제거 (종료 표시 뒤의 메시지는 건드리지 않음)"""
+        kept = [entry for entry in self.outbox if entry[0] not in keys or entry[1] is None]
+        removed = len(self.outbox) - len(kept)
+        if removed:
+            self.outbox.clear()
+            self.outbox.extend(kept)
+        return removed
+    
+    def enqueue(self, text: str, coalesce_key: Optional[str] = None) -> None:
+        if coalesce_key == STATE_EVENT_KEYS["game_connect"]:
+            # 게임 스냅샷/해제는 이전 스냅샷과 아직 보내지 않은 패치를 모두 대체
+            self.coalesced_count += self._remove_queued({coalesce_key, GAME_PATCH_KEY})
+        elif coalesce_key is not None and coalesce_key != GAME_PATCH_KEY:
+            self.coalesced_count += self._remove_queued({coalesce_key})
+        if len(self.outbox) >= OUTBOUND_QUEUE_SIZE:
+            self._make_room()
+        self.outbox.append([coalesce_key, text])
+        self.max_queue_depth = max(self.max_queue_depth, len(self.outbox))
+        self.outbox_event.set()
+    
+    def _make_room(self) -> None:
+        """넘친 대기열 정리: 가장 오래된 일반 메시지를 버리고, 없으면 패치를 모두 버린 뒤 스냅샷 재전송 예약"""
+        for index, entry in enumerate(self.outbox):
+            if entry[0] is None and entry[1] is not None:
+                del self.outbox[index]
+                self.dropped_count += 1
+                return
+        dropped = self._remove_queued({GAME_PATCH_KEY})
+        if dropped:
+            self.dropped_count += dropped
+            self.resync_count += 1
+            self.resync_pending = True
+    
+    def get_stats(self) -> dict:
+        return {
+            "device_uid": self.device_uid,
+            "store_id": self.store_id,
+            "table_id": self.table_id,
+            "queue_depth": len(self.outbox),
+            "max_queue_depth": self.max_queue_depth,
+            "sent": self.sent_count,
+            "dropped": self.dropped_count,
+            "coalesced": self.coalesced_count,
+            "resyncs": self.resync_count,
+            "msg_seq": self.session.seq if self.session else None,
+        }
     
 class DeviceSocketManager:
     def __init__(self):
         self._connections: Dict[str, DeviceSocketConnection] = {}
         self._lock = asyncio.Lock()
+        # 팬아웃 인덱스: 게임 -> 테이블 -> 연결된 디바이스
+        self._table_devices: Dict[IndexKey, Set[str]] = {}
+        self._table_games: Dict[IndexKey, int] = {}
+        self._game_tables: Dict[IndexKey, Set[int]] = {}
+        # 게임별 마지막으로 보낸 상태: (seq, GameData.to_json()) - 패치 계산 기준
+        self._game_states: Dict[IndexKey, Tuple[int, dict]] = {}
+        # 인증 대기 중인 디바이스: (매장 ID, device_uid) -> 승인/거절 결과를 받을 Future
+        self._auth_waiters: Dict[Tuple[int, str], asyncio.Future] = {}
+        # 디바이스 세션 (연결이 끊긴 세션도 만료 전까지 보관)
+        self._sessions: Dict[str, DeviceSession] = {}
+        self.resumed_count = 0
+        self.resume_failed_count = 0
         
-    async def connect(self, device_uid: str, websocket: WebSocket) -> None:
+    async def connect(self, device_uid: str, websocket: WebSocket, protocol: int = 1) -> None:
         async with self._lock:
-            self._connections[device_uid] = DeviceSocketConnection(
+            previous = self._connections.get(device_uid)
+            if previous is not None:
+                # 이전 소켓이 아직 안 끊긴 것으로 보여도 세션은 재연결용으로 보관
+                self._release_connection(previous)
+            connection = DeviceSocketConnection(
                 device_uid=device_uid,
-                websocket=websocket
+                websocket=websocket,
+                store_id=get_current_store_id(),
+                protocol=protocol
             )
+            connection.writer_task = asyncio.create_task(self._writer(connection))
+            self._connections[device_uid] = connection
+        if previous is not None:
+            # 같은 디바이스의 이전 소켓은 새 연결에 영향 없이 정리
+            await self._close_connection(previous, flush=False)
     
-    async def disconnect(self, device_uid: str) -> None:
+    async def disconnect(self, device_uid: str, connection: Optional[DeviceSocketConnection] = None) -> None:
+        """
+        디바이스 연결 종료 (남은 메시지는 SEND_TIMEOUT 안에서 전송 시도)
+        connection을 지정하면 해당 소켓이 현재 연결일 때만 등록을 해제합니다.
+        """
         async with self._lock:
-            if device_uid in self._connections:
-                connection = self._connections[device_uid]
+            current = self._connections.get(device_uid)
+            if connection is None:
+                connection = current
+            if connection is None:
+                return
+            if connection is current:
+                self._release_connection(connection)
+        await self._close_connection(connection)
+    
+    def _release_connection(self, connection: DeviceSocketConnection) -> None:
+        """
+        연결 등록 해제. 세션이 있으면 테이블 인덱스를 유지한 채 세션을 일시 정지해
+        끊긴 동안 보낸 메시지도 버퍼에 쌓이게 합니다.
+        """
+        session = connection.session
+        if session is None or session.suspended_at is not None:
+            self._unbind_device_table(connection.device_uid)
+        else:
+            session.table_id = connection.table_id
+            session.table_title = connection.table_title
+            session.suspended_at = time.monotonic()
+            session.expire_handle = asyncio.get_running_loop().call_later(
+                SESSION_RESUME_TTL, self._expire_session, connection.device_uid, session
+            )
+        if self._connections.get(connection.device_uid) is connection:
+            del self._connections[connection.device_uid]
+    
+    # ---- 세션 재개 ----
+    
+    def open_session(self, device_uid: str) -> Optional[DeviceSession]:
+        """인증을 마친 연결에 새 세션 발급 (이전 세션은 폐기)"""
+        connection = self._connections.get(device_uid)
+        if connection is None:
+            return None
+        self.drop_session(device_uid)
+        connection.session = self._sessions[device_uid] = DeviceSession(
+            device_uid=device_uid,
+            store_id=connection.store_id,
+            protocol=connection.protocol
+        )
+        return connection.session
+    
+    def resume_session(self, device_uid: str, token: Optional[str], last_seq: int) -> bool:
+        """
+        세션 토큰이 맞고 놓친 메시지가 모두 버퍼에 남아 있으면 세션을 현재 연결에 이어 붙이고
+        놓친 메시지만 다시 보냅니다. 실패하면 False (전체 핸드셰이크 필요)
+        """
+        connection = self._connections.get(device_uid)
+        session = self._sessions.get(device_uid)
+        missed = None
+        if (
+            connection is not None and session is not None
+            and session.store_id == connection.store_id
+            and session.protocol == connection.protocol
+            and isinstance(token, str) and secrets.compare_digest(session.token, token)
+        ):
+            missed = session.missed_since(last_seq)
+        if missed is None:
+            self.resume_failed_count += 1
+            return False
+        
+        if session.expire_handle is not None:
+            session.expire_handle.cancel()
+            session.expire_handle = None
+        session.suspended_at = None
+        connection.session = session
+        connection.table_title = session.table_title
+        if session.table_id is not None:
+            # 끊긴 동안에도 테이블 인덱스에 남아 있었으므로 연결에만 다시 기록
+            connection.table_id = session.table_id
+        
+        connection.enqueue(self.encode_message(200, {
+            "event": "resumed",
+            "msg_seq": session.seq,
+            "replayed": len(missed)
+        }))
+        for _, coalesce_key, text in missed:
+            connection.enqueue(text, coalesce_key)
+        self.resumed_count += 1
+        return True
+    
+    def drop_session(self, device_uid: str) -> None:
+        """세션 폐기 (디바이스 삭제, 끊긴 동안 테이블 변경 등 - 다음 연결은 전체 핸드셰이크)"""
+        session = self._sessions.pop(device_uid, None)
+        if session is None:
+            return
+        if session.expire_handle is not None:
+            session.expire_handle.cancel()
+        connection = self._connections.get(device_uid)
+        if connection is not None and connection.session is session:
+            connection.session = None
+        elif session.suspended_at is not None and session.table_id is not None:
+            self._discard_table_device(session.store_id, session.table_id, device_uid)
+    
+    def _expire_session(self, device_uid: str, session: DeviceSession) -> None:
+        if self._sessions.get(device_uid) is session and session.suspended_at is not None:
+            self.drop_session(device_uid)
+    
+    def get_session_stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "suspended": sum(1 for session in self._sessions.values() if session.suspended_at is not None),
+            "resumed": self.resumed_count,
+            "resume_failed": self.resume_failed_count,
+        }
+    
+    async def _close_connection(self, connection: DeviceSocketConnection, flush: bool = True) -> None:
+        writer_task = connection.writer_task
+        if writer_task is not None and writer_task is not asyncio.current_task():
+            if flush and connection.outbox:
+                # 종료 직전 메시지(Auth timeout 등)가 전달되도록 잠시 대기
+                connection.outbox.append([None, None])
+                connection.outbox_event.set()
                 try:
-                    await connection.websocket.close()
-                except:
+                    await asyncio.wait_for(asyncio.shield(writer_task), SEND_TIMEOUT)
+                except BaseException:
                     pass
-                del self._connections[device_uid]
-                
-    async def send_message(self, device_uid: str, response_code: int, data: any) -> None:
-        if device_uid in self._connections:
-            connection = self._connections[device_uid]
+            writer_task.cancel()
+        try:
+            await asyncio.wait_for(connection.websocket.close(), SEND_TIMEOUT)
+        except:
+            pass
+    
+    async def _writer(self, connection: DeviceSocketConnection) -> None:
+        """디바이스별 송신 태스크: 대기열의 메시지를 순서대로 전송"""
+        while True:
+            if connection.resync_pending:
+                # 넘쳐서 버린 패치 대신 현재 게임 스냅샷 (대기 중인 스냅샷/패치는 enqueue에서 대체됨)
+                connection.resync_pending = False
+                await self.send_snapshot(connection.device_uid)
+                continue
+            if not connection.outbox:
+                connection.outbox_event.clear()
+                await connection.outbox_event.wait()
+                continue
+            _, text = connection.outbox.popleft()
+            if text is None:
+                # 종료 표시
+                return
             try:
-                await connection.websocket.send_text(
-                    json.dumps({
-                        "response": response_code,
-                        "data": data
-                    })
-                )
+                await asyncio.wait_for(connection.websocket.send_text(text), SEND_TIMEOUT)
+                connection.sent_count += 1
             except Exception as e:
-                print(f"Error sending message to device {device_uid}: {e}")
-                await self.disconnect(device_uid)
+                print(f"Error sending message to device {connection.device_uid}: {e!r}")
+                await self.disconnect(connection.device_uid, connection)
+                return
+    
+    # ---- 디바이스 인증 대기 ----
+    
+    def register_auth_waiter(self, device_uid: str) -> asyncio.Future:
+        """인증 대기 등록 (/auth-device 처리 시 resolve_auth_waiter로 깨움)"""
+        key = (get_current_store_id(), device_uid)
+        previous = self._auth_waiters.get(key)
+        if previous is not None and not previous.done():
+            previous.cancel()
+        waiter = asyncio.get_running_loop().create_future()
+        self._auth_waiters[key] = waiter
+        return waiter
+    
+    def resolve_auth_waiter(self, device_uid: str, connect_status: str) -> bool:
+        """대기 중인 디바이스 소켓에 승인/거절 결과 전달 (대기 중인 소켓이 없으면 False)"""
+        waiter = self._auth_waiters.get((get_current_store_id(), device_uid))
+        if waiter is None or waiter.done():
+            return False
+        waiter.set_result(connect_status)
+        return True
+    
+    def remove_auth_waiter(self, device_uid: str, waiter: asyncio.Future) -> None:
+        key = (get_current_store_id(), device_uid)
+        if self._auth_waiters.get(key) is waiter:
+            del self._auth_waiters[key]
+        if not waiter.done():
+            waiter.cancel()
+    
+    def get_queue_stats(self) -> List[dict]:
+        """디바이스별 송신 대기열 깊이와 전송/버림/병합 횟수"""
+        return [connection.get_stats() for connection in list(self._connections.values())]
+    
+    # ---- 팬아웃 인덱스 관리 ----
+    
+    def _bind_device_table(self, device_uid: str, table_id: int) -> None:
+        """연결된 디바이스를 테이블 인덱스에 등록"""
+        connection = self._connections.get(device_uid)
+        if not connection:
+            return
+        self._unbind_device_table(device_uid)
+        connection.table_id = int(table_id)
+        self._table_devices.setdefault((connection.store_id, connection.table_id), set()).add(device_uid)
+    
+    def _unbind_device_table(self, device_uid: str) -> None:
+        connection = self._connections.get(device_uid)
+        if not connection or connection.table_id is None:
+            return
+        self._discard_table_device(connection.store_id, connection.table_id, device_uid)
+        connection.table_id = None
+    
+    def _discard_table_device(self, store_id: Optional[int], table_id: int, device_uid: str) -> None:
+        key = (store_id, table_id)
+        devices = self._table_devices.get(key)
+        if devices is not None:
+            devices.discard(device_uid)
+            if not devices:
+                del self._table_devices[key]
+    
+    def set_table_game(self, table_id, game_id: Optional[int], store_id: Optional[int] = None) -> None:
+        """테이블-게임 연결 변경을 인덱스에 반영 (game_id가 None이면 연결 해제)"""
+        store_id = get_current_store_id() if store_id is None else store_id
+        table_key = (store_id, int(table_id))
+        previous_game_id = self._table_games.pop(table_key, None)
+        if previous_game_id is not None:
+            tables = self._game_tables.get((store_id, previous_game_id))
+            if tables is not None:
+                tables.discard(table_key[1])
+                if not tables:
+                    del self._game_tables[(store_id, previous_game_id)]
+                    self._game_states.pop((store_id, previous_game_id), None)
+        if game_id:
+            self._table_games[table_key] = int(game_id)
+            self._game_tables.setdefault((store_id, int(game_id)), set()).add(table_key[1])
+    
+    def remove_table(self, table_id, store_id: Optional[int] = None) -> None:
+        """삭제된 테이블을 인덱스에서 제거 (연결된 디바이스의 테이블 연결도 해제)"""
+        store_id = get_current_store_id() if store_id is None else store_id
+        self.set_table_game(table_id, None, store_id)
+        for device_uid in self._table_devices.pop((store_id, int(table_id)), set()):
+            connection = self._connections.get(device_uid)
+            if connection:
+                connection.table_id = None
+            else:
+                # 끊긴 세션의 테이블이 사라졌으므로 재연결 시 전체 핸드셰이크
+                self.drop_session(device_uid)
+    
+    def get_table_devices(self, table_id, store_id: Optional[int] = None) -> Set[str]:
+        """테이블에 연결된(소켓이 열려 있는) 디바이스 UID 목록"""
+        store_id = get_current_store_id() if store_id is None else store_id
+        return set(self._table_devices.get((store_id, int(table_id)), ()))
+    
+    def get_game_tables(self, game_id, store_id: Optional[int] = None) -> Set[int]:
+        """게임에 연결된 테이블 ID 목록"""
+        store_id = get_current_store_id() if store_id is None else store_id
+        return set(self._game_tables.get((store_id, int(game_id)), ()))
+                
+    @staticmethod
+    def encode_message(response_code: int, data: any) -> str:
+        return json.dumps({
+            "response": response_code,
+            "data": data
+        })
+    
+    def send_text(self, device_uid: str, text: str, coalesce_key: Optional[str] = None) -> bool:
+        """
+        인코딩된 메시지를 디바이스 송신 대기열에 추가 (실제 전송은 디바이스별 송신 태스크가 수행)
+        coalesce_key가 같은 메시지가 아직 대기 중이면 이전 메시지를 빼고 최신 메시지를 맨 뒤에 추가합니다.
+        """
+        connection = self._connections.get(device_uid)
+        session = connection.session if connection else self._sessions.get(device_uid)
+        if session is not None:
+            # 연결이 끊긴 세션은 버퍼에만 보관 (재연결 시 전송)
+            text = session.record(text, coalesce_key)
+        if not connection:
+            return session is not None
+        connection.enqueue(text, coalesce_key)
+        return True
+    
+    def send_text_to_devices(self, device_uids, text: str, coalesce_key: Optional[str] = None) -> int:
+        """같은 메시지를 여러 디바이스 대기열에 추가하고 대상 수를 반환"""
+        return sum(self.send_text(device_uid, text, coalesce_key) for device_uid in device_uids)
+    
+    async def send_message(self, device_uid: str, response_code: int, data: any) -> None:
+        if device_uid in self._connections or device_uid in self._sessions:
+            coalesce_key = STATE_EVENT_KEYS.get(data.get("event")) if isinstance(data, dict) else None
+            self.send_text(device_uid, self.encode_message(response_code, data), coalesce_key)
                 
     def get_connection(self, device_uid: str) -> Optional[DeviceSocketConnection]:
         return self._connections.get(device_uid)
@@ -61,38 +477,43 @@ class DeviceSocketManager:
             self._connections[device_uid].table_title = None
             
     async def broadcast_to_devices(self, response_code: int, data: any) -> None:
-        async with self._lock:
-            for device_uid in list(self._connections.keys()):
-                await self.send_message(device_uid, response_code, data)
+        self.send_text_to_devices(list(self._connections.keys()), self.encode_message(response_code, data))
                 
-    async def update_device_status(self, device_uid: str, is_connected: bool, db: Session) -> None:
+    async def update_device_status(self, device_uid: str, is_connected: bool, db: AsyncSession) -> None:
         try:
-            auth_device = db.query(models.AuthDeviceData).filter(
+            auth_device = await db.scalar(select(models.AuthDeviceData).where(
                 models.AuthDeviceData.device_uid == device_uid
-            ).first()
+            ))
             if auth_device:
                 auth_device.is_connected = is_connected
-                db.commit()
+                await db.commit()
         except Exception as e:
             print(f"Error updating device status: {e}")
             
     async def handle_table_connection(self, device_uid: str, table_id: Optional[str] = None) -> None:
-        db = get_db_direct()
+        if device_uid not in self._connections:
+            # 끊긴 동안 테이블이 바뀌면 보관된 테이블 정보가 맞지 않으므로 세션 폐기
+            self.drop_session(device_uid)
+            return
+        
+        db = get_async_db_direct()
         try:
-            auth_device = db.query(models.AuthDeviceData).filter(
+            auth_device = await db.scalar(select(models.AuthDeviceData).where(
                 models.AuthDeviceData.device_uid == device_uid
-            ).first()
+            ))
             
             if not auth_device:
                 return
                 
             if table_id:
-                table = db.query(models.TableData).filter(
+                table = await db.scalar(select(models.TableData).where(
                     models.TableData.id == table_id
-                ).first()
+                ))
                 
                 if table:
                     self.set_table_title(device_uid, table.title)
+                    self._bind_device_table(device_uid, table.id)
+                    self.set_table_game(table.id, table.game_id)
                     await self.send_message(
                         device_uid,
                         200,
@@ -103,6 +524,7 @@ class DeviceSocketManager:
                     )
             else:
                 self.remove_table_title(device_uid)
+                self._unbind_device_table(device_uid)
                 await self.send_message(
                     device_uid,
                     200,
@@ -111,7 +533,7 @@ class DeviceSocketManager:
                     }
                 )
         finally:
-            db.close()
+            await db.close()
             
     async def handle_game_connection(self, device_uid: str, table_id: str = None) -> None:
         """
@@ -122,7 +544,7 @@ class DeviceSocketManager:
             print(f"Device {device_uid} not found in connections")
             return
             
-        db = get_db_direct()
+        db = get_async_db_direct()
         try:
             if not table_id:
                 await self.send_message(
@@ -134,15 +556,16 @@ class DeviceSocketManager:
                 )
                 return
                 
-            table_data = db.query(models.TableData).filter(
+            table_data = await db.scalar(select(models.TableData).where(
                 models.TableData.id == table_id
-            ).first()
+            ))
             
             if not table_data:
                 print(f"Table {table_id} not found")
                 return
                 
             game_id = table_data.game_id
+            self.set_table_game(table_data.id, game_id)
             
             if not game_id:
                 await self.send_message(
@@ -154,20 +577,22 @@ class DeviceSocketManager:
                 )
                 return
                 
-            game_data = db.query(models.GameData).filter(
+            game_data = await db.scalar(select(models.GameData).where(
                 models.GameData.id == game_id
-            ).first()
+            ))
             
             if game_data:
                 print(f"Sending game connection event to device {device_uid} for game {game_id}")
                 await self.send_message(
                     device_uid,
                     200,
-                    {
-                        "event": "game_connect",
-                        "game_data": game_data.to_json()
-                    }
+                    self._game_snapshot_event(game_data.to_json(), exclude={device_uid})
                 )
+                # 현재 레벨/남은 시간 (이후 레벨 전환은 level_changed로 전송)
+                from .tournament_clock import tournament_clock
+                clock = tournament_clock.track_game(game_data, get_current_store_id(), sync=False)
+                if clock is not None:
+                    await self.send_message(device_uid, 200, {"event": "clock_sync", **clock})
             else:
                 print(f"Game {game_id} not found")
                 await self.send_message(
@@ -188,26 +613,134 @@ class DeviceSocketManager:
                 }
             )
         finally:
-            db.close()
+            await db.close()
             
     async def notify_table_game_change(self, table_id: str) -> None:
         """
         테이블에 연결된 모든 디바이스에 게임 상태 변경을 알립니다.
         """
-        db = get_db_direct()
+        await self.notify_table(table_id)
+
+    # ---- 게임 상태 스냅샷/패치 ----
+    
+    def game_device_uids(self, game_id) -> Set[str]:
+        device_uids = set()
+        for table_id in self.get_game_tables(game_id):
+            device_uids |= self.get_table_devices(table_id)
+        return device_uids
+    
+    def _accepts_patch(self, device_uid: str) -> bool:
+        """디바이스가 game_patch를 받을 수 있는지 (끊긴 세션은 세션의 프로토콜 기준)"""
+        connection = self._connections.get(device_uid)
+        client = connection if connection is not None else self._sessions.get(device_uid)
+        return client is not None and client.protocol >= PATCH_PROTOCOL
+    
+    def _publish_game_state(self, game_json: dict, exclude: Set[str] = frozenset()) -> Optional[int]:
+        """
+        게임 상태를 기록하고 이전 상태와 달라졌으면 게임의 디바이스(exclude 제외)에 전송합니다.
+        PATCH_PROTOCOL 디바이스에는 패치를, 그 외 디바이스에는 전체 스냅샷을 보냅니다.
+        반환값: 현재 seq (처음 기록한 상태면 None - 아직 아무도 스냅샷을 받지 않음)
+        """
+        key = (get_current_store_id(), int(game_json["id"]))
+        state = self._game_states.get(key)
+        if state is None:
+            self._game_states[key] = (1, game_json)
+            return None
+        seq, previous = state
+        ops = diff_game_json(previous, game_json)
+        if not ops:
+            return seq
+        seq += 1
+        self._game_states[key] = (seq, game_json)
+        device_uids = self.game_device_uids(game_json["id"]) - set(exclude)
+        patch_uids = {device_uid for device_uid in device_uids if self._accepts_patch(device_uid)}
+        if patch_uids:
+            self.send_text_to_devices(patch_uids, self.encode_message(200, {
+                "event": "game_patch",
+                "game_id": game_json["id"],
+                "seq": seq,
+                "ops": ops
+            }), GAME_PATCH_KEY)
+        if device_uids - patch_uids:
+            self.send_text_to_devices(device_uids - patch_uids, self.encode_message(200, {
+                "event": "game_connect",
+                "game_data": game_json,
+                "seq": seq
+            }), STATE_EVENT_KEYS["game_connect"])
+        return seq
+    
+    def _game_snapshot_event(self, game_json: dict, exclude: Set[str] = frozenset()) -> dict:
+        """전체 스냅샷 이벤트 (이후 패치는 이 seq 다음부터 적용)"""
+        seq = self._publish_game_state(game_json, exclude)
+        return {
+            "event": "game_connect",
+            "game_data": game_json,
+            "seq": seq or 1
+        }
+    
+    async def _load_game_json(self, db: AsyncSession, game_id: Optional[int]) -> Optional[dict]:
+        game_data = await db.scalar(select(models.GameData).where(
+            models.GameData.id == game_id
+        )) if game_id else None
+        return game_data.to_json() if game_data else None
+    
+    async def notify_table(self, table_id) -> None:
+        """테이블의 게임 연결이 바뀌었을 때 테이블에 연결된 디바이스에 전체 스냅샷을 전송합니다."""
+        device_uids = self.get_table_devices(table_id)
+        if not device_uids:
+            return
+        db = get_async_db_direct()
         try:
-            # 테이블에 연결된 모든 디바이스 찾기
-            devices = db.query(models.AuthDeviceData).filter(
-                models.AuthDeviceData.connect_table_id == table_id
-            ).all()
-            
-            for device in devices:
-                if device.device_uid in self._connections:
-                    await self.handle_game_connection(device.device_uid, table_id)
+            table_data = await db.scalar(select(models.TableData).where(
+                models.TableData.id == table_id
+            ))
+            if not table_data:
+                print(f"Table {table_id} not found")
+                return
+            self.set_table_game(table_data.id, table_data.game_id)
+            game_json = await self._load_game_json(db, table_data.game_id)
         except Exception as e:
-            print(f"Error in notify_table_game_change: {e}")
+            print(f"Error in notify_table: {e}")
+            return
         finally:
-            db.close()
+            await db.close()
+        if game_json is None:
+            event = {"event": "game_disconnect"}
+        else:
+            event = self._game_snapshot_event(game_json, exclude=device_uids)
+        self.send_text_to_devices(device_uids, self.encode_message(200, event), STATE_EVENT_KEYS["game_connect"])
+    
+    async def notify_game(self, game_id, game_json: Optional[dict] = None) -> None:
+        """
+        게임에 연결된 테이블의 디바이스에 게임 상태 변경을 전송합니다.
+        이미 스냅샷을 받은 디바이스에는 바뀐 부분만 game_patch로 보냅니다.
+        game_json을 넘기면 DB를 다시 조회하지 않습니다.
+        """
+        device_uids = self.game_device_uids(game_id)
+        if not device_uids:
+            return
+        if game_json is None:
+            db = get_async_db_direct()
+            try:
+                game_json = await self._load_game_json(db, game_id)
+            except Exception as e:
+                print(f"Error in notify_game: {e}")
+                return
+            finally:
+                await db.close()
+        if game_json is None:
+            self._game_states.pop((get_current_store_id(), int(game_id)), None)
+            self.send_text_to_devices(device_uids, self.encode_message(200, {"event": "game_disconnect"}), STATE_EVENT_KEYS["game_disconnect"])
+            return
+        if self._publish_game_state(game_json) is None:
+            # 기준 상태가 없으면 (서버 재시작 직후 등) 전체 스냅샷 전송
+            self.send_text_to_devices(device_uids, self.encode_message(200, self._game_snapshot_event(game_json)), STATE_EVENT_KEYS["game_connect"])
+    
+    async def send_snapshot(self, device_uid: str) -> None:
+        """디바이스 요청(seq 누락 감지 등) 시 현재 테이블의 게임 스냅샷 재전송"""
+        connection = self._connections.get(device_uid)
+        if connection:
+            await self.handle_game_connection(device_uid, connection.table_id)
 
 # 전역 소켓 매니저 인스턴스
 socket_manager = DeviceSocketManager() 
\ No newline at end of file
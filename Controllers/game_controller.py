@@ -2,7 +2,8 @@ import asyncio
 from datetime import datetime, timedelta
 import random
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, logger
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
@@ -19,9 +20,11 @@ import models
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from Controllers import device_controller, device_socket_manager, table_controller, operator_controller
+from Controllers.game_update_scheduler import game_update_scheduler
+from Controllers.tournament_clock import tournament_clock
 import models
 import schemas
-from database import get_db, get_db_direct
+from database import get_async_db, get_async_db_direct, get_current_store_id
 
 router = APIRouter(
     prefix="/games",
@@ -32,10 +35,10 @@ router = APIRouter(
 async def get_first_last_game_start_date():
     """첫 번째와 마지막 게임의 시작 날짜를 조회합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        first_game = db.query(models.GameData).order_by(models.GameData.game_start_time).first()
-        last_game = db.query(models.GameData).order_by(models.GameData.game_start_time.desc()).first()
+        first_game = await db.scalar(select(models.GameData).order_by(models.GameData.game_start_time).limit(1))
+        last_game = await db.scalar(select(models.GameData).order_by(models.GameData.game_start_time.desc()).limit(1))
         
         if not first_game or not last_game:
             return JSONResponse(
@@ -59,7 +62,7 @@ async def get_first_last_game_start_date():
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.get("/get-activate-games")
 async def get_activate_games():
@@ -67,11 +70,11 @@ async def get_activate_games():
     활성화된 게임 목록을 조회합니다.
     """
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        games = db.query(models.GameData).filter(
+        games = (await db.scalars(select(models.GameData).where(
             models.GameData.game_status.in_(["waiting", "in-progress"])
-        ).all()
+        ))).all()
         
         if not games:
             return JSONResponse(
@@ -93,17 +96,17 @@ async def get_activate_games():
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.get("/get-active-game-no-sse-data")
 async def get_active_game_no_sse_data():
     """활성화된 게임 목록을 조회합니다 (SSE 없이)."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        games = db.query(models.GameData).filter(
+        games = (await db.scalars(select(models.GameData).where(
             models.GameData.game_status.in_(["waiting", "in-progress"])
-        ).all()
+        ))).all()
         
         if not games:
             return JSONResponse(
@@ -125,23 +128,23 @@ async def get_active_game_no_sse_data():
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.post("/create-game")
 async def create_game(preset_id: dict):
     """게임을 생성합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     preset_id = preset_id.get("preset_id");
     try:
         # 게임 코드 생성 (5자리 숫자)
         while True:
             game_code = str(random.randint(10000, 99999))
-            existing_game = db.query(models.GameData).filter(models.GameData.game_code == game_code).first()
+            existing_game = await db.scalar(select(models.GameData).where(models.GameData.game_code == game_code))
             if not existing_game:
                 break
         
-        preset :models.PresetData = db.query(models.PresetData).filter(models.PresetData.id == preset_id).first()
+        preset :models.PresetData = await db.scalar(select(models.PresetData).where(models.PresetData.id == preset_id))
         
         if not preset:
             return JSONResponse(
@@ -154,7 +157,7 @@ async def create_game(preset_id: dict):
         open_date = operator_data.timestamp;
         print("open_date : ", open_date)
         
-        duflicate_games : List[models.GameData] = db.query(models.GameData).filter(models.GameData.game_start_time >= open_date).filter(models.GameData.title.like(f"%{preset.preset_name}%")).all()
+        duflicate_games : List[models.GameData] = (await db.scalars(select(models.GameData).where(models.GameData.game_start_time >= open_date).where(models.GameData.title.like(f"%{preset.preset_name}%")))).all()
         gameName = f"{preset.preset_name} {len(duflicate_games)+1}부";
         
         # 새 게임 생성
@@ -182,8 +185,8 @@ async def create_game(preset_id: dict):
         )
         
         db.add(new_game)
-        db.commit()
-        db.refresh(new_game)
+        await db.commit()
+        await db.refresh(new_game)
         
         import main
         await main.socket_controller.create_game_data(new_game)
@@ -193,19 +196,19 @@ async def create_game(preset_id: dict):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
     
 @router.get("/get-period-lookup")
 async def get_period_lookup(firstdate: str = None, lastdate: str = None):
     """특정 기간 내의 게임 데이터를 조회합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         if not firstdate or not lastdate:
             # 기본값으로 최근 한 달의 게임 데이터를 조회
@@ -218,11 +221,11 @@ async def get_period_lookup(firstdate: str = None, lastdate: str = None):
             lastdate_parsed = datetime.fromisoformat(lastdate.replace('Z', '+00:00'))
             
         # 날짜 범위 내의 게임 데이터 조회
-        games = db.query(models.GameData).filter(
+        games = (await db.scalars(select(models.GameData).where(
             models.GameData.game_start_time >= firstdate_parsed
-        ).filter(
+        ).where(
             models.GameData.game_start_time <= lastdate_parsed
-        ).all()
+        ))).all()
         
         if not games:
             return JSONResponse(
@@ -246,13 +249,13 @@ async def get_period_lookup(firstdate: str = None, lastdate: str = None):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.post("/control-game-state")
 async def control_game_state(game_data: dict):
     """게임 상태를 제어합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         game_id = game_data.get("game_id")
         game_status = game_data.get("game_status")
@@ -264,7 +267,7 @@ async def control_game_state(game_data: dict):
             )
             
         # 게임 조회
-        game : models.GameData = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+        game : models.GameData = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
         if not game:
             return JSONResponse(
                 content={"response": 404, "message": "게임을 찾을 수 없습니다"},
@@ -285,49 +288,34 @@ async def control_game_state(game_data: dict):
         else:
             game.game_status = game_status
             
-        db.commit()
-        db.refresh(game)
+        await db.commit()
+        await db.refresh(game)
         
-        import main
-        await main.socket_controller.update_game_data(game)
-        
-        # 관련 디바이스에게 변경 알림
-        table_datas : List[models.TableData] = db.query(models.TableData).filter(models.TableData.game_id == game.id).all()
-        for table_data in table_datas:
-            table_connect_devices = db.query(models.AuthDeviceData).filter(models.AuthDeviceData.connect_table_id == table_data.id).all()
-            devices_sockets : dict[str, device_socket_manager.DeviceSocketConnection] = device_socket_manager.socket_manager._connections
-            for table_connect_device in table_connect_devices:
-                for device_socket in devices_sockets.values():
-                    if device_socket.device_uid == table_connect_device.device_uid:
-                        print(f"device_socket.device_uid : {device_socket.device_uid}")
-                        await device_socket_manager.socket_manager.handle_game_connection(device_socket.device_uid, table_data.id)
-        
-        # 중앙 서버에 보내기
-        import main
-        await main.socket_controller.update_game_data(game)
+        # 중앙 서버와 관련 디바이스에 변경 알림 (게임 종료는 병합 대기 없이 즉시 전송)
+        await game_update_scheduler.schedule(game.id, immediate=game.game_status == "end")
         
         return JSONResponse(
             content={"response": 200, "message": "게임 상태가 업데이트되었습니다", "data": game.to_json()},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.put("/control-game-time/{game_id}")
 async def control_game_time(game_id: str, time_dict: dict):
     """게임 시간을 제어합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     time = time_dict.get("game_time")
     try:
         # 게임 조회
-        game = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+        game = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
         if not game:
             return JSONResponse(
                 content={"response": 404, "message": "게임을 찾을 수 없습니다"},
@@ -358,45 +346,55 @@ async def control_game_time(game_id: str, time_dict: dict):
         #     print(f"정지 시간 변경 후: game_stop_time={game.game_stop_time}")
             
         # 변경사항 저장
-        db.commit()
-        db.refresh(game)
+        await db.commit()
+        await db.refresh(game)
         
-        # 소켓을 통해 변경사항 전송 (두 번 호출하여 확실히 전송)
-        import main
-        await main.socket_controller.update_game_data(game)
-        
-        # 관련 디바이스에게 변경 알림
-        table_datas: List[models.TableData] = db.query(models.TableData).filter(models.TableData.game_id == game.id).all()
-        for table_data in table_datas:
-            table_connect_devices: List[models.AuthDeviceData] = db.query(models.AuthDeviceData).filter(models.AuthDeviceData.connect_table_id == table_data.id).all()
-            devices_sockets : dict[str, device_socket_manager.DeviceSocketConnection] = device_socket_manager.socket_manager._connections
-            for table_connect_device in table_connect_devices:
-                for device_socket in devices_sockets.values():
-                    if device_socket.device_uid == table_connect_device.device_uid:
-                        print(f"시간 변경 알림 전송: device_uid={device_socket.device_uid}")
-                        await device_socket_manager.socket_manager.handle_game_connection(device_socket.device_uid, table_data.id)
+        # 중앙 서버와 관련 디바이스에 변경 알림 (짧은 시간 안의 변경은 한 번으로 병합)
+        await game_update_scheduler.schedule(game.id)
         
         return JSONResponse(
             content={"response": 200, "message": "게임 시간이 업데이트되었습니다", "data": game.to_json()},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"게임 시간 업데이트 중 오류 발생: {str(e)}")
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
+@router.get("/get-game-clock/{game_id}")
+async def get_game_clock(game_id: int):
+    """게임의 현재 레벨과 남은 시간 (서버 시계 기준)"""
+    store_id = get_current_store_id()
+    clock = tournament_clock.get_clock(game_id, store_id)
+    if clock is None:
+        db = get_async_db_direct()
+        try:
+            game = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
+            if not game:
+                return JSONResponse(
+                    content={"response": 404, "message": "게임을 찾을 수 없습니다"},
+                    headers={"Content-Type": "application/json; charset=utf-8"}
+                )
+            clock = tournament_clock.track_game(game, store_id, sync=False) or {"game_id": game_id, "is_finished": True}
+        finally:
+            await db.close()
+    return JSONResponse(
+        content={"response": 200, "data": clock},
+        headers={"Content-Type": "application/json; charset=utf-8"}
+    )
+
 @router.get("/get-game-by-id/{game_id}")
 async def get_game_by_id(game_id: int):
     """특정 게임을 ID로 조회합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 게임 조회
-        game = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+        game = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
         if not game:
             return JSONResponse(
                 content={"response": 404, "message": "게임을 찾을 수 없습니다"},
@@ -413,16 +411,16 @@ async def get_game_by_id(game_id: int):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.put("/update-game-final-prize-by-id/{game_id}")
 async def update_game_final_prize_by_id(game_id: int, game_data: dict):
     """게임의 최종 상금을 업데이트합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 게임 조회
-        game = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+        game = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
         if not game:
             return JSONResponse(
                 content={"response": 404, "message": "게임을 찾을 수 없습니다"},
@@ -433,33 +431,33 @@ async def update_game_final_prize_by_id(game_id: int, game_data: dict):
         final_prize = game_data.get("final_prize", 0)
         game.final_prize = final_prize
         
-        db.commit()
-        db.refresh(game)
+        await db.commit()
+        await db.refresh(game)
         
-        import main
-        await main.socket_controller.update_game_data(game)
+        # 최종 상금은 기존과 같이 중앙 서버에만 전송
+        await game_update_scheduler.schedule(game.id, devices=False)
         
         return JSONResponse(
             content={"response": 200, "message": "게임 최종 상금이 업데이트되었습니다", "data": game.to_json()},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.get("/get-max-player-count-by-game-id/{game_id}")
 async def get_max_player_count_by_game_id(game_id: int):
     """게임의 최대 플레이어 수를 조회합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 게임을 바라보는 테이블 조회
-        table_datas : List[models.TableData] = db.query(models.TableData).filter(models.TableData.game_id == game_id).all()
+        table_datas : List[models.TableData] = (await db.scalars(select(models.TableData).where(models.TableData.game_id == game_id))).all()
         max_player_count = sum(table_data.max_players for table_data in table_datas)
             
         return JSONResponse(
@@ -472,4 +470,4 @@ async def get_max_player_count_by_game_id(game_id: int):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
@@ -0,0 +1,82 @@
+"""
+테이블 디바이스용 게임 상태 패치(델타) 생성
+
+디바이스는 연결 시 전체 스냅샷(game_connect, seq 포함)을 받고, 이후에는 바뀐 부분만 담은
+game_patch 메시지를 받습니다. 패치 연산:
+    {"op": "set", "key": 필드명, "value": 값}                       - GameData.to_json() 최상위 필드 변경
+    {"op": "player", "customer_id": N, "value": {...}}              - 참가자 추가
+    {"op": "player", "customer_id": N, "changes": {"is_sit": false}} - 참가자 필드 변경
+    {"op": "player_remove", "customer_id": N}                       - 참가자 제거
+"""
+from typing import List, Optional
+
+
+def _players_by_customer(players) -> Optional[dict]:
+    """customer_id 기준 참가자 맵 (중복/누락이 있으면 None)"""
+    if not isinstance(players, list):
+        return None
+    result = {}
+    for player in players:
+        customer_id = player.get("customer_id") if isinstance(player, dict) else None
+        if customer_id is None or customer_id in result:
+            return None
+        result[customer_id] = player
+    return result
+
+
+def _diff_players(old_players, new_players) -> Optional[List[dict]]:
+    """참가자 목록 패치 (customer_id로 비교할 수 없으면 None)"""
+    old_map = _players_by_customer(old_players or [])
+    new_map = _players_by_customer(new_players or [])
+    if old_map is None or new_map is None:
+        return None
+
+    ops = []
+    for customer_id, player in new_map.items():
+        previous = old_map.get(customer_id)
+        if previous is None:
+            ops.append({"op": "player", "customer_id": customer_id, "value": player})
+            continue
+        changes = {key: value for key, value in player.items() if previous.get(key) != value}
+        if changes:
+            ops.append({"op": "player", "customer_id": customer_id, "changes": changes})
+    for customer_id in old_map:
+        if customer_id not in new_map:
+            ops.append({"op": "player_remove", "customer_id": customer_id})
+    return ops
+
+
+def diff_game_json(old: dict, new: dict) -> List[dict]:
+    """두 GameData.to_json() 결과의 차이를 패치 연산 목록으로 반환 (같으면 빈 목록)"""
+    ops = []
+    for key, value in new.items():
+        if old.get(key) == value:
+            continue
+        if key == "game_in_player":
+            player_ops = _diff_players(old.get(key), value)
+            if player_ops is not None:
+                ops.extend(player_ops)
+                continue
+        ops.append({"op": "set", "key": key, "value": value})
+    return ops
+
+
+def apply_game_patch(game_json: dict, ops: List[dict]) -> dict:
+    """패치 연산을 스냅샷에 적용한 새 dict 반환 (클라이언트 구현 참고용, 서버 검증용)"""
+    result = dict(game_json)
+    players = [dict(player) for player in result.get("game_in_player") or []]
+    for op in ops:
+        if op["op"] == "set":
+            result[op["key"]] = op["value"]
+            if op["key"] == "game_in_player":
+                players = [dict(player) for player in op["value"] or []]
+        elif op["op"] == "player":
+            player = next((player for player in players if player.get("customer_id") == op["customer_id"]), None)
+            if player is None:
+                players.append(dict(op["value"]))
+            else:
+                player.update(op.get("changes") or op.get("value") or {})
+        elif op["op"] == "player_remove":
+            players = [player for player in players if player.get("customer_id") != op["customer_id"]]
+    result["game_in_player"] = players
+    return result
@@ -0,0 +1,102 @@
+"""
+게임 참가자(game_player_data) 단일 행 갱신 헬퍼
+
+착석/참가 횟수/애드온 변경은 참가자 한 행만 원자적으로 갱신합니다.
+(game_id, customer_id) 유니크 인덱스와 ON CONFLICT를 사용하므로 동시 요청에도 안전합니다.
+"""
+from sqlalchemy import select, update, delete, null
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+
+_player_table = models.GamePlayerData.__table__
+
+
+async def get_game_player(db: AsyncSession, game_id: int, customer_id: int):
+    """게임 참가자 조회"""
+    return await db.scalar(select(models.GamePlayerData).where(
+        models.GamePlayerData.game_id == game_id,
+        models.GamePlayerData.customer_id == customer_id
+    ))
+
+
+async def add_game_player(db: AsyncSession, game_id: int, customer_id: int, join_count: int = 1,
+                          is_sit: bool = True, is_addon: bool = False):
+    """참가자 추가 (이미 있으면 그대로 유지)"""
+    stmt = sqlite_insert(models.GamePlayerData).values(
+        game_id=game_id, customer_id=customer_id, join_count=join_count, is_sit=is_sit, is_addon=is_addon
+    ).on_conflict_do_nothing(index_elements=[_player_table.c.game_id, _player_table.c.customer_id])
+    await db.execute(stmt)
+
+
+async def set_player_sit(db: AsyncSession, game_id: int, customer_id: int, is_sit: bool):
+    """착석 상태 변경 (참가자가 없으면 참가 횟수 0으로 추가)"""
+    stmt = sqlite_insert(models.GamePlayerData).values(
+        game_id=game_id, customer_id=customer_id, join_count=0, is_sit=is_sit, is_addon=False
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_player_table.c.game_id, _player_table.c.customer_id],
+        set_={"is_sit": is_sit}
+    )
+    await db.execute(stmt)
+
+
+async def increase_join_count(db: AsyncSession, game_id: int, customer_id: int, add_if_missing: bool = True):
+    """참가 횟수 1 증가 (참가자가 없으면 참가 횟수 1, 착석 상태로 추가)"""
+    if add_if_missing:
+        stmt = sqlite_insert(models.GamePlayerData).values(
+            game_id=game_id, customer_id=customer_id, join_count=1, is_sit=True, is_addon=False
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[_player_table.c.game_id, _player_table.c.customer_id],
+            set_={"join_count": _player_table.c.join_count + 1}
+        )
+        await db.execute(stmt)
+        return
+    await db.execute(update(models.GamePlayerData).where(
+        models.GamePlayerData.game_id == game_id,
+        models.GamePlayerData.customer_id == customer_id
+    ).values(join_count=models.GamePlayerData.join_count + 1))
+
+
+async def set_player_addon(db: AsyncSession, game_id: int, customer_id: int, is_addon: bool):
+    """애드온 여부 변경 (참가자가 있을 때만)"""
+    await db.execute(update(models.GamePlayerData).where(
+        models.GamePlayerData.game_id == game_id,
+        models.GamePlayerData.customer_id == customer_id
+    ).values(is_addon=is_addon))
+
+
+def migrate_legacy_game_players(connection):
+    """
+    game_data.game_in_player JSON에 남아 있는 참가자를 game_player_data로 옮김 (동기 Connection용)
+    중앙 서버 동기화로 JSON이 다시 들어온 게임은 해당 게임의 참가자 행을 JSON 기준으로 교체
+    """
+    game_table = models.GameData.__table__
+    legacy_column = game_table.c.game_in_player
+    rows = connection.execute(
+        select(game_table.c.id, legacy_column).where(legacy_column.isnot(None))
+    ).all()
+    migrated = 0
+    for game_id, players in rows:
+        players = [player for player in players or [] if isinstance(player, dict) and player.get("customer_id") is not None]
+        if players:
+            connection.execute(delete(_player_table).where(_player_table.c.game_id == game_id))
+            # 같은 고객이 중복으로 들어 있으면 마지막 값 사용 (참가 순서는 처음 위치 유지)
+            by_customer = {}
+            for player in players:
+                by_customer[player["customer_id"]] = player
+            connection.execute(_player_table.insert(), [
+                {
+                    "game_id": game_id,
+                    "customer_id": customer_id,
+                    "join_count": player.get("join_count", 0),
+                    "is_sit": player.get("is_sit", True),
+                    "is_addon": player.get("is_addon", False),
+                }
+                for customer_id, player in by_customer.items()
+            ])
+            migrated += 1
+        connection.execute(game_table.update().where(game_table.c.id == game_id).values(game_in_player=null()))
+    return migrated
@@ -0,0 +1,134 @@
+"""
+게임 변경 알림 병합 스케줄러
+
+운영자가 짧은 시간에 같은 게임을 여러 번 바꾸면 (연속 착석 처리, 시간 조정 버튼 연타 등)
+변경마다 중앙 서버 GameData 메시지와 디바이스 전송이 한 번씩 나갑니다.
+schedule()은 게임별로 window 동안 요청을 모았다가 최신 게임 상태로 한 번만 전송하고,
+게임 종료처럼 바로 반영해야 하는 변경은 immediate=True로 즉시 전송합니다.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+
+import models
+from database import db_manager, get_current_store_id, store_context
+from .device_socket_manager import socket_manager
+from .tournament_clock import tournament_clock
+
+# 로거 설정
+logger = logging.getLogger('GameUpdateScheduler')
+logger.setLevel(logging.DEBUG)
+handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+# 같은 게임의 변경을 모으는 시간 (초)
+DEFAULT_COALESCE_WINDOW = 0.075
+
+
+@dataclass
+class PendingGameUpdate:
+    central: bool = False  # 중앙 서버에 GameData 전송
+    devices: bool = False  # 테이블 디바이스에 전송
+    requests: int = 0  # 병합된 요청 수
+    timer: Optional[asyncio.Task] = None
+
+
+class GameUpdateScheduler:
+    def __init__(self, window: float = DEFAULT_COALESCE_WINDOW):
+        self.window = window
+        # (매장 ID, 게임 ID) -> 대기 중인 전송
+        self._pending: Dict[Tuple[int, int], PendingGameUpdate] = {}
+        self.flush_count = 0
+        self.coalesced_count = 0
+
+    async def schedule(self, game_id, central: bool = True, devices: bool = True, immediate: bool = False) -> None:
+        """
+        게임 변경 알림 예약 (DB 커밋 이후 호출)
+        immediate=True면 대기 중인 요청과 합쳐 바로 전송합니다.
+        """
+        key = (get_current_store_id(), int(game_id))
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = PendingGameUpdate()
+        else:
+            self.coalesced_count += 1
+        pending.central = pending.central or central
+        pending.devices = pending.devices or devices
+        pending.requests += 1
+
+        if immediate or self.window <= 0:
+            await self.flush(game_id)
+        elif pending.timer is None or pending.timer.done():
+            # 태스크는 현재 컨텍스트(매장 ID)를 복사해서 실행됨
+            pending.timer = asyncio.create_task(self._flush_later(key))
+
+    async def _flush_later(self, key: Tuple[int, int]) -> None:
+        await asyncio.sleep(self.window)
+        pending = self._pending.get(key)
+        if pending is not None and pending.timer is asyncio.current_task():
+            # flush 중 새로 들어온 요청은 다음 타이머로 처리
+            pending.timer = None
+            await self._flush_key(key)
+
+    async def flush(self, game_id) -> None:
+        """대기 중인 게임 알림을 즉시 전송"""
+        key = (get_current_store_id(), int(game_id))
+        pending = self._pending.get(key)
+        if pending is not None and pending.timer is not None:
+            pending.timer.cancel()
+            pending.timer = None
+        await self._flush_key(key)
+
+    async def flush_all(self) -> None:
+        """대기 중인 모든 게임 알림 전송 (로그아웃/종료 전)"""
+        for store_id, game_id in list(self._pending):
+            with store_context(store_id):
+                await self.flush(game_id)
+
+    async def _flush_key(self, key: Tuple[int, int]) -> None:
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        store_id, game_id = key
+        self.flush_count += 1
+
+        db = db_manager.get_async_db_direct(store_id)
+        try:
+            game = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
+            if game is None:
+                logger.warning(f"게임 {game_id}을(를) 찾을 수 없어 알림을 보내지 않습니다")
+                return
+            game_json = game.to_json()
+            # 시작/정지/시간 조정이면 디바이스에 clock_sync, 다음 레벨 전환 재예약
+            tournament_clock.track_game(game, store_id, sync=pending.devices)
+            if pending.central:
+                import main
+                if main.socket_controller is not None:
+                    await main.socket_controller.update_game_data(game)
+        except Exception as e:
+            logger.error(f"게임 {game_id} 중앙 서버 알림 중 오류 발생: {e}")
+            return
+        finally:
+            await db.close()
+
+        if pending.devices:
+            await socket_manager.notify_game(game_id, game_json)
+        if pending.requests > 1:
+            logger.debug(f"게임 {game_id} 변경 {pending.requests}건을 한 번에 전송")
+
+    def get_stats(self) -> dict:
+        return {
+            "window": self.window,
+            "pending": len(self._pending),
+            "flushed": self.flush_count,
+            "coalesced": self.coalesced_count,
+        }
+
+
+# 전역 스케줄러 인스턴스
+game_update_scheduler = GameUpdateScheduler()
@@ -1,6 +1,7 @@
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
@@ -14,7 +15,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import models
 import schemas
-from database import get_db, get_db_direct
+from database import get_async_db, get_async_db_direct
 
 router = APIRouter(
     prefix="/operator",
@@ -27,25 +28,28 @@ return true, false
 """
 @router.get("/open-closs")
 async def get_open_closs():
-    db : Session = get_db_direct()
-    open_closs = db.query(models.OpenClossData).order_by(models.OpenClossData.id.desc()).first()
-    
-    if open_closs is None:
-        return JSONResponse(
-            content={"response": 200 , "data": "CLOSE"},
-            headers={"Content-Type": "application/json; charset=utf-8"}
-        )
-    
-    if open_closs.status == "OPEN":
-        return JSONResponse(
-            content={"response": 200, "data": "OPEN"},
-            headers={"Content-Type": "application/json; charset=utf-8"}
-        )
-    else:
-        return JSONResponse(
-            content={"response": 200, "data": "CLOSE"},
-            headers={"Content-Type": "application/json; charset=utf-8"}
-        )
+    db : AsyncSession = get_async_db_direct()
+    try:
+        open_closs = await db.scalar(select(models.OpenClossData).order_by(models.OpenClossData.id.desc()).limit(1))
+        
+        if open_closs is None:
+            return JSONResponse(
+                content={"response": 200 , "data": "CLOSE"},
+                headers={"Content-Type": "application/json; charset=utf-8"}
+            )
+        
+        if open_closs.status == "OPEN":
+            return JSONResponse(
+                content={"response": 200, "data": "OPEN"},
+                headers={"Content-Type": "application/json; charset=utf-8"}
+            )
+        else:
+            return JSONResponse(
+                content={"response": 200, "data": "CLOSE"},
+                headers={"Content-Type": "application/json; charset=utf-8"}
+            )
+    finally:
+        await db.close()
 
 
 """
@@ -55,54 +59,60 @@ async def get_open_closs():
 """
 @router.post("/open-closs-toggle")
 async def post_open_closs():
-    db : Session = get_db_direct()
-    open_closs:models.OpenClossData = db.query(models.OpenClossData).order_by(models.OpenClossData.id.desc()).first()
-    
-    new_open_closs = None
-    if open_closs is None:
-        new_open_closs = models.OpenClossData(
-            status = "OPEN",
-            operator_year = datetime.now().year,
-            operator_month = datetime.now().month,
-            operator_day = datetime.now().day
-        )
+    db : AsyncSession = get_async_db_direct()
+    try:
+        open_closs:models.OpenClossData = await db.scalar(select(models.OpenClossData).order_by(models.OpenClossData.id.desc()).limit(1))
+        
+        new_open_closs = None
+        if open_closs is None:
+            new_open_closs = models.OpenClossData(
+                status = "OPEN",
+                operator_year = datetime.now().year,
+                operator_month = datetime.now().month,
+                operator_day = datetime.now().day
+            )
+            db.add(new_open_closs)
+            await db.commit()
+            return JSONResponse(
+                content={"response": 200, "data": new_open_closs.to_json()},
+                headers={"Content-Type": "application/json; charset=utf-8"}
+            )
+        
+        if open_closs.status == "OPEN":
+            new_open_closs = models.OpenClossData(
+                status = "CLOSE",
+                operator_year = open_closs.operator_year,
+                operator_month = open_closs.operator_month,
+                operator_day = open_closs.operator_day,
+                timestamp = datetime.now()  
+            )
+        else:
+            new_open_closs = models.OpenClossData(
+                status = "OPEN",
+                operator_year = datetime.now().year,
+                operator_month = datetime.now().month,
+                operator_day = datetime.now().day,
+                timestamp = datetime.now()
+            )
+            
         db.add(new_open_closs)
-        db.commit()
+        await db.commit()
+        
         return JSONResponse(
             content={"response": 200, "data": new_open_closs.to_json()},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
-    
-    if open_closs.status == "OPEN":
-        new_open_closs = models.OpenClossData(
-            status = "CLOSE",
-            operator_year = open_closs.operator_year,
-            operator_month = open_closs.operator_month,
-            operator_day = open_closs.operator_day,
-            timestamp = datetime.now()  
-        )
-    else:
-        new_open_closs = models.OpenClossData(
-            status = "OPEN",
-            operator_year = datetime.now().year,
-            operator_month = datetime.now().month,
-            operator_day = datetime.now().day,
-            timestamp = datetime.now()
-        )
-        
-    db.add(new_open_closs)
-    db.commit()
-    
-    return JSONResponse(
-        content={"response": 200, "data": new_open_closs.to_json()},
-        headers={"Content-Type": "application/json; charset=utf-8"}
-    )
+    finally:
+        await db.close()
 
 
 async def get_last_open_data():
-    db : Session = get_db_direct()
-    open_closs:models.OpenClossData = db.query(models.OpenClossData).order_by(models.OpenClossData.id.desc()).first()
-    
-    print("open_closs : ", open_closs.to_json())
-    
-    return open_closs
+    db : AsyncSession = get_async_db_direct()
+    try:
+        open_closs:models.OpenClossData = await db.scalar(select(models.OpenClossData).order_by(models.OpenClossData.id.desc()).limit(1))
+        
+        print("open_closs : ", open_closs.to_json())
+        
+        return open_closs
+    finally:
+        await db.close()
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
@@ -15,7 +16,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import models
 import schemas
-from database import get_db, get_db_direct
+from database import get_async_db, get_async_db_direct
 
 router = APIRouter(
     prefix="/point",
@@ -25,9 +26,9 @@ router = APIRouter(
 @router.post("/add-point-by-user-id/{user_id}")
 async def add_point_by_user_id(user_id: int, pointHistory: schemas.PointHistoryDataCreate):
     """사용자 ID로 포인트를 추가합니다."""
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        user = db.query(models.UserData).filter(models.UserData.id == user_id).first()
+        user = await db.scalar(select(models.UserData).where(models.UserData.id == user_id))
         if not user:
             return JSONResponse(
                 content={"response": 404, "message": "사용자를 찾을 수 없습니다"},
@@ -46,8 +47,8 @@ async def add_point_by_user_id(user_id: int, pointHistory: schemas.PointHistoryD
             created_at=datetime.now()
         )
         db.add(point_history)
-        db.commit()
-        db.refresh(point_history)
+        await db.commit()
+        await db.refresh(point_history)
         
         # 소켓 이벤트 전송 부분을 비동기적으로 처리
         try:
@@ -61,23 +62,23 @@ async def add_point_by_user_id(user_id: int, pointHistory: schemas.PointHistoryD
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": f"포인트 추가 중 오류 발생: {str(e)}"},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.get("/get-point-history-by-user-id/{user_id}")
 async def get_point_history_by_user_id(user_id: int):
     """사용자 ID로 포인트 내역을 조회합니다."""
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 쿼리 최적화 - 필요한 필드만 선택
-        point_history_records = db.query(models.PointHistoryData).filter(
+        point_history_records = (await db.scalars(select(models.PointHistoryData).where(
             models.PointHistoryData.customer_id == user_id
-        ).order_by(models.PointHistoryData.created_at.desc()).all()
+        ).order_by(models.PointHistoryData.created_at.desc()))).all()
         print(f"point_history_records : {len(point_history_records)}")
         
         # 리스트 컴프리헨션으로 변환 성능 향상
@@ -94,19 +95,19 @@ async def get_point_history_by_user_id(user_id: int):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.get("/get-current-point-by-user-id/{user_id}")
 async def get_current_point_by_user_id(user_id: int):
     """사용자 ID로 현재 사용 가능한 포인트를 조회합니다."""
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 쿼리 최적화 - 합계 계산을 DB에서 처리
-        total_amount_records : list[models.PointHistoryData] = db.query(models.PointHistoryData).filter(
+        total_amount_records : list[models.PointHistoryData] = (await db.scalars(select(models.PointHistoryData).where(
             models.PointHistoryData.customer_id == user_id,
             models.PointHistoryData.is_expired == False,
             models.PointHistoryData.available_amount > 0
-        ).all()
+        ))).all()
         
         total_amount = sum(point.available_amount for point in total_amount_records)
         print(f"total_amount : {total_amount}")  # 로그 출력
@@ -122,18 +123,18 @@ async def get_current_point_by_user_id(user_id: int):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 @router.get("/get-total-point-by-user-id/{user_id}")
 async def get_total_point_by_user_id(user_id: int):
     """사용자 ID로 총 적립된 포인트를 조회합니다."""
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 쿼리 최적화 - 합계 계산을 DB에서 처리 
-        total_amount_records : list[models.PointHistoryData] = db.query(models.PointHistoryData).filter(
+        total_amount_records : list[models.PointHistoryData] = (await db.scalars(select(models.PointHistoryData).where(
             models.PointHistoryData.customer_id == user_id,
             models.PointHistoryData.is_increase == True,
             models.PointHistoryData.available_amount > 0
-        ).all()
+        ))).all()
          
         total_amount = sum(point.amount for point in total_amount_records)
         print(f"total_point : {total_amount}")
@@ -147,21 +148,21 @@ async def get_total_point_by_user_id(user_id: int):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.get("/get-expire-point-by-user-id/{user_id}")
 async def get_expire_point_by_user_id(user_id: int):
     """사용자 ID로 한 달 이내 만료되는 포인트를 조회합니다."""
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 쿼리 최적화 - 합계 계산을 DB에서 처리
-        total_point = db.query(
+        total_point = (await db.scalars(select(models.PointHistoryData).where(
             models.PointHistoryData.customer_id == user_id,
             models.PointHistoryData.is_expired == False,
             models.PointHistoryData.is_increase == True,
             models.PointHistoryData.available_amount > 0,
             models.PointHistoryData.expire_at < (datetime.now() + timedelta(days=30))
-        ).all()
+        ))).all()
         
         
         total_point_amount = sum(point.available_amount for point in total_point)
@@ -176,4 +177,4 @@ async def get_expire_point_by_user_id(user_id: int):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
\ No newline at end of file
+        await db.close()
\ No newline at end of file
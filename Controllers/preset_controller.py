@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
@@ -12,7 +13,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import models
 import schemas
-from database import get_db, get_db_direct
+from database import get_async_db, get_async_db_direct
 
 router = APIRouter(
     prefix="/presets",
@@ -23,7 +24,7 @@ router = APIRouter(
 async def create_preset(preset_data: schemas.PresetData):
     """프리셋 생성 엔드포인트"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         preset = models.PresetData(
             preset_name=preset_data.preset_name,
@@ -38,8 +39,8 @@ async def create_preset(preset_data: schemas.PresetData):
             rebuy_cut_off=preset_data.rebuy_cut_off,
         )
         db.add(preset)
-        db.commit()
-        db.refresh(preset)
+        await db.commit()
+        await db.refresh(preset)
         import main
         await main.socket_controller.save_preset(presets=preset)
         return JSONResponse(
@@ -47,21 +48,21 @@ async def create_preset(preset_data: schemas.PresetData):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.put("/update-preset/{preset_id}")
 async def update_preset(preset_id: int, preset_data: schemas.PresetData):
     """프리셋 업데이트 엔드포인트"""
     # 직접 세션 가져오기
-    db :Session = get_db_direct()
+    db :AsyncSession = get_async_db_direct()
     try:
-        preset = db.query(models.PresetData).filter(models.PresetData.id == preset_id).first()
+        preset = await db.scalar(select(models.PresetData).where(models.PresetData.id == preset_id))
         if not preset:
             return JSONResponse(
                 content={"response": 404, "message": "프리셋을 찾을 수 없습니다"},
@@ -80,8 +81,8 @@ async def update_preset(preset_id: int, preset_data: schemas.PresetData):
         preset.prize_settings = preset_data.prize_settings
         preset.rebuy_cut_off = preset_data.rebuy_cut_off
 
-        db.commit()
-        db.refresh(preset)
+        await db.commit()
+        await db.refresh(preset)
         
         # 데이터 검증을 위한 로깅 추가
         print("Updated preset data:")
@@ -108,22 +109,22 @@ async def update_preset(preset_id: int, preset_data: schemas.PresetData):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"Error updating preset: {str(e)}")  # 에러 로깅 추가
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.get("/")
 async def get_presets():
     """모든 프리셋 조회 엔드포인트"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        presets = db.query(models.PresetData).all()
+        presets = (await db.scalars(select(models.PresetData))).all()
         
         if not presets:
             return JSONResponse(
@@ -145,15 +146,15 @@ async def get_presets():
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.get("/{preset_id}")
 async def get_preset(preset_id: int):
     """특정 프리셋 조회 엔드포인트"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        preset = db.query(models.PresetData).filter(models.PresetData.id == preset_id).first()
+        preset = await db.scalar(select(models.PresetData).where(models.PresetData.id == preset_id))
         
         if not preset:
             return JSONResponse(
@@ -171,15 +172,15 @@ async def get_preset(preset_id: int):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.delete("/{preset_id}")
 async def delete_preset(preset_id: int):
     """프리셋 삭제 엔드포인트"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        preset = db.query(models.PresetData).filter(models.PresetData.id == preset_id).first()
+        preset = await db.scalar(select(models.PresetData).where(models.PresetData.id == preset_id))
         
         if not preset:
             return JSONResponse(
@@ -187,8 +188,8 @@ async def delete_preset(preset_id: int):
                 headers={"Content-Type": "application/json; charset=utf-8"}
             )
             
-        db.delete(preset)
-        db.commit()
+        await db.delete(preset)
+        await db.commit()
         
         import main
         await main.socket_controller.delete_preset(preset_id)
@@ -197,10 +198,10 @@ async def delete_preset(preset_id: int):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
\ No newline at end of file
+        await db.close()
\ No newline at end of file
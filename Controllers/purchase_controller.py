@@ -2,8 +2,8 @@ import asyncio
 from datetime import datetime, timedelta
 import uuid
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, Query
-from sqlalchemy import DateTime
-from sqlalchemy.orm import Session
+from sqlalchemy import DateTime, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
@@ -19,7 +19,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from Controllers import user_controller
 import models
 import schemas
-from database import get_db, get_db_direct
+from database import get_async_db, get_async_db_direct
 
 router = APIRouter(
     prefix="/purchase",
@@ -31,9 +31,9 @@ router = APIRouter(
 async def get_purchase_data():
     """모든 구매 데이터 조회"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        purchase_data = db.query(models.PurchaseData).all()
+        purchase_data = (await db.scalars(select(models.PurchaseData))).all()
         
         if not purchase_data:
             return JSONResponse(
@@ -57,7 +57,7 @@ async def get_purchase_data():
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
     
 # 구매 데이터 컨트롤 - WAITING to SUCCESS
 # 결제 완료 처리(매장 결제)
@@ -65,10 +65,10 @@ async def get_purchase_data():
 async def waiting_to_payment_chip(purchase_id: int):
     """구매 상태를 '결제 대기'에서 '칩 대기'로 변경"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 구매 데이터 조회
-        purchase : models.PurchaseData = db.query(models.PurchaseData).filter(models.PurchaseData.id == purchase_id).first()
+        purchase : models.PurchaseData = await db.scalar(select(models.PurchaseData).where(models.PurchaseData.id == purchase_id))
         if not purchase:
             return JSONResponse(
                 content={"response": 404, "message": "구매 데이터를 찾을 수 없습니다"},
@@ -78,8 +78,8 @@ async def waiting_to_payment_chip(purchase_id: int):
         # 상태 업데이트
         purchase.payment_status = "SUCCESS"
         purchase.status = "SUCCESS"
-        db.commit()
-        db.refresh(purchase)
+        await db.commit()
+        await db.refresh(purchase)
         
         import main
         await main.socket_controller.update_purchase_data_payment_success(purchase)
@@ -89,23 +89,23 @@ async def waiting_to_payment_chip(purchase_id: int):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 # 구매 데이터 컨트롤 - CHIP_WAITING to SUCCESS
 @router.get("/chip-waiting-to-success/{purchase_id}")
 async def chip_waiting_to_success(purchase_id: int):
     """구매 상태를 '칩 대기'에서 '성공'으로 변경"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 구매 데이터 조회
-        purchase = db.query(models.PurchaseData).filter(models.PurchaseData.id == purchase_id).first()
+        purchase = await db.scalar(select(models.PurchaseData).where(models.PurchaseData.id == purchase_id))
         if not purchase:
             return JSONResponse(
                 content={"response": 404, "message": "구매 데이터를 찾을 수 없습니다"},
@@ -114,30 +114,30 @@ async def chip_waiting_to_success(purchase_id: int):
             
         # 상태 업데이트
         purchase.status = "SUCCESS"
-        db.commit()
-        db.refresh(purchase)
+        await db.commit()
+        await db.refresh(purchase)
         
         return JSONResponse(
             content={"response": 200, "message": "구매 상태가 업데이트되었습니다", "data": purchase.to_json()},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.get("/get-purchase-data-by-user-id/{user_id}")
 async def get_purchase_data_by_user_id(user_id: int):
     """사용자별 구매 데이터 조회"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 사용자별 구매 데이터 조회
-        purchase_data = db.query(models.PurchaseData).filter(models.PurchaseData.customer_id == user_id).all()
+        purchase_data = (await db.scalars(select(models.PurchaseData).where(models.PurchaseData.customer_id == user_id))).all()
         
         if not purchase_data:
             return JSONResponse(
@@ -161,16 +161,16 @@ async def get_purchase_data_by_user_id(user_id: int):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.get("/get-purchase-data-by-game-id/{game_id}")
 async def get_purchase_data_by_game_id(game_id: int):
     """게임별 구매 데이터 조회"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 게임별 구매 데이터 조회
-        purchase_data = db.query(models.PurchaseData).filter(models.PurchaseData.game_id == game_id).all()
+        purchase_data = (await db.scalars(select(models.PurchaseData).where(models.PurchaseData.game_id == game_id))).all()
         
         if not purchase_data:
             return JSONResponse(
@@ -194,7 +194,7 @@ async def get_purchase_data_by_game_id(game_id: int):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
  
 @router.get("/get-purchase-data-by-date/{startTime}/{endTime}")
 async def get_purchase_data_by_date(startTime: str, endTime: str, page: int = 1, page_size: int = 10):
@@ -205,34 +205,31 @@ async def get_purchase_data_by_date(startTime: str, endTime: str, page: int = 1,
         오픈 클로즈 상태에 따라 구매 데이터를 조회한다.
     """
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 날짜 문자열을 datetime 객체로 변환
         start_date = datetime.fromisoformat(startTime.replace('Z', '+00:00'))
         end_date = datetime.fromisoformat(endTime.replace('Z', '+00:00'))
         
         # 전체 데이터 개수 조회
-        total_count = db.query(models.PurchaseData).filter(
+        total_count = await db.scalar(select(func.count()).select_from(models.PurchaseData).where(
             models.PurchaseData.purchased_at >= start_date,
             models.PurchaseData.purchased_at <= end_date
-        ).count()
+        ))
         
         # 총 페이지 수 계산
         total_pages = (total_count + page_size - 1) // page_size
         
         # 날짜 범위로 구매 데이터 조회 (페이지네이션 적용)
-        purchase_data = db.query(models.PurchaseData).filter(
+        purchase_data = (await db.scalars(select(models.PurchaseData).where(
             models.PurchaseData.purchased_at >= start_date
-        ).filter(
+        ).where(
             models.PurchaseData.purchased_at <= end_date
-        ).filter(
+        ).where(
             models.PurchaseData.status == "SUCCESS"
         ).order_by(
             models.PurchaseData.purchased_at.desc()
-        ).all()
-        
-        # 페이지네이션 적용
-        purchase_data = purchase_data[(page - 1) * page_size:page * page_size]
+        ).offset((page - 1) * page_size).limit(page_size))).all()
         
         if not purchase_data:
             return JSONResponse(
@@ -282,15 +279,15 @@ async def get_purchase_data_by_date(startTime: str, endTime: str, page: int = 1,
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 @router.put("/create-buyin-purchase-data-by-user-id/")
 async def create_buyin_purchase_data_by_user_id(user_id: int, game_id: int):
     """사용자별 구매 데이터 생성"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 사용자 데이터 조회
-        user = db.query(models.UserData).filter(models.UserData.id == user_id).first()
+        user = await db.scalar(select(models.UserData).where(models.UserData.id == user_id))
         if not user:
             return JSONResponse(
                 content={"response": 404, "message": "사용자 데이터를 찾을 수 없습니다"},
@@ -298,7 +295,7 @@ async def create_buyin_purchase_data_by_user_id(user_id: int, game_id: int):
             )
             
         # 게임 데이터 조회
-        game : models.GameData = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+        game : models.GameData = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
         if not game:
             return JSONResponse(
                 content={"response": 404, "message": "게임 데이터를 찾을 수 없습니다"},
@@ -321,8 +318,8 @@ async def create_buyin_purchase_data_by_user_id(user_id: int, game_id: int):
         )
         
         db.add(purchase)
-        db.commit()
-        db.refresh(purchase)
+        await db.commit()
+        await db.refresh(purchase)
         
         import main
         await main.socket_controller.local_purchase_data(purchase)
@@ -332,22 +329,22 @@ async def create_buyin_purchase_data_by_user_id(user_id: int, game_id: int):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.put("/create-rebuyin-purchase-data-by-user-id/")
 async def create_rebuyin_purchase_data_by_user_id(user_id: int, game_id: int):
     """사용자별 구매 데이터 생성"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 사용자 데이터 조회
-        user = db.query(models.UserData).filter(models.UserData.id == user_id).first()
+        user = await db.scalar(select(models.UserData).where(models.UserData.id == user_id))
         if not user:
             return JSONResponse(
                 content={"response": 404, "message": "사용자 데이터를 찾을 수 없습니다"},
@@ -355,7 +352,7 @@ async def create_rebuyin_purchase_data_by_user_id(user_id: int, game_id: int):
             )
         
         # 게임 데이터 조회
-        game : models.GameData = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+        game : models.GameData = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
         if not game:
             return JSONResponse(
                 content={"response": 404, "message": "게임 데이터를 찾을 수 없습니다"},
@@ -378,8 +375,8 @@ async def create_rebuyin_purchase_data_by_user_id(user_id: int, game_id: int):
         )
 
         db.add(purchase)
-        db.commit()
-        db.refresh(purchase)
+        await db.commit()
+        await db.refresh(purchase)
         
         import main
         await main.socket_controller.local_purchase_data(purchase)
@@ -389,33 +386,33 @@ async def create_rebuyin_purchase_data_by_user_id(user_id: int, game_id: int):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 
 @router.get("/get-paginated-purchase-data")
 async def get_paginated_purchase_data(page: int = 1, page_size: int = 20):
     """페이지네이션된 구매 데이터 조회"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 모든 구매 데이터 조회
-        query = db.query(models.PurchaseData)
+        query = select(models.PurchaseData)
         
         # 총 레코드 수 계산
-        total_records = query.count()
+        total_records = await db.scalar(select(func.count()).select_from(models.PurchaseData))
         
         # 페이지네이션 적용
         query = query.order_by(models.PurchaseData.purchased_at.desc())
         query = query.offset((page - 1) * page_size).limit(page_size)
         
         # 결과 가져오기
-        purchase_data = query.all()
+        purchase_data = (await db.scalars(query)).all()
         
         # 총 페이지 수 계산
         total_pages = (total_records + page_size - 1) // page_size
@@ -445,4 +442,4 @@ async def get_paginated_purchase_data(page: int = 1, page_size: int = 20):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
\ No newline at end of file
+        await db.close()
\ No newline at end of file
@@ -1,7 +1,8 @@
 import asyncio
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, WebSocket
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
@@ -17,7 +18,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import models
 import schemas
-from database import get_db
+from database import get_async_db
 
 router = APIRouter(
     prefix="/store",
@@ -25,10 +26,10 @@ router = APIRouter(
 )
 
 @router.post("/store-open")
-async def store_open(store_id: int, db: Session = Depends(get_db)):
-    store_data = db.query(models.StoreData).filter(models.StoreData.id == store_id).first()
+async def store_open(store_id: int, db: AsyncSession = Depends(get_async_db)):
+    store_data = await db.scalar(select(models.StoreData).where(models.StoreData.id == store_id))
     if not store_data:
         raise HTTPException(status_code=404, detail="Store data not found")
     
     store_data.status = "OPEN"
-    db.commit()
\ No newline at end of file
+    await db.commit()
\ No newline at end of file
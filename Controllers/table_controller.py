@@ -1,6 +1,7 @@
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
@@ -14,7 +15,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import models
 import schemas
-from database import get_db, get_db_direct
+from database import get_async_db, get_async_db_direct
 
 router = APIRouter(
     prefix="/tables",
@@ -25,9 +26,9 @@ router = APIRouter(
 async def get_tables():
     """모든 테이블 정보를 조회합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        tables = db.query(models.TableData).all()
+        tables = (await db.scalars(select(models.TableData))).all()
         
         if not tables:
             return JSONResponse(
@@ -54,13 +55,13 @@ async def get_tables():
             media_type="application/json"
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.post("/save-table")
 async def save_table(tables: List[schemas.TableData]):
     """테이블 정보를 저장하거나 업데이트합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         result = []
         
@@ -68,29 +69,30 @@ async def save_table(tables: List[schemas.TableData]):
         existing_table_ids = set(table.id for table in tables if table.id is not None)
         
         # 요청에 포함되지 않은 테이블 삭제 처리
-        tables_to_delete = db.query(models.TableData).filter(
+        tables_to_delete = (await db.scalars(select(models.TableData).where(
             ~models.TableData.id.in_(existing_table_ids) if existing_table_ids else True
-        ).all()
+        ))).all()
         
         # 삭제할 테이블에 연결된 디바이스 처리
         for table_to_delete in tables_to_delete:
             # 디바이스 DB에서 해당 테이블 연결 해제
-            device_data = db.query(models.AuthDeviceData).filter(
+            device_data = (await db.scalars(select(models.AuthDeviceData).where(
                 models.AuthDeviceData.connect_table_id == table_to_delete.id
-            ).all()
+            ))).all()
             
             for device in device_data:
                 device.connect_table_id = None
-                db.commit()
+                await db.commit()
                 print(f"디바이스 연결 해제: {device.device_uid}")
                 await device_socket_manager.socket_manager.handle_game_connection(device.device_uid, table_to_delete.id)
                 
-            db.delete(table_to_delete)
+            await db.delete(table_to_delete)
+            device_socket_manager.socket_manager.remove_table(table_to_delete.id)
         
         # 테이블 생성 또는 업데이트
         for table in tables:
             table_data = jsonable_encoder(table)
-            existing_table = db.query(models.TableData).filter(models.TableData.id == table.id).first()
+            existing_table = await db.scalar(select(models.TableData).where(models.TableData.id == table.id))
             
             if existing_table:
                 # 기존 테이블 업데이트
@@ -105,9 +107,9 @@ async def save_table(tables: List[schemas.TableData]):
         
         try:
             # 변경사항 저장
-            db.commit()
+            await db.commit()
             for table in result:
-                db.refresh(table)
+                await db.refresh(table)
                 
             import main
             for table in result:
@@ -119,25 +121,25 @@ async def save_table(tables: List[schemas.TableData]):
                 media_type="application/json"
             )
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             return JSONResponse(
                 content={"response": 500, "error": str(e)},
                 headers={"Content-Type": "application/json; charset=utf-8"},
                 media_type="application/json"
             )
     finally:
-        db.close()
+        await db.close()
 
 @router.put("/disconnect-table-game/{table_id}")
 async def disconnect_game(table_id: str):
     """테이블과 게임의 연결을 해제합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         print(f"테이블 연결 해제 시작: 테이블 ID {table_id}")
         
         # 테이블 조회
-        table = db.query(models.TableData).filter(models.TableData.id == table_id).first()
+        table = await db.scalar(select(models.TableData).where(models.TableData.id == table_id))
         if not table:
             print(f"테이블을 찾을 수 없음: {table_id}")
             return JSONResponse(
@@ -157,11 +159,12 @@ async def disconnect_game(table_id: str):
             )
         
         # 게임 조회
-        game = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+        game = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
         if not game:
             print(f"게임을 찾을 수 없음: {game_id}")
             table.game_id = None
-            db.commit()
+            await db.commit()
+            device_socket_manager.socket_manager.set_table_game(table_id, None)
             return JSONResponse(
                 content={"response": 404, "message": "게임을 찾을 수 없습니다"},
                 headers={"Content-Type": "application/json; charset=utf-8"}
@@ -189,21 +192,15 @@ async def disconnect_game(table_id: str):
         table.game_id = None
         
         # 변경사항 저장
-        db.commit()
+        await db.commit()
         
         # 로그 확인
-        db.refresh(game)
-        devices = db.query(models.AuthDeviceData).filter(models.AuthDeviceData.connect_table_id == table_id).all()
-         
+        await db.refresh(game)
         print(f"커밋 후 게임 로그: {game.table_connect_log}")
         
-        # 테이블에 연결된 디바이스가 있으면 이벤트 전송
-        if devices:
-            for device in devices:
-                print(f"테이블에 연결된 디바이스 UID: {device.device_uid}")
-                await device_socket_manager.socket_manager.handle_game_connection(device.device_uid, table_id)
-        else:
-            print(f"테이블 {table_id}에 연결된 디바이스가 없습니다.")
+        # 테이블에 연결된 디바이스에 이벤트 전송
+        device_socket_manager.socket_manager.set_table_game(table_id, None)
+        await device_socket_manager.socket_manager.notify_table(table_id)
         
         return JSONResponse(
             content={"response": 200, "message": "테이블 게임 ID 연결 해제 성공"},
@@ -211,19 +208,19 @@ async def disconnect_game(table_id: str):
         )
     except Exception as e:
         print(f"테이블 게임 연결 해제 중 오류 발생: {str(e)}")
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": f"서버 에러: {str(e)}"},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.post("/connect-table-game-id")
 async def connect_table_game_id(table_game_id: dict):
     """테이블과 게임을 연결합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 요청 데이터 확인
         table_id = table_game_id.get("table_id")
@@ -238,7 +235,7 @@ async def connect_table_game_id(table_game_id: dict):
         print(f"테이블 ID: {table_id}, 게임 ID: {game_id}")
         
         # 테이블 조회
-        table = db.query(models.TableData).filter(models.TableData.id == table_id).first()
+        table = await db.scalar(select(models.TableData).where(models.TableData.id == table_id))
         if not table:
             return JSONResponse(
                 content={"response": 404, "message": "테이블을 찾을 수 없습니다"},
@@ -251,7 +248,7 @@ async def connect_table_game_id(table_game_id: dict):
         table.game_id = game_id
         
         # 게임 조회
-        game = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+        game = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
         if not game:
             return JSONResponse(
                 content={"response": 404, "message": "게임을 찾을 수 없습니다"},
@@ -273,22 +270,15 @@ async def connect_table_game_id(table_game_id: dict):
         table_connect_log.append(log_entry)
         
         # 게임 객체 업데이트
-        db.query(models.GameData).filter(models.GameData.id == game_id).update({
+        await db.execute(update(models.GameData).where(models.GameData.id == game_id).values({
             models.GameData.table_connect_log: table_connect_log
-        })
+        }))
         # 변경사항 저장
-        db.commit()
+        await db.commit()
         
-        # 테이블에 연결된 디바이스 찾기
-        devices = db.query(models.AuthDeviceData).filter(models.AuthDeviceData.connect_table_id == table_id).all()
-        
-        # 디바이스가 있으면 이벤트 전송
-        if devices:
-            for device in devices:
-                print(f"테이블에 연결된 디바이스 UID: {device.device_uid}")
-                await device_socket_manager.socket_manager.handle_game_connection(device.device_uid, table_id)
-        else:
-            print(f"테이블 {table_id}에 연결된 디바이스가 없습니다.")
+        # 테이블에 연결된 디바이스에 이벤트 전송
+        device_socket_manager.socket_manager.set_table_game(table_id, game_id)
+        await device_socket_manager.socket_manager.notify_table(table_id)
         
         return JSONResponse(
             content={"response": 200, "message": "테이블 게임 ID 연결 성공"},
@@ -296,10 +286,10 @@ async def connect_table_game_id(table_game_id: dict):
         )
     except Exception as e:
         print(f"테이블 게임 연결 중 오류 발생: {str(e)}")
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": f"서버 에러: {str(e)}"},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
\ No newline at end of file
+        await db.close()
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""
+서버 측 토너먼트 시계
+
+게임별로 time_table_data의 누적 레벨 경계를 미리 계산해 두고, 진행 중인 모든 게임의
+다음 레벨/브레이크 전환 시각 중 가장 이른 시각에 한 번만 깨어나 디바이스에
+level_changed 이벤트를 보냅니다. 게임 시작/정지/시간 조정 때는 clock_sync를 보냅니다.
+
+경과 시간 = (game_stop_time 또는 현재 시각) - game_calcul_time
+    - game_status가 "in-progress"이고 game_stop_time이 없을 때만 시계가 흐릅니다.
+
+time_table_data 항목 형식은 프리셋마다 다를 수 있어 아래 키를 순서대로 확인합니다.
+    레벨 길이: LEVEL_DURATION_KEYS (단위: LEVEL_DURATION_UNIT초, 기본 분)
+    브레이크 여부: LEVEL_BREAK_KEYS 중 참인 값 또는 "type" == "break"
+"""
+import asyncio
+import logging
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+import models
+from database import db_manager, store_context
+from .device_socket_manager import socket_manager
+
+# 로거 설정
+logger = logging.getLogger('TournamentClock')
+logger.setLevel(logging.DEBUG)
+handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+LEVEL_DURATION_KEYS = ("time", "duration", "level_time", "minutes")
+LEVEL_BREAK_KEYS = ("is_break", "isBreak", "break")
+LEVEL_DURATION_UNIT = 60  # time_table_data 레벨 길이 단위 (초)
+TRANSITION_GRACE = 0.05  # 초
+
+
+def _level_duration(level: dict) -> float:
+    for key in LEVEL_DURATION_KEYS:
+        value = level.get(key)
+        if value is not None:
+            try:
+                return max(float(value), 0) * LEVEL_DURATION_UNIT
+            except (TypeError, ValueError):
+                return 0
+    return 0
+
+
+def _is_break(level: dict) -> bool:
+    return any(bool(level.get(key)) for key in LEVEL_BREAK_KEYS) or level.get("type") == "break"
+
+
+def build_level_boundaries(time_table_data) -> List[float]:
+    """레벨별 누적 종료 시각(초) 목록 - boundaries[i]는 i번째 레벨이 끝나는 경과 시간"""
+    boundaries = []
+    total = 0
+    for level in time_table_data or []:
+        total += _level_duration(level if isinstance(level, dict) else {})
+        boundaries.append(total)
+    return boundaries
+
+
+@dataclass
+class GameClock:
+    game_id: int
+    store_id: int
+    time_table_data: list
+    boundaries: List[float]
+    calcul_time: datetime
+    stop_time: Optional[datetime]
+    status: str
+    level_index: int = -1
+    # 다음 전환 시각 (time.monotonic 기준, 시계가 멈춰 있으면 None)
+    next_transition: Optional[float] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.status == "in-progress" and self.stop_time is None
+
+    def elapsed(self, now: Optional[datetime] = None) -> float:
+        reference = self.stop_time or now or datetime.now()
+        return max((reference - self.calcul_time).total_seconds(), 0)
+
+    def snapshot(self, now: Optional[datetime] = None) -> dict:
+        """현재 레벨과 남은 시간"""
+        elapsed = self.elapsed(now)
+        index = bisect_right(self.boundaries, elapsed)
+        finished = index >= len(self.boundaries)
+        level_start = self.boundaries[index - 1] if index > 0 else 0
+        level = self.time_table_data[index] if not finished else None
+        return {
+            "game_id": self.game_id,
+            "level_index": index,
+            "level": level,
+            "is_break": _is_break(level) if isinstance(level, dict) else False,
+            "is_finished": finished,
+            "is_paused": not self.is_running,
+            "elapsed": round(elapsed, 3),
+            "level_elapsed": round(elapsed - level_start, 3),
+            "level_remaining": round(self.boundaries[index] - elapsed, 3) if not finished else 0,
+            "server_time": datetime.now().isoformat(),
+        }
+
+
+class TournamentClock:
+    def __init__(self):
+        self._clocks: Dict[Tuple[int, int], GameClock] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.level_change_count = 0
+
+    def _ensure_task(self) -> None:
+        if self._task is None or self._task.done():
+            # 이벤트 루프에 묶이므로 태스크를 만들 때 함께 생성
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def track_game(self, game: models.GameData, store_id: int, sync: bool = True) -> Optional[dict]:
+        """
+        게임 시계 상태 갱신 (게임 시작/정지/시간 조정/조회 시 호출)
+        sync=True면 시계가 바뀌었을 때 연결된 디바이스에 clock_sync 전송. 종료된 게임은 추적을 중단합니다.
+        """
+        key = (store_id, game.id)
+        if game.game_status == "end":
+            self._clocks.pop(key, None)
+            return None
+
+        clock = self._clocks.get(key)
+        changed = clock is None or (clock.calcul_time, clock.stop_time, clock.status) != (
+            game.game_calcul_time, game.game_stop_time, game.game_status
+        )
+        if clock is None or clock.time_table_data != game.time_table_data:
+            changed = True
+            clock = GameClock(
+                game_id=game.id,
+                store_id=store_id,
+                time_table_data=list(game.time_table_data or []),
+                boundaries=build_level_boundaries(game.time_table_data),
+                calcul_time=game.game_calcul_time,
+                stop_time=game.game_stop_time,
+                status=game.game_status,
+            )
+            self._clocks[key] = clock
+        else:
+            clock.calcul_time = game.game_calcul_time
+            clock.stop_time = game.game_stop_time
+            clock.status = game.game_status
+
+        snapshot = self._schedule(clock)
+        if sync and changed:
+            self._send(clock, "clock_sync", snapshot)
+        return snapshot
+
+    def untrack_game(self, game_id: int, store_id: int) -> None:
+        self._clocks.pop((store_id, game_id), None)
+
+    def get_clock(self, game_id: int, store_id: int) -> Optional[dict]:
+        clock = self._clocks.get((store_id, game_id))
+        return clock.snapshot() if clock else None
+
+    def _schedule(self, clock: GameClock) -> dict:
+        """현재 레벨 기록 후 다음 전환 시각 예약"""
+        snapshot = clock.snapshot()
+        clock.level_index = snapshot["level_index"]
+        if clock.is_running and not snapshot["is_finished"]:
+            # 벽시계/단조 시계 오차로 경계 직전에 깨지 않도록 약간 늦게 예약
+            clock.next_transition = time.monotonic() + snapshot["level_remaining"] + TRANSITION_GRACE
+            self._ensure_task()
+            self._wakeup.set()
+        else:
+            clock.next_transition = None
+        return snapshot
+
+    def _send(self, clock: GameClock, event: str, snapshot: dict) -> None:
+        with store_context(clock.store_id):
+            device_uids = socket_manager.game_device_uids(clock.game_id)
+            if device_uids:
+                socket_manager.send_text_to_devices(
+                    device_uids,
+                    socket_manager.encode_message(200, {"event": event, **snapshot}),
+                    "clock"
+                )
+
+    async def _run(self) -> None:
+        """가장 이른 전환 시각까지 대기 후 전환된 게임에 level_changed 전송"""
+        while True:
+            self._wakeup.clear()
+            pending = [clock.next_transition for clock in self._clocks.values() if clock.next_transition is not None]
+            timeout = max(min(pending) - time.monotonic(), 0) if pending else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+                continue
+            except asyncio.TimeoutError:
+                pass
+
+            now = time.monotonic()
+            for clock in list(self._clocks.values()):
+                if clock.next_transition is None or clock.next_transition > now:
+                    continue
+                previous_index = clock.level_index
+                snapshot = self._schedule(clock)
+                if snapshot["level_index"] != previous_index:
+                    self.level_change_count += 1
+                    logger.debug(f"게임 {clock.game_id} 레벨 전환: {previous_index} -> {snapshot['level_index']}")
+                    self._send(clock, "level_changed", snapshot)
+
+    async def load_store_games(self, store_id: int) -> int:
+        """매장의 진행 중인 게임을 불러와 시계 추적 시작 (매장 선택/서버 재시작 후)"""
+        db = db_manager.get_async_db_direct(store_id)
+        try:
+            games = (await db.scalars(select(models.GameData).where(
+                models.GameData.game_status.in_(["waiting", "in-progress"])
+            ))).all()
+            for game in games:
+                self.track_game(game, store_id, sync=False)
+            return len(games)
+        finally:
+            await db.close()
+
+    def get_stats(self) -> dict:
+        return {
+            "tracked_games": len(self._clocks),
+            "running_games": sum(1 for clock in self._clocks.values() if clock.is_running),
+            "level_changes": self.level_change_count,
+        }
+
+
+# 전역 시계 인스턴스
+tournament_clock = TournamentClock()
@@ -2,12 +2,14 @@ from datetime import datetime
 import random
 import uuid
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from fastapi.encoders import jsonable_encoder
-from Controllers import device_controller, device_socket_manager
+from Controllers import device_controller, device_socket_manager, game_player_manager
+from Controllers.game_update_scheduler import game_update_scheduler
 
 import json
 import sys
@@ -16,22 +18,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import models
 import schemas
-from database import get_db, get_db_direct
-from dataclasses import dataclass
-@dataclass
-class InGameUser:
-    customer_id: str
-    join_count: int
-    is_sit : bool
-    is_addon : bool
-    
-    def to_json(self):
-        return {
-            "customer_id": self.customer_id,
-            "join_count": self.join_count,
-            "is_sit": self.is_sit,
-            "is_addon": self.is_addon
-        }
+from database import get_async_db, get_async_db_direct
 
 router = APIRouter(
     prefix="/users",
@@ -42,9 +29,9 @@ router = APIRouter(
 async def get_user_list():
     """전화번호가 있는 모든 사용자 조회"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        user_list = db.query(models.UserData).filter(models.UserData.phone_number != None).all()
+        user_list = (await db.scalars(select(models.UserData).where(models.UserData.phone_number != None))).all()
         
         if not user_list:
             return JSONResponse(
@@ -69,15 +56,15 @@ async def get_user_list():
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.get("/get-all-user-list")
 async def get_all_user_list():
     """모든 사용자 조회 (전화번호 필터 없음)"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        user_list = db.query(models.UserData).all()
+        user_list = (await db.scalars(select(models.UserData))).all()
         print(f"user_list length: {len(user_list)}")
         
         if not user_list:
@@ -106,15 +93,15 @@ async def get_all_user_list():
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.get("/get-user/{user_id}")
 async def get_user(user_id: int):
     """특정 사용자 조회"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        user = db.query(models.UserData).filter(models.UserData.id == user_id).first()
+        user = await db.scalar(select(models.UserData).where(models.UserData.id == user_id))
         
         if not user:
             return JSONResponse(
@@ -138,13 +125,13 @@ async def get_user(user_id: int):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.post("/create-user")
 async def create_user(user_data: schemas.UserDataCreate):
     """사용자 생성"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         user = models.UserData(
             name=user_data.name,
@@ -158,8 +145,8 @@ async def create_user(user_data: schemas.UserDataCreate):
         )
         
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         
         user_json = user.to_json()
         
@@ -176,21 +163,21 @@ async def create_user(user_data: schemas.UserDataCreate):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.put("/update-user/{user_id}")
 async def update_user(user_id: int, user_data: schemas.UserDataUpdate):
     """사용자 정보 업데이트"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        user = db.query(models.UserData).filter(models.UserData.id == user_id).first()
+        user = await db.scalar(select(models.UserData).where(models.UserData.id == user_id))
         
         if not user: 
             return JSONResponse(
@@ -210,8 +197,8 @@ async def update_user(user_id: int, user_data: schemas.UserDataUpdate):
         user.total_point = user_data.total_point
         user.remark = user_data.remark
         
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         
         user_json = user.to_json()
         
@@ -227,21 +214,21 @@ async def update_user(user_id: int, user_data: schemas.UserDataUpdate):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.delete("/delete-user/{user_id}")
 async def delete_user(user_id: int):
     """사용자 삭제"""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
-        user = db.query(models.UserData).filter(models.UserData.id == user_id).first()
+        user = await db.scalar(select(models.UserData).where(models.UserData.id == user_id))
         
         if not user:
             return JSONResponse(
@@ -249,30 +236,30 @@ async def delete_user(user_id: int):
                 headers={"Content-Type": "application/json; charset=utf-8"}
             )
         
-        db.delete(user)
-        db.commit()
+        await db.delete(user)
+        await db.commit()
         
         return JSONResponse(
             content={"response": 200, "message": "사용자가 삭제되었습니다"},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.put("/create-guest-user/{game_id}")
 async def create_guest_user(game_id: str):
     """게임에 게스트 사용자를 생성합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 게임 조회
-        game = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+        game = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
         if not game:
             return JSONResponse(
                 content={"response": 404, "message": "게임을 찾을 수 없습니다"},
@@ -283,7 +270,7 @@ async def create_guest_user(game_id: str):
         guest_name = "guest" + str(random.randint(10000, 99999))
         # ID를 1001부터 생성하도록 설정
         guest_user = models.UserData(
-            id=1000 + (db.query(models.UserData).count()),  # 현재 사용자 수에 1001을 더하여 ID 설정
+            id=1000 + (await db.scalar(select(func.count()).select_from(models.UserData))),  # 현재 사용자 수에 1001을 더하여 ID 설정
             name=guest_name,
             uuid=str(uuid.uuid4()),  # UUID 생성
             game_join_count=1,  # 게임 참가 횟수 1로 설정
@@ -296,30 +283,14 @@ async def create_guest_user(game_id: str):
         print(f"guest_user: {guest_user.id}")
         
         db.add(guest_user)
-        db.commit()
-        db.refresh(guest_user)
+        await db.commit()
+        await db.refresh(guest_user)
         # 게임 참가자에 게스트 추가
-        game_in_player = game.game_in_player.copy() if game.game_in_player else []
-        
-        # 플레이어 데이터 구조 확인
-        player_data = {
-            "customer_id": guest_user.id,
-            "join_count": 1,  # 참가 횟수 1로 설정
-            "is_sit": True,
-            "is_addon": False
-        }
-        
-        game_in_player.append(player_data)
+        await game_player_manager.add_game_player(db, game.id, guest_user.id, join_count=1, is_sit=True, is_addon=False)
         print(f"게스트 사용자 추가: {guest_name}, ID: {guest_user.id}")
-        print(f"game_in_player: {json.dumps(game_in_player, ensure_ascii=False)}")
         
-        # 게임 데이터 업데이트
-        game.game_in_player = game_in_player
-        db.query(models.GameData).filter(models.GameData.id == game_id).update(
-            {"game_in_player": game_in_player}
-        )
-        db.commit()
-        db.refresh(game)  # 게임 데이터 새로고침
+        await db.commit()
+        await db.refresh(game)  # 게임 데이터 새로고침
         
         # 응답 데이터 준비
         user_json = guest_user.to_json()
@@ -328,15 +299,7 @@ async def create_guest_user(game_id: str):
         await main.socket_controller.register_customer_data(guest_user)
         
         # 관련 디바이스에게 변경 알림
-        table_datas = db.query(models.TableData).filter(models.TableData.game_id == game.id).all()
-        for table_data in table_datas:
-            table_connect_devices : List[models.AuthDeviceData] = db.query(models.AuthDeviceData).filter(models.AuthDeviceData.connect_table_id == table_data.id).all()
-            devices_sockets : dict[str, device_socket_manager.DeviceSocketConnection] = device_socket_manager.socket_manager._connections
-            for table_connect_device in table_connect_devices:
-                for device_socket in devices_sockets.values():
-                    if device_socket.device_uid == table_connect_device.device_uid:
-                        print(f"device_socket.device_uid : {device_socket.device_uid}")
-                        await device_socket_manager.socket_manager.handle_game_connection(device_socket.device_uid, table_data.id)
+        await game_update_scheduler.schedule(game.id, central=False)
         # 시간 포맷 변환
         # user_json["register_at"] = user_json["register_at"].isoformat() if user_json["register_at"] else None
         # user_json["last_visit_at"] = user_json["last_visit_at"].isoformat() if user_json["last_visit_at"] else None
@@ -352,19 +315,19 @@ async def create_guest_user(game_id: str):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"게스트 사용자 생성 오류: {str(e)}")
         return JSONResponse(
             content={"response": 500, "message": f"게스트 사용자 생성 중 오류 발생: {str(e)}"},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 @router.post("/add-point-for-user")
 async def add_point_for_user(body: dict):
     """사용자에게 포인트를 추가합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         user_id = body.get("user_id")
         point = int(body.get("point", 0))
@@ -376,7 +339,7 @@ async def add_point_for_user(body: dict):
             )
             
         # 사용자 조회
-        user = db.query(models.UserData).filter(models.UserData.id == user_id).first()
+        user = await db.scalar(select(models.UserData).where(models.UserData.id == user_id))
         if not user:
             return JSONResponse(
                 content={"response": 404, "message": "사용자를 찾을 수 없습니다"},
@@ -396,30 +359,30 @@ async def add_point_for_user(body: dict):
         })
         user.point_history = point_history
         
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         
         return JSONResponse(
             content={"response": 200, "message": "포인트가 추가되었습니다", "data": user.to_json()},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.get("/in-game-user-list/{game_id}")
 async def in_game_user_list(game_id: str):
     """게임에 참가 중인 사용자 목록을 조회합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 게임 조회
-        game = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+        game = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
         if not game:
             return JSONResponse(
                 content={"response": 404, "message": "게임을 찾을 수 없습니다"},
@@ -433,7 +396,7 @@ async def in_game_user_list(game_id: str):
         result = []
         for player in game_in_player:
             user_id = player.get("customer_id")
-            user = db.query(models.UserData).filter(models.UserData.id == user_id).first()
+            user = await db.scalar(select(models.UserData).where(models.UserData.id == user_id))
             if user:
                 user_info = user.to_json()
                 user_info.update(player)
@@ -449,16 +412,16 @@ async def in_game_user_list(game_id: str):
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.get("/update-user-in-game-sit-status")
 async def update_user_in_game_sit_status(game_id: int, user_id: int, is_sit: bool):
     """게임 참가자의 착석 상태를 업데이트합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 게임 조회
-        game = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+        game = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
         if not game:
             return JSONResponse(
                 content={"response": 404, "message": "게임을 찾을 수 없습니다"},
@@ -466,77 +429,43 @@ async def update_user_in_game_sit_status(game_id: int, user_id: int, is_sit: boo
             )
             
         # 사용자 조회
-        user = db.query(models.UserData).filter(models.UserData.id == user_id).first()
+        user = await db.scalar(select(models.UserData).where(models.UserData.id == user_id))
         if not user:
             return JSONResponse(
                 content={"response": 404, "message": "사용자를 찾을 수 없습니다"},
                 headers={"Content-Type": "application/json; charset=utf-8"}
             )
             
-        # 게임 참가자 목록
-        game_in_player = game.game_in_player.copy() if game.game_in_player else []
-        
-        # 참가자 목록에서 해당 사용자 찾기
-        user_found = False
-        for player in game_in_player:
-            if player.get("customer_id") == user_id:
-                player["is_sit"] = is_sit
-                user_found = True
-                break
-                
-        # 참가자 목록에 사용자가 없으면 추가
-        if not user_found:
-            game_in_player.append({
-                "customer_id": user_id,
-                "join_count": 0,
-                "is_sit": is_sit,
-                "is_addon": False
-            })
-            
-        # 게임 참가자 목록 업데이트
-        game.game_in_player = game_in_player
+        # 참가자 한 행만 갱신 (없으면 추가)
+        await game_player_manager.set_player_sit(db, game_id, user_id, is_sit)
         
-        db.query(models.GameData).filter(models.GameData.id == game_id).update(
-            {"game_in_player": game_in_player}
-        )
+        await db.commit()
+        await db.refresh(game)
         
-        db.commit()
-        
-        import main
-        await main.socket_controller.update_game_data(game)
-        
-        # 관련 디바이스에게 변경 알림
-        table_datas : List[models.TableData] = db.query(models.TableData).filter(models.TableData.game_id == game.id).all()
-        for table_data in table_datas:
-            table_connect_devices : List[models.AuthDeviceData] = db.query(models.AuthDeviceData).filter(models.AuthDeviceData.connect_table_id == table_data.id).all()
-            devices_sockets : dict[str, device_socket_manager.DeviceSocketConnection] = device_socket_manager.socket_manager._connections
-            for table_connect_device in table_connect_devices:
-                for device_socket in devices_sockets.values():
-                    if device_socket.device_uid == table_connect_device.device_uid:
-                        print(f"device_socket.device_uid : {device_socket.device_uid}")
-                        await device_socket_manager.socket_manager.handle_game_connection(device_socket.device_uid, table_data.id)
+        # 중앙 서버와 관련 디바이스에 변경 알림 (짧은 시간 안의 변경은 한 번으로 병합)
+        await game_update_scheduler.schedule(game.id)
         
         return JSONResponse(
             content={"response": 200, "message": "착석 상태가 업데이트되었습니다"},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.put("/update-user-in-game-sit-status")
 async def update_user_in_game_sit_status(game_id: int, user_id: int, is_sit: bool):
     """게임 참가자의 착석 상태를 업데이트합니다."""
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 게임 조회
-        game = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+        game = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
         if not game:
             return JSONResponse(
                 content={"response": 404, "message": "게임을 찾을 수 없습니다"},
@@ -544,68 +473,34 @@ async def update_user_in_game_sit_status(game_id: int, user_id: int, is_sit: boo
             )
             
         # 사용자 조회
-        user = db.query(models.UserData).filter(models.UserData.id == user_id).first()
+        user = await db.scalar(select(models.UserData).where(models.UserData.id == user_id))
         if not user:
             return JSONResponse(
                 content={"response": 404, "message": "사용자를 찾을 수 없습니다"},
                 headers={"Content-Type": "application/json; charset=utf-8"}
             )
             
-        # 게임 참가자 목록
-        game_in_player = game.game_in_player.copy() if game.game_in_player else []
-        
-        # 참가자 목록에서 해당 사용자 찾기
-        user_found = False
-        for player in game_in_player:
-            if player.get("customer_id") == user_id:
-                player["is_sit"] = is_sit
-                user_found = True
-                break
-                
-        # 참가자 목록에 사용자가 없으면 추가
-        if not user_found:
-            game_in_player.append({
-                "customer_id": user_id,
-                "join_count": 0,
-                "is_sit": is_sit,
-                "is_addon": False
-            })
-            
-        # 게임 참가자 목록 업데이트
-        game.game_in_player = game_in_player
+        # 참가자 한 행만 갱신 (없으면 추가)
+        await game_player_manager.set_player_sit(db, game_id, user_id, is_sit)
         
-        db.query(models.GameData).filter(models.GameData.id == game_id).update(
-            {"game_in_player": game_in_player}
-        )
-        
-        db.commit()
+        await db.commit()
+        await db.refresh(game)
         
-        import main
-        await main.socket_controller.update_game_data(game)
-        
-        # 관련 디바이스에게 변경 알림
-        table_datas : List[models.TableData] = db.query(models.TableData).filter(models.TableData.game_id == game.id).all()
-        for table_data in table_datas:
-            table_connect_devices : List[models.AuthDeviceData] = db.query(models.AuthDeviceData).filter(models.AuthDeviceData.connect_table_id == table_data.id).all()
-            devices_sockets : dict[str, device_socket_manager.DeviceSocketConnection] = device_socket_manager.socket_manager._connections
-            for table_connect_device in table_connect_devices:
-                for device_socket in devices_sockets.values():
-                    if device_socket.device_uid == table_connect_device.device_uid:
-                        print(f"device_socket.device_uid : {device_socket.device_uid}")
-                        await device_socket_manager.socket_manager.handle_game_connection(device_socket.device_uid, table_data.id)
+        # 중앙 서버와 관련 디바이스에 변경 알림 (짧은 시간 안의 변경은 한 번으로 병합)
+        await game_update_scheduler.schedule(game.id)
         
         return JSONResponse(
             content={"response": 200, "message": "착석 상태가 업데이트되었습니다"},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.put("/update-user-in-game-join-count")
 async def update_user_in_game_join_count(game_id: int, user_id: int, is_purchase: bool = False):
@@ -613,63 +508,37 @@ async def update_user_in_game_join_count(game_id: int, user_id: int, is_purchase
     사용자의 게임 참여 횟수를 업데이트합니다.
     """
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 게임 조회
-        game = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+        game = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
         if not game:
             return JSONResponse(
                 content={"response": 404, "message": "게임을 찾을 수 없습니다"},
                 headers={"Content-Type": "application/json; charset=utf-8"}
             )
         
-        # 게임 참여자 목록 업데이트
-        game_in_player = game.game_in_player.copy() if game.game_in_player else []
-        is_found = False
+        # 게임 참여 횟수 증가 (참가자가 없으면 추가)
+        await game_player_manager.increase_join_count(db, game_id, user_id)
         
-        for player in game_in_player:
-            if player.get("customer_id") == user_id:
-                player["join_count"] += 1
-                is_found = True
-                
-        if not is_found:
-            add_in_game_user = InGameUser(customer_id=user_id, join_count=1, is_sit=True, is_addon=False).to_json()
-            game_in_player.append(add_in_game_user)
-                
-        # 변경사항 저장
-        db.query(models.GameData).filter(models.GameData.id == game_id).update(
-            {"game_in_player": game_in_player}
-        )
+        await db.commit()
+        await db.refresh(game)
         
-        db.commit()
-        db.refresh(game)
-        
-        import main
-        await main.socket_controller.update_game_data(game)
-        
-        # 관련 디바이스에게 변경 알림
-        table_datas : List[models.TableData] = db.query(models.TableData).filter(models.TableData.game_id == game.id).all()
-        for table_data in table_datas:
-            table_connect_devices : List[models.AuthDeviceData] = db.query(models.AuthDeviceData).filter(models.AuthDeviceData.connect_table_id == table_data.id).all()
-            devices_sockets : dict[str, device_socket_manager.DeviceSocketConnection] = device_socket_manager.socket_manager._connections
-            for table_connect_device in table_connect_devices:
-                for device_socket in devices_sockets.values():
-                    if device_socket.device_uid == table_connect_device.device_uid:
-                        print(f"device_socket.device_uid : {device_socket.device_uid}")
-                        await device_socket_manager.socket_manager.handle_game_connection(device_socket.device_uid, table_data.id)
+        # 중앙 서버와 관련 디바이스에 변경 알림 (짧은 시간 안의 변경은 한 번으로 병합)
+        await game_update_scheduler.schedule(game.id)
         
         return JSONResponse(
             content={"response": 200, "message": "게임 참여 횟수가 업데이트되었습니다"},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
         
 
 @router.get("/update-user-in-game-join-count")
@@ -678,81 +547,48 @@ async def update_user_in_game_join_count(game_id: int, user_id: int, is_purchase
     사용자의 게임 참여 횟수를 업데이트합니다.
     """
     # 직접 세션 가져오기
-    db = get_db_direct()
+    db = get_async_db_direct()
     try:
         # 게임 조회
-        game = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+        game = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
         if not game:
             return JSONResponse(
                 content={"response": 404, "message": "게임을 찾을 수 없습니다"},
                 headers={"Content-Type": "application/json; charset=utf-8"}
             )
         
-        # 게임 참여자 목록 업데이트
-        game_in_player = game.game_in_player.copy() if game.game_in_player else []
-        is_found = False
+        # 게임 참여 횟수 증가 (참가자가 없으면 추가)
+        await game_player_manager.increase_join_count(db, game_id, user_id)
         
-        for player in game_in_player:
-            if player.get("customer_id") == user_id:
-                player["join_count"] += 1
-                is_found = True
-                
-        if not is_found:
-            add_in_game_user = InGameUser(customer_id=user_id, join_count=1, is_sit=True, is_addon=False).to_json()
-            game_in_player.append(add_in_game_user)
-                
-        # 변경사항 저장
-        db.query(models.GameData).filter(models.GameData.id == game_id).update(
-            {"game_in_player": game_in_player}
-        )
+        await db.commit()
+        await db.refresh(game)
         
-        db.commit()
-        db.refresh(game)
-        
-        import main
-        await main.socket_controller.update_game_data(game)
-        
-        # 관련 디바이스에게 변경 알림
-        table_datas : List[models.TableData] = db.query(models.TableData).filter(models.TableData.game_id == game.id).all()
-        for table_data in table_datas:
-            table_connect_devices : List[models.AuthDeviceData] = db.query(models.AuthDeviceData).filter(models.AuthDeviceData.connect_table_id == table_data.id).all()
-            devices_sockets : dict[str, device_socket_manager.DeviceSocketConnection] = device_socket_manager.socket_manager._connections
-            for table_connect_device in table_connect_devices:
-                for device_socket in devices_sockets.values():
-                    if device_socket.device_uid == table_connect_device.device_uid:
-                        print(f"device_socket.device_uid : {device_socket.device_uid}")
-                        await device_socket_manager.socket_manager.handle_game_connection(device_socket.device_uid, table_data.id)
+        # 중앙 서버와 관련 디바이스에 변경 알림 (짧은 시간 안의 변경은 한 번으로 병합)
+        await game_update_scheduler.schedule(game.id)
         
         return JSONResponse(
             content={"response": 200, "message": "게임 참여 횟수가 업데이트되었습니다"},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             content={"response": 500, "message": str(e)},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     finally:
-        db.close()
+        await db.close()
 
 @router.put("/update-user-rebuy-in")
-async def update_user_rebuy_in(game_id: int, user_id: int, db: Session = Depends(get_db_direct)):
-    game = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+async def update_user_rebuy_in(game_id: int, user_id: int, db: AsyncSession = Depends(get_async_db)):
+    game = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
     if not game:
         return JSONResponse(
             content={"response": 404, "message": "게임을 찾을 수 없습니다"},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     
-    game_in_player = game.game_in_player.copy() if game.game_in_player else []
-    for player in game_in_player:
-        if player.get("customer_id") == user_id:
-            player["join_count"] += 1
-            
-    db.query(models.GameData).filter(models.GameData.id == game_id).update(
-        {"game_in_player": game_in_player}
-    )
+    await game_player_manager.increase_join_count(db, game_id, user_id, add_if_missing=False)
     
     #결제 내역에 남기기
     purchase_data = models.PurchaseData(
@@ -767,19 +603,11 @@ async def update_user_rebuy_in(game_id: int, user_id: int, db: Session = Depends
     )
     db.add(purchase_data)
     
-    db.commit()
-    db.refresh(game)
-    
-    import main
+    await db.commit()
+    await db.refresh(game)
     
-    await main.socket_controller.update_game_data(game)
-
-    # 테이블에 연결된 디바이스에 업데이트된 게임 정보 전송
-    tables : List[models.TableData] = db.query(models.TableData).filter(models.TableData.game_id == game_id).all()
-    for table in tables:
-        devices = db.query(models.AuthDeviceData).filter(models.AuthDeviceData.connect_table_id == table.id).all()
-        for device in devices:
-            await device_socket_manager.socket_manager.handle_game_connection(device.device_uid, table.id)   
+    # 중앙 서버와 관련 디바이스에 변경 알림 (짧은 시간 안의 변경은 한 번으로 병합)
+    await game_update_scheduler.schedule(game_id)
 
     return JSONResponse(
         content={"response": 200, "message": "게임 플레이어 리버이 인 상태가 업데이트되었습니다"},
@@ -788,64 +616,41 @@ async def update_user_rebuy_in(game_id: int, user_id: int, db: Session = Depends
 
 @router.get("/update-user-rebuy-in-order")
 async def update_user_rebuy_in_order(game_id: int, user_id: int):
-    db = get_db_direct()
-    game = db.query(models.GameData).filter(models.GameData.id == game_id).first()
-    if not game:
-        return JSONResponse(
-            content={"response": 404, "message": "게임을 찾을 수 없습니다"},
-            headers={"Content-Type": "application/json; charset=utf-8"}
-        )
-    
-    game_in_player = game.game_in_player.copy() if game.game_in_player else []
-    for player in game_in_player:
-        if player.get("customer_id") == user_id:
-            player["join_count"] += 1
-
-    db.query(models.GameData).filter(models.GameData.id == game_id).update(
-        {"game_in_player": game_in_player}
-    )
-    
-    db.commit()
-    db.refresh(game)
+    db = get_async_db_direct()
+    try:
+        game = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
+        if not game:
+            return JSONResponse(
+                content={"response": 404, "message": "게임을 찾을 수 없습니다"},
+                headers={"Content-Type": "application/json; charset=utf-8"}
+            )
+        
+        await game_player_manager.increase_join_count(db, game_id, user_id, add_if_missing=False)
+        
+        await db.commit()
+        await db.refresh(game)
 
-    import main
-    await main.socket_controller.update_game_data(game)
-    
-    # 관련 디바이스에게 변경 알림
-    table_datas = db.query(models.TableData).filter(models.TableData.game_id == game.id).all()
-    for table_data in table_datas:
-        table_connect_devices = db.query(models.AuthDeviceData).filter(models.AuthDeviceData.connect_table_id == table_data.id).all()
-        devices_sockets : dict[str, device_socket_manager.DeviceSocketConnection] = device_socket_manager.socket_manager._connections
-        for table_connect_device in table_connect_devices:
-            for device_socket in devices_sockets.values():
-                if device_socket.device_uid == table_connect_device.device_uid:
-                    print(f"device_socket.device_uid : {device_socket.device_uid}")
-                    await device_socket_manager.socket_manager.handle_game_connection(device_socket.device_uid, table_data.id)
+        # 중앙 서버와 관련 디바이스에 변경 알림 (짧은 시간 안의 변경은 한 번으로 병합)
+        await game_update_scheduler.schedule(game.id)
 
 
-    return JSONResponse(
-        content={"response": 200, "message": "게임 플레이어 리버이 인 순서가 업데이트되었습니다"},
-        headers={"Content-Type": "application/json; charset=utf-8"}
-    )
+        return JSONResponse(
+            content={"response": 200, "message": "게임 플레이어 리버이 인 순서가 업데이트되었습니다"},
+            headers={"Content-Type": "application/json; charset=utf-8"}
+        )
+    finally:
+        await db.close()
     
 @router.put("/update-user-in-game-addon")
-async def update_user_in_game_addon(game_id: int, user_id: int, is_addon: bool, db: Session = Depends(get_db)):
-    game = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+async def update_user_in_game_addon(game_id: int, user_id: int, is_addon: bool, db: AsyncSession = Depends(get_async_db)):
+    game = await db.scalar(select(models.GameData).where(models.GameData.id == game_id))
     if not game:
         return JSONResponse(
             content={"response": 404, "message": "게임을 찾을 수 없습니다"},
             headers={"Content-Type": "application/json; charset=utf-8"}
         )
     
-    game_in_player = game.game_in_player.copy() if game.game_in_player else []
-    for player in game_in_player:
-        if player.get("customer_id") == user_id:
-            player["is_addon"] = is_addon
-            
-    # 명시적으로 DB 업데이트 쿼리 실행
-    db.query(models.GameData).filter(models.GameData.id == game_id).update(
-        {"game_in_player": game_in_player}
-    )
+    await game_player_manager.set_player_addon(db, game_id, user_id, is_addon)
     
     #결제 내역에 남기기
     purchase_data = models.PurchaseData(
@@ -860,18 +665,11 @@ async def update_user_in_game_addon(game_id: int, user_id: int, is_addon: bool,
     )
     db.add(purchase_data)
     
-    db.commit()
-    db.refresh(game)
-    
-    import main
-    await main.socket_controller.update_game_data(game)
+    await db.commit()
+    await db.refresh(game)
     
-    # 테이블에 연결된 디바이스에 업데이트된 게임 정보 전송
-    tables : List[models.TableData] = db.query(models.TableData).filter(models.TableData.game_id == game_id).all()
-    for table in tables:
-        devices = db.query(models.AuthDeviceData).filter(models.AuthDeviceData.connect_table_id == table.id).all()
-        for device in devices:
-            await device_socket_manager.socket_manager.handle_game_connection(device.device_uid, table.id)
+    # 중앙 서버와 관련 디바이스에 변경 알림 (짧은 시간 안의 변경은 한 번으로 병합)
+    await game_update_scheduler.schedule(game_id)
 
     return JSONResponse(
         content={"response": 200, "message": "게임 플레이어 애드온 상태가 업데이트되었습니다"},
@@ -879,8 +677,8 @@ async def update_user_in_game_addon(game_id: int, user_id: int, is_addon: bool,
     )
 
 @router.put("/update-user-data")
-async def update_user_data(user_data: schemas.UserDataUpdate, db: Session = Depends(get_db_direct)):
-    user = db.query(models.UserData).filter(models.UserData.id == user_data.id).first()
+async def update_user_data(user_data: schemas.UserDataUpdate, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(models.UserData).where(models.UserData.id == user_data.id))
     
     if not user:
         return JSONResponse(
@@ -906,8 +704,8 @@ async def update_user_data(user_data: schemas.UserDataUpdate, db: Session = Depe
     print(f"user.last_visit_at: {user.last_visit_at}")
     print(f"user.remark: {user.remark}")
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     import main
     await main.socket_controller.register_customer_data(user)
@@ -0,0 +1,219 @@
+"""
+매장 DB SQLite PRAGMA 프로파일 벤치마크
+
+기존 연결 설정(encoding만 지정, rollback journal + synchronous=FULL)과
+database.DEFAULT_SQLITE_PRAGMAS(WAL, synchronous=NORMAL, mmap, cache ...)를
+구매 등록 / 착석 상태 변경 워크로드에서 비교합니다.
+
+각 워크로드는 쓰기 스레드 1개가 커밋 단위로 쓰는 동안 읽기 스레드 여러 개가
+리포트 조회를 반복하며, 쓰기 처리량과 동시 읽기 처리량, 잠금 오류 수를 측정합니다.
+
+실행:
+    python benchmarks/sqlite_pragma_benchmark.py --writes 500 --readers 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import database
+import models
+
+LEGACY_PROFILE = {name: None for name in database.DEFAULT_SQLITE_PRAGMAS if name != "encoding"}
+
+PROFILES = {
+    "legacy": LEGACY_PROFILE,
+    "tuned": {},
+}
+
+
+def create_store(profile, directory):
+    manager = database.DatabaseManager(pragma_profile=profile, db_directory=directory)
+    engine = manager.create_engine_for_store(1)
+    database.Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def seed(Session, player_count=200, purchase_count=5000):
+    db = Session()
+    try:
+        now = datetime.now()
+        game = models.GameData(
+            game_code="10000",
+            title="benchmark",
+            game_status="in-progress",
+            game_in_player=[
+                {"customer_id": customer_id, "join_count": 1, "is_sit": True, "is_addon": False}
+                for customer_id in range(1, player_count + 1)
+            ],
+            table_connect_log=[],
+            time_table_data=[],
+        )
+        db.add(game)
+        db.flush()
+        db.add_all([
+            models.PurchaseData(
+                payment_type="LOCAL_PAY",
+                purchase_type="BUYIN",
+                game_id=game.id,
+                customer_id=index % player_count + 1,
+                uuid=str(uuid.uuid4()),
+                purchased_at=now - timedelta(minutes=index),
+                item="BUYIN",
+                payment_status="SUCCESS",
+                status="SUCCESS",
+                price=10000,
+                used_points=0,
+            )
+            for index in range(purchase_count)
+        ])
+        db.commit()
+        return game.id, player_count
+    finally:
+        db.close()
+
+
+def purchase_write(Session, game_id, index):
+    db = Session()
+    try:
+        db.add(models.PurchaseData(
+            payment_type="LOCAL_PAY",
+            purchase_type="BUYIN",
+            game_id=game_id,
+            customer_id=index,
+            uuid=str(uuid.uuid4()),
+            purchased_at=datetime.now(),
+            item="BUYIN",
+            payment_status="SUCCESS",
+            status="SUCCESS",
+            price=10000,
+            used_points=0,
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def purchase_read(Session, game_id):
+    db = Session()
+    try:
+        start = datetime.now() - timedelta(days=1)
+        db.scalar(select(func.count()).select_from(models.PurchaseData).where(
+            models.PurchaseData.purchased_at >= start
+        ))
+        db.scalars(select(models.PurchaseData).where(
+            models.PurchaseData.purchased_at >= start,
+            models.PurchaseData.status == "SUCCESS"
+        ).order_by(models.PurchaseData.purchased_at.desc()).limit(20)).all()
+    finally:
+        db.close()
+
+
+def seat_write(Session, game_id, index):
+    db = Session()
+    try:
+        game = db.get(models.GameData, game_id)
+        players = [dict(player) for player in game.game_in_player]
+        player = players[index % len(players)]
+        player["is_sit"] = not player["is_sit"]
+        game.game_in_player = players
+        db.commit()
+    finally:
+        db.close()
+
+
+def seat_read(Session, game_id):
+    db = Session()
+    try:
+        game = db.get(models.GameData, game_id)
+        game.to_json()
+    finally:
+        db.close()
+
+
+WORKLOADS = {
+    "purchase": (purchase_write, purchase_read),
+    "seat_update": (seat_write, seat_read),
+}
+
+
+def run_workload(Session, game_id, writer, reader, writes, readers):
+    stop = threading.Event()
+    read_counts = [0] * readers
+    errors = {"locked": 0}
+    errors_lock = threading.Lock()
+
+    def read_loop(slot):
+        while not stop.is_set():
+            try:
+                reader(Session, game_id)
+                read_counts[slot] += 1
+            except OperationalError:
+                with errors_lock:
+                    errors["locked"] += 1
+
+    threads = [threading.Thread(target=read_loop, args=(slot,)) for slot in range(readers)]
+    for thread in threads:
+        thread.start()
+
+    started = time.perf_counter()
+    completed = 0
+    for index in range(writes):
+        try:
+            writer(Session, game_id, index)
+            completed += 1
+        except OperationalError:
+            with errors_lock:
+                errors["locked"] += 1
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "writes_per_sec": completed / elapsed,
+        "reads_per_sec": sum(read_counts) / elapsed,
+        "lock_errors": errors["locked"],
+        "elapsed": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite PRAGMA profile benchmark")
+    parser.add_argument("--writes", type=int, default=500, help="워크로드별 쓰기(커밋) 횟수")
+    parser.add_argument("--readers", type=int, default=4, help="동시 읽기 스레드 수")
+    args = parser.parse_args()
+
+    results = {}
+    for profile_name, profile in PROFILES.items():
+        with tempfile.TemporaryDirectory() as directory:
+            engine, Session = create_store(profile, directory)
+            game_id, _ = seed(Session)
+            for workload_name, (writer, reader) in WORKLOADS.items():
+                results[(workload_name, profile_name)] = run_workload(
+                    Session, game_id, writer, reader, args.writes, args.readers
+                )
+            engine.dispose()
+
+    print(f"{'workload':<12} {'profile':<8} {'writes/s':>10} {'reads/s':>10} {'locked':>7} {'elapsed':>8}")
+    for (workload_name, profile_name), result in results.items():
+        print(
+            f"{workload_name:<12} {profile_name:<8} "
+            f"{result['writes_per_sec']:>10.1f} {result['reads_per_sec']:>10.1f} "
+            f"{result['lock_errors']:>7} {result['elapsed']:>7.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,24 @@
 import asyncio
 from datetime import datetime
+import hashlib
 import uuid
 import certifi
+import random
 import websockets
+import websockets.exceptions
 import aiohttp
 import json
 import logging
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import groupby
 from pathlib import Path
-from database import get_db_direct
+from database import db_manager, get_current_store_id, set_current_store_id, store_context
 from models import PurchaseData
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 import models
 import ssl
 from auth_manager import AuthManager
@@ -29,69 +38,599 @@ ssl_context.maximum_version = ssl.TLSVersion.TLSv1_3
 ssl_context.check_hostname = False
 ssl_context.verify_mode = ssl.CERT_NONE
 
+# 오프라인 메시지 저널 설정
+JOURNAL_FSYNC_INTERVAL = 0.5  # 마지막 기록 후 fsync까지 최대 지연 (초)
+JOURNAL_FSYNC_BATCH = 32  # 이 개수만큼 쌓이면 바로 fsync
+JOURNAL_ACK_BATCH = 50  # 재전송 중 ack 오프셋을 기록하는 간격 (메시지 수)
+JOURNAL_COMPACT_BYTES = 256 * 1024  # ack된 앞부분이 이보다 크고 파일의 절반 이상이면 압축
+# 재전송 시 엔티티 ID별로 마지막 내용만 보내는 상태 메시지 (dataType -> 목록 메시지 여부)
+# 그 외 메시지(LocalPurchaseLog, SavePoint, Awarding 등)는 순서대로 모두 보냅니다.
+OUTBOX_STATE_TYPES = {
+    "GameData": False,
+    "RegisterCustomer": False,
+    "PresetData": False,
+    "TableData": True,
+}
+
+# 중앙 서버 재연결 백오프 (초) - 시도 횟수 제한 없이 RECONNECT_MAX_DELAY까지 늘어나며 절반 범위에서 지터 적용
+RECONNECT_BASE_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+# WebSocket 연결 수립 제한 시간 (초)
+CONNECT_TIMEOUT = 10
+# Pusher 프로토콜 기본 활동 제한 시간 (초) - 이 시간 동안 아무 메시지도 없으면 pusher:ping 전송
+PUSHER_ACTIVITY_TIMEOUT = 120
+# pusher:ping 후 응답을 기다리는 시간 (초) - 응답이 없으면 반쯤 끊긴 연결로 보고 다시 연결
+PUSHER_PONG_TIMEOUT = 30
+
+# 중앙 서버 HTTP 클라이언트 (컨트롤러가 하나를 계속 재사용 - 요청마다 TCP/TLS 연결을 새로 맺지 않음)
+HTTP_TOTAL_TIMEOUT = 15  # 요청 전체 제한 시간 (초)
+HTTP_CONNECT_TIMEOUT = 5  # 연결 수립 제한 시간 (초)
+HTTP_POOL_LIMIT = 20  # 동시 연결 수
+HTTP_DNS_CACHE_TTL = 300  # DNS 조회 결과 보관 시간 (초)
+HTTP_KEEPALIVE_TIMEOUT = 60  # 사용하지 않는 연결을 열어 두는 시간 (초)
+# 중앙 서버 상태 확인 캐시 (초)
+HEALTH_CHECK_TIMEOUT = 3  # /api/health 요청 제한 시간
+HEALTH_ONLINE_TTL = 30  # 정상 판정 유지 시간
+HEALTH_OPEN_BASE = 5  # 비정상 판정 후 다시 확인할 때까지 대기 (연속 실패마다 2배)
+HEALTH_OPEN_MAX = 60
+
+# 중앙 서버 송신 대기열 최대 길이 (넘치면 저널에 바로 기록)
+OUTBOUND_QUEUE_SIZE = 1000
+# 로그아웃 시 송신 대기열이 비워지기를 기다리는 최대 시간 (초)
+OUTBOUND_DRAIN_TIMEOUT = 5
+
+def compact_outbox(messages: list) -> list:
+    """
+    재전송할 저널 메시지 압축: [(오프셋, 메시지 데이터)] -> 보낼 메시지만 남긴 같은 형식의 목록
+    
+    상태 메시지는 엔티티(dataType, id)가 처음 나온 자리에 마지막 내용을 넣고 이후 메시지는 뺍니다.
+    처음 자리를 유지하므로 오프라인 중 만든 게임/고객이 그 ID를 참조하는 구매 기록보다 먼저 전송됩니다.
+    목록 메시지(TableData)는 항목 단위로 같은 방식으로 합치고, 항목이 모두 빠진 메시지는 보내지 않습니다.
+    """
+    latest = {}
+    for _, message_data in messages:
+        data_type, payload = _outbox_payload(message_data)
+        if data_type is None:
+            continue
+        for item in (payload if OUTBOX_STATE_TYPES[data_type] else [payload]):
+            if isinstance(item, dict) and item.get('id') is not None:
+                latest[(data_type, item['id'])] = item
+    
+    compacted = []
+    emitted = set()
+    for offset, message_data in messages:
+        data_type, payload = _outbox_payload(message_data)
+        if data_type is None:
+            compacted.append((offset, message_data))
+            continue
+        items = []
+        for item in (payload if OUTBOX_STATE_TYPES[data_type] else [payload]):
+            key = (data_type, item.get('id')) if isinstance(item, dict) else None
+            if key is None or key[1] is None:
+                items.append(item)
+            elif key not in emitted:
+                emitted.add(key)
+                items.append(latest[key])
+        if not items:
+            continue
+        message = message_data['message']
+        compacted.append((offset, {
+            **message_data,
+            'message': {**message, 'data': {**message['data'], 'data': items if OUTBOX_STATE_TYPES[data_type] else items[0]}},
+        }))
+    return compacted
+
+def _outbox_payload(message_data: dict):
+    """상태 메시지면 (dataType, 내용), 아니면 (None, None)"""
+    try:
+        data = message_data['message']['data']
+        data_type = data['dataType']
+    except (KeyError, TypeError):
+        return None, None
+    if data_type not in OUTBOX_STATE_TYPES:
+        return None, None
+    payload = data.get('data')
+    if OUTBOX_STATE_TYPES[data_type] != isinstance(payload, list):
+        return None, None
+    return data_type, payload
+
+class CentralHealthBreaker:
+    """
+    중앙 서버 상태 확인 결과 캐시 (서킷 브레이커)
+
+    closed    : 정상 판정 - HEALTH_ONLINE_TTL초 동안 다시 확인하지 않음
+    open      : 비정상 판정 - 재확인 시각 전까지 요청 없이 바로 오프라인으로 판정
+                (연속 실패마다 대기 시간 2배, 최대 HEALTH_OPEN_MAX초)
+    half-open : 재확인 시각이 지나 실제로 한 번 확인하는 중
+
+    다른 중앙 서버 호출이 응답을 받거나 연결에 실패해도 record_success/record_failure로 판정을 갱신합니다.
+    """
+    def __init__(self):
+        self.state = "unknown"
+        self.checked_at = None
+        self.retry_at = None
+        self.consecutive_failures = 0
+        self.probe_count = 0
+        self.cached_count = 0
+        self.last_error = None
+        self._lock: asyncio.Lock = None
+
+    def cached_verdict(self):
+        """캐시된 판정 (True: 온라인, False: 오프라인, None: 다시 확인 필요)"""
+        now = datetime.now()
+        if self.state == "closed" and now - self.checked_at < timedelta(seconds=HEALTH_ONLINE_TTL):
+            return True
+        if self.state == "open" and now < self.retry_at:
+            return False
+        return None
+
+    async def check(self, probe) -> bool:
+        """캐시된 판정이 있으면 바로 반환하고, 없으면 probe()로 한 번만 확인 (동시 호출은 결과 공유)"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            verdict = self.cached_verdict()
+            if verdict is not None:
+                self.cached_count += 1
+                return verdict
+            if self.state == "open":
+                self.state = "half-open"
+            self.probe_count += 1
+            try:
+                online = await probe()
+            except Exception as e:
+                self.record_failure(e)
+                return False
+            if online:
+                self.record_success()
+            else:
+                self.record_failure('상태 확인 응답 비정상')
+            return online
+
+    def record_success(self):
+        self.state = "closed"
+        self.checked_at = datetime.now()
+        self.retry_at = None
+        self.consecutive_failures = 0
+
+    def record_failure(self, error=None):
+        self.consecutive_failures += 1
+        delay = min(HEALTH_OPEN_BASE * 2 ** (self.consecutive_failures - 1), HEALTH_OPEN_MAX)
+        self.state = "open"
+        self.checked_at = datetime.now()
+        self.retry_at = self.checked_at + timedelta(seconds=delay)
+        if error is not None:
+            self.last_error = str(error) or type(error).__name__
+
+    def get_stats(self) -> dict:
+        return {
+            "state": self.state,
+            "checked_at": self.checked_at.isoformat() if self.checked_at else None,
+            "retry_at": self.retry_at.isoformat() if self.retry_at else None,
+            "consecutive_failures": self.consecutive_failures,
+            "probes": self.probe_count,
+            "cached": self.cached_count,
+            "last_error": self.last_error,
+        }
+
 class MessageQueueManager:
-    """메시지 큐를 관리하는 클래스"""
+    """
+    오프라인 메시지 큐 (테넌트별 추가 전용 JSONL 저널)
+    
+    queue_{tenant}.jsonl : 메시지 한 줄씩 추가만 함 (저장할 때마다 파일 전체를 다시 쓰지 않음)
+    queue_{tenant}.ack   : 전송 완료된 위치(바이트 오프셋) - 이 위치 이후가 미전송 메시지
+    
+    기록은 바로 flush하므로 프로세스가 죽어도 유지되고, fsync는 JOURNAL_FSYNC_BATCH개 또는
+    JOURNAL_FSYNC_INTERVAL초마다 모아서 합니다. 기록 도중 끊긴 마지막 줄은 읽을 때 무시하고
+    다음에 파일을 열 때 잘라냅니다.
+    
+    압축/삭제로 저널 파일이 바뀌면 세대 번호가 올라갑니다. read_pending_batch()로 받은 오프셋은
+    같은 세대에서만 유효하므로 ack()에 세대를 함께 넘기면 이전 파일 기준 오프셋은 무시됩니다.
+    """
     def __init__(self, store_path: str = None):
         self.store_path = store_path or os.path.join(os.path.expanduser('~'), '.dealer_desk', f'message_queue')
         self.ensure_store_directory()
+        # 테넌트별 열린 저널 파일과 fsync 대기 상태
+        self._journals = {}
+        self._unsynced = {}
+        self._sync_handles = {}
+        # 테넌트별 저널 파일 세대 (압축/삭제 시 증가)
+        self._generations = {}
+        # 압축은 별도 스레드에서 실행되므로 저널 파일 교체와 기록을 직렬화
+        self._lock = threading.RLock()
         
     def ensure_store_directory(self):
         """저장소 디렉토리가 존재하는지 확인하고 없으면 생성"""
         Path(self.store_path).mkdir(parents=True, exist_ok=True)
         
     def get_queue_file_path(self, tenant_id: str) -> str:
-        """테넌트별 큐 파일 경로 반환"""
+        """테넌트별 큐 저널 파일 경로 반환"""
+        return os.path.join(self.store_path, f'queue_{tenant_id}.jsonl')
+    
+    def get_ack_file_path(self, tenant_id: str) -> str:
+        return os.path.join(self.store_path, f'queue_{tenant_id}.ack')
+    
+    def get_legacy_queue_file_path(self, tenant_id: str) -> str:
+        """이전 버전의 JSON 배열 큐 파일 경로"""
         return os.path.join(self.store_path, f'queue_{tenant_id}.json')
+    
+    def _open_journal(self, tenant_id: str):
+        journal = self._journals.get(tenant_id)
+        if journal is not None:
+            return journal
+        file_path = self.get_queue_file_path(tenant_id)
+        # 기록 도중 끊긴 마지막 줄 정리 (다음 기록과 한 줄로 붙지 않도록)
+        if os.path.exists(file_path):
+            with open(file_path, 'rb+') as f:
+                data = f.read()
+                if data and not data.endswith(b'\n'):
+                    f.truncate(data.rfind(b'\n') + 1)
+                    logger.warning(f'큐 저널의 불완전한 마지막 기록을 제거했습니다: {file_path}')
+        journal = self._journals[tenant_id] = open(file_path, 'ab')
+        self._migrate_legacy_queue(tenant_id, journal)
+        return journal
+    
+    def _migrate_legacy_queue(self, tenant_id: str, journal) -> None:
+        """이전 버전 JSON 큐 파일이 있으면 저널로 옮김"""
+        legacy_path = self.get_legacy_queue_file_path(tenant_id)
+        if not os.path.exists(legacy_path):
+            return
+        try:
+            with open(legacy_path, 'r') as f:
+                messages = json.load(f)
+            for message_data in messages:
+                journal.write(self._encode(message_data))
+            journal.flush()
+            os.fsync(journal.fileno())
+            os.remove(legacy_path)
+            logger.info(f'이전 큐 파일의 메시지 {len(messages)}개를 저널로 옮겼습니다: {legacy_path}')
+        except Exception as e:
+            logger.error(f'이전 큐 파일 이전 중 에러 발생: {e}')
+    
+    @staticmethod
+    def _encode(message_data: dict) -> bytes:
+        return (json.dumps(message_data, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
         
     def save_message(self, tenant_id: str, message: dict):
-        """메시지를 큐에 저장"""
-        file_path = self.get_queue_file_path(tenant_id)
+        """메시지를 큐 저널 끝에 추가"""
         try:
-            # 기존 메시지 로드
-            messages = []
-            if os.path.exists(file_path):
-                with open(file_path, 'r') as f:
-                    messages = json.load(f)
-            
-            # 새 메시지 추가
-            messages.append({
-                'message': message,
-                'timestamp': datetime.now().isoformat()
-            })
+            with self._lock:
+                journal = self._open_journal(tenant_id)
+                journal.write(self._encode({
+                    'message': message,
+                    'timestamp': datetime.now().isoformat()
+                }))
+                journal.flush()
             
-            # 파일에 저장
-            with open(file_path, 'w') as f:
-                json.dump(messages, f, indent=2)
+            self._unsynced[tenant_id] = self._unsynced.get(tenant_id, 0) + 1
+            if self._unsynced[tenant_id] >= JOURNAL_FSYNC_BATCH:
+                self.sync(tenant_id)
+            else:
+                self._schedule_sync(tenant_id)
                 
-            logger.info(f'메시지가 성공적으로 저장되었습니다: {file_path}')
+            logger.info(f'메시지가 성공적으로 저장되었습니다: {journal.name}')
             return True
         except Exception as e:
             logger.error(f'메시지 저장 중 에러 발생: {e}')
             return False
+    
+    def _schedule_sync(self, tenant_id: str) -> None:
+        """JOURNAL_FSYNC_INTERVAL 뒤 fsync 예약 (이벤트 루프 밖이면 바로 fsync)"""
+        if tenant_id in self._sync_handles:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.sync(tenant_id)
+            return
+        self._sync_handles[tenant_id] = loop.call_later(JOURNAL_FSYNC_INTERVAL, self.sync, tenant_id)
+    
+    def sync(self, tenant_id: str) -> None:
+        """저널을 디스크에 fsync"""
+        handle = self._sync_handles.pop(tenant_id, None)
+        if handle is not None:
+            handle.cancel()
+        try:
+            with self._lock:
+                journal = self._journals.get(tenant_id)
+                if journal is None or not self._unsynced.get(tenant_id):
+                    return
+                os.fsync(journal.fileno())
+                self._unsynced[tenant_id] = 0
+        except Exception as e:
+            logger.error(f'큐 저널 fsync 중 에러 발생: {e}')
+    
+    def _read_ack_offset(self, tenant_id: str) -> int:
+        try:
+            with open(self.get_ack_file_path(tenant_id), 'r') as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+    
+    def _write_ack_offset(self, tenant_id: str, offset: int) -> None:
+        """ack 오프셋을 임시 파일에 쓴 뒤 교체 (중간에 죽어도 이전 값 또는 새 값만 남음)"""
+        ack_path = self.get_ack_file_path(tenant_id)
+        tmp_path = ack_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, ack_path)
+    
+    def generation(self, tenant_id: str) -> int:
+        return self._generations.get(tenant_id, 0)
+    
+    def read_pending(self, tenant_id: str) -> list:
+        """
+        미전송 메시지 목록: [(다음 메시지 시작 오프셋, 메시지 데이터)]
+        전송 후 해당 오프셋으로 ack()하면 그 메시지까지 전송 완료로 기록됩니다.
+        """
+        return self.read_pending_batch(tenant_id)[1]
+    
+    def read_pending_batch(self, tenant_id: str) -> tuple:
+        """(저널 세대, 미전송 메시지 목록) - 오프셋을 ack할 때 세대를 함께 넘깁니다"""
+        with self._lock:
+            self._open_journal(tenant_id)
+            self.sync(tenant_id)
+            return self.generation(tenant_id), self._read_pending(tenant_id)
+    
+    def _read_pending(self, tenant_id: str) -> list:
+        offset = self._read_ack_offset(tenant_id)
+        pending = []
+        with open(self.get_queue_file_path(tenant_id), 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                try:
+                    pending.append((offset, json.loads(line)))
+                except json.JSONDecodeError:
+                    logger.error(f'큐 저널의 손상된 기록을 건너뜁니다 (오프셋 {offset - len(line)})')
+        return pending
             
     def get_messages(self, tenant_id: str) -> list:
-        """저장된 메시지 조회"""
-        file_path = self.get_queue_file_path(tenant_id)
+        """저장된 미전송 메시지 조회"""
         try:
-            if os.path.exists(file_path):
-                with open(file_path, 'r') as f:
-                    return json.load(f)
-            return []
+            return [message_data for _, message_data in self.read_pending(tenant_id)]
         except Exception as e:
             logger.error(f'메시지 로드 중 에러 발생: {e}')
             return []
+    
+    def ack(self, tenant_id: str, offset: int, generation: int = None) -> bool:
+        """
+        offset 이전 메시지를 전송 완료로 기록 (전부 전송했으면 저널 삭제)
+        generation이 현재 세대와 다르면(읽은 뒤 압축/삭제됨) 기록하지 않고 False를 반환합니다.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation(tenant_id):
+                logger.warning(f'저널이 교체되어 이전 오프셋({offset}) ack를 무시합니다')
+                return False
+            journal = self._open_journal(tenant_id)
+            if offset >= journal.tell():
+                self.clear_messages(tenant_id)
+                return True
+            self._write_ack_offset(tenant_id, offset)
+            return True
+    
+    def needs_compaction(self, tenant_id: str) -> bool:
+        journal = self._journals.get(tenant_id)
+        if journal is None:
+            return False
+        acked = self._read_ack_offset(tenant_id)
+        return acked >= JOURNAL_COMPACT_BYTES and acked * 2 >= journal.tell()
+    
+    def compact(self, tenant_id: str) -> bool:
+        """ack된 앞부분을 잘라낸 새 저널로 교체 (백그라운드 스레드에서 호출)"""
+        try:
+            with self._lock:
+                # 기록은 매번 flush되므로 다른 파일 핸들로 읽어도 모두 보임
+                journal = self._open_journal(tenant_id)
+                file_path = self.get_queue_file_path(tenant_id)
+                tmp_path = file_path + '.tmp'
+                offset = self._read_ack_offset(tenant_id)
+                with open(file_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                    src.seek(offset)
+                    while True:
+                        chunk = src.read(1024 * 1024)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                # ack를 먼저 0으로 기록: 교체 전에 죽으면 이미 보낸 메시지를 다시 보낼 뿐 유실은 없음
+                self._write_ack_offset(tenant_id, 0)
+                journal.close()
+                del self._journals[tenant_id]
+                os.replace(tmp_path, file_path)
+                self._generations[tenant_id] = self.generation(tenant_id) + 1
+            logger.info(f'큐 저널 압축 완료: {offset}바이트 제거')
+            return True
+        except Exception as e:
+            logger.error(f'큐 저널 압축 중 에러 발생: {e}')
+            return False
             
     def clear_messages(self, tenant_id: str) -> bool:
         """저장된 메시지 삭제"""
-        file_path = self.get_queue_file_path(tenant_id)
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            with self._lock:
+                handle = self._sync_handles.pop(tenant_id, None)
+                if handle is not None:
+                    handle.cancel()
+                journal = self._journals.pop(tenant_id, None)
+                if journal is not None:
+                    journal.close()
+                self._unsynced.pop(tenant_id, None)
+                for file_path in (self.get_queue_file_path(tenant_id), self.get_ack_file_path(tenant_id), self.get_legacy_queue_file_path(tenant_id)):
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                self._generations[tenant_id] = self.generation(tenant_id) + 1
             return True
         except Exception as e:
             logger.error(f'메시지 삭제 중 에러 발생: {e}')
             return False
 
+# 중앙 서버 수신 이벤트 대기열 최대 길이 (가득 차면 수신 루프가 대기)
+INBOUND_QUEUE_SIZE = 1000
+# 한 트랜잭션에 모아 처리하는 최대 이벤트 수
+INBOUND_BATCH_SIZE = 50
+# DB 반영 스레드 수 - SQLite는 쓰기가 한 번에 하나이고 같은 매장 이벤트는 순서가 중요하므로 1
+INBOUND_DB_WORKERS = 1
+# 처리한 이벤트 키를 메모리에 보관하는 개수 (재연결 후 재전송 묶음을 DB 조회 없이 걸러냄)
+PROCESSED_EVENT_CACHE_SIZE = 10000
+# processed_event_data 보관 기간과 정리 주기
+PROCESSED_EVENT_RETENTION = timedelta(days=7)
+PROCESSED_EVENT_PRUNE_INTERVAL = timedelta(hours=1)
+
+#################################################
+# 중앙 서버 수신 이벤트 처리
+# 핸들러는 DB 작업 스레드에서 (db, payload, effects)로 호출되며 커밋은 일괄 처리에서 합니다.
+# 커밋 후 이벤트 루프에서 실행할 작업은 코루틴 함수로 effects에 추가합니다.
+#################################################
+
+def _parse_central_datetime(value: str) -> datetime:
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+
+def apply_purchase_event(db, payload: dict, effects: list) -> None:
+    """중앙 서버 구매 내역 저장 (같은 uuid가 이미 있으면 갱신)"""
+    purchase_data = payload['purchaseLog']
+    values = dict(
+        payment_type=purchase_data['payment_type'],
+        purchase_type=purchase_data['purchase_type'],
+        game_id=purchase_data['game_id'],
+        customer_id=purchase_data['customer_id'], 
+        uuid=purchase_data['uuid'],
+        purchased_at=_parse_central_datetime(purchase_data['purchased_at']),
+        item=purchase_data['item'],
+        payment_status=purchase_data['payment_status'],
+        status=purchase_data['status'],
+        price=purchase_data['price'],
+        used_points=purchase_data['used_points']
+    )
+    # uuid 고유 인덱스로 upsert - 같은 구매가 동시에 들어와도 한 행만 남음
+    stmt = sqlite_insert(PurchaseData).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PurchaseData.uuid],
+        set_={key: value for key, value in values.items() if key != 'uuid'}
+    )
+    db.execute(stmt)
+    logger.info(f'구매 데이터 저장: {values["uuid"]}')
+
+def apply_register_event(db, payload: dict, effects: list) -> None:
+    """중앙 서버 가입 고객 저장 (같은 ID가 이미 있으면 갱신)"""
+    customer_data = payload['customer']
+    logger.info(f'가입 데이터: {customer_data}')
+    values = dict(
+        id=customer_data['id'],
+        name=customer_data['name'],
+        phone_number=customer_data['phone_number'],
+        email=customer_data['email'],
+        uuid=customer_data['uuid'],
+        game_join_count=customer_data['game_join_count'],
+        visit_count=customer_data['visit_count'],
+        register_at=_parse_central_datetime(customer_data['register_at']),
+        last_visit_at=_parse_central_datetime(customer_data['last_visit_at']),
+        remark=customer_data['remark'],
+    )
+    stmt = sqlite_insert(models.UserData).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.UserData.id],
+        set_={key: value for key, value in values.items() if key != 'id'}
+    )
+    db.execute(stmt)
+
+def apply_use_point_event(db, payload: dict, effects: list) -> None:
+    """
+    중앙 서버 포인트 사용 내역 저장 (만료가 가까운 적립 내역부터 차감)
+    내역에 uuid가 있고 이미 저장된 내역이면 다시 차감하지 않습니다.
+    """
+    point_history_data = payload['point']
+    logger.info(f'포인트 내역 데이터: {point_history_data}')
+    point_uuid = point_history_data.get('uuid')
+    if point_uuid is not None and db.query(models.PointHistoryData.id).filter(
+        models.PointHistoryData.uuid == point_uuid
+    ).first() is not None:
+        logger.info(f'이미 반영된 포인트 사용 내역: {point_uuid}')
+        return
+    point_history_input_data = models.PointHistoryData(
+        customer_id=point_history_data['customer_id'],
+        uuid=point_uuid or str(uuid.uuid4()),
+        reason=point_history_data['reason'],
+        amount=point_history_data['amount'],
+        expire_at=datetime.now(),
+        is_increase=False
+    )
+    # 가장 먼저 포인트 내역 조회 (is_increase가 True, customer_id가 같으며, expire_at이 지나지 않았고, available_amount가 0보다 큰 데이터)
+    point_histories: list[models.PointHistoryData] = db.query(models.PointHistoryData).filter(
+        models.PointHistoryData.customer_id == point_history_input_data.customer_id,
+        models.PointHistoryData.is_increase == True, 
+        models.PointHistoryData.is_expired == False,
+        models.PointHistoryData.available_amount > 0,
+        models.PointHistoryData.expire_at > datetime.now()
+    ).order_by(models.PointHistoryData.expire_at.asc()).all()
+    remain_used_amount = point_history_input_data.amount
+    for point_history in point_histories:
+        if point_history.available_amount > remain_used_amount:
+            point_history.available_amount -= remain_used_amount
+            break
+        remain_available_amount = point_history.available_amount
+        point_history.available_amount -= remain_available_amount
+        remain_used_amount -= remain_available_amount
+    db.add(point_history_input_data)
+
+def apply_exit_game_event(db, payload: dict, effects: list) -> None:
+    """중앙 서버 퇴석 요청 반영 - 해당 참가자 한 행만 퇴석 처리"""
+    game_id = payload['data']['gameId']
+    customer_id = payload['data']['customerId']
+    logger.info(f'게임 종료 메시지: game_id={game_id}, customer_id={customer_id}')
+    game_data = db.query(models.GameData).filter(models.GameData.id == game_id).first()
+    if not game_data:
+        return
+    db.query(models.GamePlayerData).filter(
+        models.GamePlayerData.game_id == game_id,
+        models.GamePlayerData.customer_id == customer_id
+    ).update({"is_sit": False})
+    
+    async def notify():
+        # 중앙 서버 회신과 테이블 디바이스 알림 (병합 스케줄러 사용)
+        from Controllers.game_update_scheduler import game_update_scheduler
+        await game_update_scheduler.schedule(game_id)
+    effects.append(notify)
+
+INBOUND_EVENT_HANDLERS = {
+    'App\\Events\\ToAdminPanel\\PurchaseEvent': apply_purchase_event,
+    'App\\Events\\ToAdminPanel\\RegisterEvent': apply_register_event,
+    'App\\Events\\ToAdminPanel\\UsePointEvent': apply_use_point_event,
+    'App\\Events\\ToAdminPanel\\ExitGameEvent': apply_exit_game_event,
+}
+
+# 재연결 후 다시 전달된 이벤트를 판별할 식별자 (이벤트가 담고 있는 구매 uuid / 고객 id / 포인트 내역 uuid)
+# 같은 식별자에 마지막으로 반영한 payload와 내용까지 같을 때만 중복으로 건너뛰고,
+# 내용이 바뀐 이벤트는 upsert로 갱신합니다. 식별자가 없는 이벤트와 퇴석 처리는 판별하지 않습니다.
+INBOUND_EVENT_IDENTITIES = {
+    'App\\Events\\ToAdminPanel\\PurchaseEvent': lambda payload: payload['purchaseLog'].get('uuid'),
+    'App\\Events\\ToAdminPanel\\RegisterEvent': lambda payload: payload['customer'].get('id'),
+    'App\\Events\\ToAdminPanel\\UsePointEvent': lambda payload: payload['point'].get('uuid') or payload['point'].get('id'),
+}
+
+def inbound_event_key(event_name: str, payload):
+    """중복 수신 판별 키 ("{이벤트 이름}:{식별자}", 식별자가 없으면 None)"""
+    get_identity = INBOUND_EVENT_IDENTITIES.get(event_name)
+    if get_identity is None:
+        return None
+    try:
+        identity = get_identity(payload)
+    except (KeyError, TypeError, AttributeError):
+        return None
+    if identity is None or identity == '':
+        return None
+    return f'{event_name}:{identity}'
+
+def inbound_payload_hash(payload) -> str:
+    """정규화한 payload의 sha256 (같은 식별자의 이벤트 내용이 바뀌었는지 판별)"""
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
 class ReverbTestController:
     socket_id = ""
     is_connected:bool = False
@@ -108,8 +647,7 @@ class ReverbTestController:
     store_host_name = ""
     selected_store = None  # 선택된 매장 정보
     _listening_task = None
-    _reconnect_attempts = 0
-    MAX_RECONNECT_ATTEMPTS = 5
+    _reconnect_attempts = 0  # 구독 성공 이후 연속 실패 횟수 (백오프 계산용)
     bearer_token = ""
     is_offline_mode = False
     def __init__(self):
@@ -123,37 +661,109 @@ class ReverbTestController:
         self.queue_manager = MessageQueueManager()
         self.auth_manager = AuthManager()
         self.is_offline_mode = False
+        # 중앙 서버 HTTP 세션 (이벤트 루프에 묶이므로 처음 사용할 때 생성)
+        self._http_session: aiohttp.ClientSession = None
+        self._http_loop = None
+        self.health = CentralHealthBreaker()
+        # 송신 대기열과 전송 태스크 (이벤트 루프에 묶이므로 처음 사용할 때 생성)
+        self._outbound: asyncio.Queue = None
+        self._sender_task = None
+        self.outbound_sent_count = 0
+        self.outbound_journaled_count = 0
+        self.outbox_compacted_count = 0
+        # 수신 이벤트 대기열, 처리 태스크, DB 작업 스레드
+        self._inbound: asyncio.Queue = None
+        self._inbound_task = None
+        self._inbound_executor = ThreadPoolExecutor(max_workers=INBOUND_DB_WORKERS, thread_name_prefix='central-inbound')
+        self.inbound_applied_count = 0
+        self.inbound_failed_count = 0
+        self.inbound_batch_count = 0
+        self.inbound_duplicate_count = 0
+        # 최근 처리한 이벤트 키 (매장 ID, 키) -> payload 해시 - 커밋된 이벤트만 기록
+        self._processed_keys: OrderedDict = OrderedDict()
+        self._processed_pruned_at = {}
+        # 연결 감시 태스크 (handle_websocket에서 시작, 로그아웃 시 중단)
+        self._supervisor_task = None
+        self._keep_connected = False
+        self._reconnect_now: asyncio.Event = None
+        self._replay_task = None
+        self._replaying_journal = False
+        self.connection_state = "idle"  # idle, connecting, connected, subscribed, disconnected, backoff, failed, stopped
+        self.activity_timeout = PUSHER_ACTIVITY_TIMEOUT
+        self.connect_attempt_count = 0
+        self.reconnect_count = 0
+        self.disconnect_count = 0
+        self.half_open_count = 0
+        self.subscribed_count = 0
+        self.last_error = None
+        self.last_message_at = None
+        self.last_subscribed_at = None
+        self.last_disconnected_at = None
+        self.next_retry_at = None
+
+    def central_url(self, path: str) -> str:
+        return f"{'https' if self.is_ssl else 'http'}://{self.base_url + (':' + str(401) if not self.is_ssl else '')}{path}"
+
+    def get_http_session(self) -> aiohttp.ClientSession:
+        """중앙 서버 호출에 공유하는 HTTP 세션 (연결 유지, DNS 캐시, 기본 제한 시간)"""
+        loop = asyncio.get_running_loop()
+        if self._http_session is None or self._http_session.closed or self._http_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+            )
+            self._http_session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=HTTP_TOTAL_TIMEOUT, sock_connect=HTTP_CONNECT_TIMEOUT)
+            )
+            self._http_loop = loop
+        return self._http_session
+
+    async def close_http_session(self):
+        if self._http_session is not None and not self._http_session.closed:
+            await self._http_session.close()
+        self._http_session = None
+
+    def _record_central_error(self, e: Exception):
+        """연결 자체가 실패한 경우에만 상태 확인 캐시를 오프라인으로 갱신"""
+        if isinstance(e, (aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+            self.health.record_failure(e)
+
+    async def _probe_central_health(self) -> bool:
+        session = self.get_http_session()
+        async with session.get(
+            self.central_url("/api/health"),
+            ssl=ssl_context if self.is_ssl else None,
+            timeout=aiohttp.ClientTimeout(total=HEALTH_CHECK_TIMEOUT)
+        ) as response:
+            return response.status == 200
+
+    async def check_central_health(self) -> bool:
+        """중앙 서버 사용 가능 여부 (최근 판정이 있으면 요청 없이 반환)"""
+        return await self.health.check(self._probe_central_health)
 
     async def request_auth(self):
         """인증 요청을 수행하는 메서드"""
         try:
             logger.debug(f'로그인 시도 - User ID: {self.user_id}, User PWD: {self.user_pwd}')
-            
+
             # 저장된 인증 데이터 확인
-            central_health_check_url = f"{'https' if self.is_ssl else 'http'}://{self.base_url + (':' + str(401) if not self.is_ssl else '')}/api/health"
-            try:
-                saved_auth = self.auth_manager.load_auth_data()
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(central_health_check_url, ssl=ssl_context if self.is_ssl else None) as response:
-                        print(f"response : {response}")
-                        if response.status == 200:
-                            logger.info('중앙 서버 정상 작동')
-                            self.is_offline_mode = False
-                            return await self.handle_online_login(saved_auth)
-                        else:
-                            logger.info('중앙 서버 응답 비정상, 오프라인 모드로 전환합니다')
-                            return await self.handle_offline_login(saved_auth)
-            except Exception as e:
-                logger.error(f'중앙 서버 연결 실패, 오프라인 모드로 전환합니다: {e}')
-            
+            saved_auth = self.auth_manager.load_auth_data()
+            if await self.check_central_health():
+                logger.info('중앙 서버 정상 작동')
+                self.is_offline_mode = False
+                return await self.handle_online_login(saved_auth)
+            logger.info(f'중앙 서버에 연결할 수 없습니다 ({self.health.last_error})')
+
             if saved_auth:
                 if saved_auth['user_id'] == self.user_id and saved_auth['user_pwd'] == self.user_pwd:
                     logger.info('저장된 인증 정보로 오프라인 로그인 시도')
                     return await self.handle_offline_login(saved_auth)
 
-            # 온라인 인증 시도
-            return await self.handle_online_login(saved_auth)
-            
+            # 저장된 인증 정보가 없으면 온라인 인증을 기다리지 않고 바로 실패
+            raise Exception('중앙 서버에 연결할 수 없고 저장된 인증 정보가 없습니다')
+
         except Exception as e:
             logger.error(f'인증 처리 중 오류 발생: {e}')
             return False
@@ -161,81 +771,76 @@ class ReverbTestController:
     async def handle_offline_login(self, saved_auth):
         """오프라인 로그인 처리 메서드"""
         self.stores = saved_auth['stores']
-        # 중앙 서버 상태 확인
-        central_health_check_url = f"{'https' if self.is_ssl else 'http'}://{self.base_url + (':' + str(401) if not self.is_ssl else '')}/api/health"
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(central_health_check_url, ssl=ssl_context if self.is_ssl else None) as response:
-                    if response.status == 200:
-                        # 서버가 정상이면 온라인 모드 시도
-                        self.is_offline_mode = False
-                        load_token_path = os.path.join(os.path.expanduser('~'), '.dealer_desk', 'token.txt')
-                        with open(load_token_path, 'r') as token_file:
-                            self.bearer_token = token_file.read()
-                        logger.info('중앙 서버 연결 가능, 온라인 모드로 시도합니다')
-                    else:
-                        # 서버 응답이 200이 아니면 오프라인 모드
-                        self.is_offline_mode = True
-                        logger.info('중앙 서버 응답 비정상, 오프라인 모드로 전환합니다')
-        except Exception as e:
-            # 연결 실패 시 오프라인 모드
+        # 중앙 서버 상태 확인 (방금 확인한 결과가 있으면 재사용)
+        # 오프라인이어도 중앙 서버가 복구되면 감시 태스크가 채널 인증에 사용할 수 있도록 저장된 토큰을 읽어 둠
+        load_token_path = os.path.join(os.path.expanduser('~'), '.dealer_desk', 'token.txt')
+        if os.path.exists(load_token_path):
+            with open(load_token_path, 'r') as token_file:
+                self.bearer_token = token_file.read()
+        if await self.check_central_health():
+            # 서버가 정상이면 온라인 모드 시도
+            self.is_offline_mode = False
+            logger.info('중앙 서버 연결 가능, 온라인 모드로 시도합니다')
+        else:
             self.is_offline_mode = True
-            logger.error(f'중앙 서버 연결 실패, 오프라인 모드로 전환합니다: {e}')
-        
+            logger.info('중앙 서버에 연결할 수 없어 오프라인 모드로 전환합니다')
+
         return {"token": "offline_mode", "stores": self.stores}
 
     async def handle_online_login(self, saved_auth):
         """온라인 로그인 처리 메서드"""
         try:
-            async with aiohttp.ClientSession() as session:
-                auth_data = { 
-                    "email": self.user_id,
-                    "password": self.user_pwd
-                }
-                headers = {
-                    'Content-Type': 'application/json',
-                    'Accept': 'application/json'
-                }
-                logger.debug('온라인 로그인 시도')
-                # gzip 압축 지원 헤더 추가
-                headers['Accept-Encoding'] = 'gzip'
-                logger.debug('gzip 압축 지원 헤더 추가')
+            session = self.get_http_session()
+            auth_data = { 
+                "email": self.user_id,
+                "password": self.user_pwd
+            }
+            headers = {
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'
+            }
+            logger.debug('온라인 로그인 시도')
+            # gzip 압축 지원 헤더 추가
+            headers['Accept-Encoding'] = 'gzip'
+            logger.debug('gzip 압축 지원 헤더 추가')
                 
-                async with session.post(
-                    f"{'https' if self.is_ssl else 'http'}://{self.base_url + (':' + str(401) if not self.is_ssl else '')}/api/login",
-                    json=auth_data,
-                    headers=headers,
-                    ssl=ssl_context if self.is_ssl else None
-                ) as response:
-                    # gzip으로 압축되어 있는지 확인
-                    if response.headers.get('Content-Encoding') == 'gzip':
-                        logger.info('gzip으로 압축된 응답을 받았습니다')
-                    data = await response.json()
-                    print(f"data : {data}")
-                    if data:
-                        # 성공적인 온라인 인증 시 데이터 저장
-                        self.bearer_token = data['token']
-                        # 토큰을 파일로 저장
-                        token_file_path = os.path.join(os.path.expanduser('~'), '.dealer_desk', 'token.txt')
-                        with open(token_file_path, 'w') as token_file:
-                            token_file.write(data['token'])
-                        logger.info(f'토큰을 파일에 저장했습니다: {token_file_path}')
-                        logger.info(f'bearer_token: {self.bearer_token}')
-                        if self.bearer_token is None:
-                            raise Exception("토큰이 없습니다.")
-                        self.stores = data['stores']
-                        self.is_offline_mode = False
+            async with session.post(
+                self.central_url("/api/login"),
+                json=auth_data,
+                headers=headers,
+                ssl=ssl_context if self.is_ssl else None
+            ) as response:
+                self.health.record_success()
+                # gzip으로 압축되어 있는지 확인
+                if response.headers.get('Content-Encoding') == 'gzip':
+                    logger.info('gzip으로 압축된 응답을 받았습니다')
+                data = await response.json()
+                print(f"data : {data}")
+                if data:
+                    # 성공적인 온라인 인증 시 데이터 저장
+                    self.bearer_token = data['token']
+                    # 토큰을 파일로 저장
+                    token_file_path = os.path.join(os.path.expanduser('~'), '.dealer_desk', 'token.txt')
+                    with open(token_file_path, 'w') as token_file:
+                        token_file.write(data['token'])
+                    logger.info(f'토큰을 파일에 저장했습니다: {token_file_path}')
+                    logger.info(f'bearer_token: {self.bearer_token}')
+                    if self.bearer_token is None:
+                        raise Exception("토큰이 없습니다.")
+                    self.stores = data['stores']
+                    self.is_offline_mode = False
                         
-                        # 인증 데이터 저장 (기존 데이터와 다른 경우에만)
-                        if not saved_auth or saved_auth['user_id'] != self.user_id or saved_auth['user_pwd'] != self.user_pwd:
-                            logger.info('새로운 인증 정보 저장')
-                            self.auth_manager.save_auth_data(self.user_id, self.user_pwd, self.stores)
+                    # 인증 데이터 저장 (기존 데이터와 다른 경우에만)
+                    if not saved_auth or saved_auth['user_id'] != self.user_id or saved_auth['user_pwd'] != self.user_pwd:
+                        logger.info('새로운 인증 정보 저장')
+                        self.auth_manager.save_auth_data(self.user_id, self.user_pwd, self.stores)
                         
-                        return data
-                    else:
-                        raise Exception('토큰이 응답에 없습니다.')
+                    return data
+                else:
+                    raise Exception('토큰이 응답에 없습니다.')
         except Exception as e:
             logger.error(f'온라인 인증 실패: {e}')
+            self._record_central_error(e)
             # 온라인 인증 실패 시 저장된 인증 정보로 재시도
             if saved_auth and saved_auth['user_id'] == self.user_id and saved_auth['user_pwd'] == self.user_pwd:
                 logger.info('온라인 인증 실패로 인한 오프라인 모드 전환')
@@ -259,12 +864,14 @@ class ReverbTestController:
             self.store_host_name = selected_store['host']
             logger.info(f'매장 선택: {self.store_name}')
             logger.info(f"오프라인 모드? {self.is_offline_mode}")
-            # 오프라인 모드가 아닌 경우에만 소켓 연결 시도
-            if not self.is_offline_mode:
-                # 기존 연결 초기화
-                await self.reset_state()
-                
-                # 새로운 소켓 연결 시도
+            # 기존 연결 초기화
+            await self.reset_state()
+            if self.is_offline_mode:
+                # 바로 연결을 시도하지 않고 감시 태스크만 시작 (중앙 서버가 복구되면 백오프 후 연결)
+                await self.handle_websocket(connect_now=False)
+                logger.info('오프라인 모드로 시작합니다. 중앙 서버가 복구되면 자동으로 연결합니다.')
+            else:
+                # 새로운 소켓 연결 시도 (실패해도 감시 태스크가 계속 다시 연결)
                 success = await self.handle_websocket()
                 if not success:
                     logger.warning('소켓 연결 실패, 오프라인 모드로 전환')
@@ -294,43 +901,45 @@ class ReverbTestController:
             logger.debug(f'채널 인증 시도 - Channel: {self.channel_name+self.tenant_id}, SocketId: {socket_id}')
             self.socket_id = socket_id
             
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    'Authorization': f'Bearer {self.bearer_token}',
-                    'Content-Type': 'application/x-www-form-urlencoded',
-                    'Accept': 'application/json'
-                }
-                params = {
-                    'socket_id': socket_id,
-                    'channel_name': self.channel_name+self.tenant_id
-                }
+            session = self.get_http_session()
+            headers = {
+                'Authorization': f'Bearer {self.bearer_token}',
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'Accept': 'application/json'
+            }
+            params = {
+                'socket_id': socket_id,
+                'channel_name': self.channel_name+self.tenant_id
+            }
                 
-                async with session.post(
-                    f"{'https' if self.is_ssl else 'http'}://{self.base_url + (':' + str(401) if not self.is_ssl else '')}/api/pusher/user-auth",
-                    headers=headers,
-                    params=params,
-                    ssl=ssl_context if self.is_ssl else None
-                ) as response:
-                    logger.debug(f'인증 응답 상태 코드: {response.status}')
-                    response_text = await response.text()
-                    logger.debug(f'인증 응답 본문: {response_text}')
-
-                    if response.status == 200:
-                        auth_data = json.loads(response_text)
-                        logger.info('채널 인증 성공')
-                        self.is_connected = True  # 인증 성공 시 연결 상태 설정
-                        return {
-                            'auth': auth_data['auth'],
-                            'channel_data': auth_data.get('channel_data', '')
-                        }
-                    else:
-                        logger.error(f'채널 인증 실패: {response.status} - {response_text}')
-                        self.is_connected = False
-                        self.auth_event.set()  # 인증 실패 시 이벤트 설정
-                        raise Exception(f'Authentication failed: {response.status} - {response_text}')
+            async with session.post(
+                self.central_url("/api/pusher/user-auth"),
+                headers=headers,
+                params=params,
+                ssl=ssl_context if self.is_ssl else None
+            ) as response:
+                self.health.record_success()
+                logger.debug(f'인증 응답 상태 코드: {response.status}')
+                response_text = await response.text()
+                logger.debug(f'인증 응답 본문: {response_text}')
+
+                if response.status == 200:
+                    auth_data = json.loads(response_text)
+                    logger.info('채널 인증 성공')
+                    self.is_connected = True  # 인증 성공 시 연결 상태 설정
+                    return {
+                        'auth': auth_data['auth'],
+                        'channel_data': auth_data.get('channel_data', '')
+                    }
+                else:
+                    logger.error(f'채널 인증 실패: {response.status} - {response_text}')
+                    self.is_connected = False
+                    self.auth_event.set()  # 인증 실패 시 이벤트 설정
+                    raise Exception(f'Authentication failed: {response.status} - {response_text}')
                         
         except Exception as e:
             logger.error(f'인증 처리 중 에러 발생: {e}')
+            self._record_central_error(e)
             self.is_connected = False
             self.auth_event.set()  # 인증 실패 시 이벤트 설정
             raise
@@ -352,19 +961,26 @@ class ReverbTestController:
         """모든 상태를 초기화하는 메서드"""
         logger.info('상태 초기화 시작')
         try:
-            # 리스닝 태스크 취소
-            if self._listening_task and not self._listening_task.done():
+            # 리스닝 태스크 취소 (수신 태스크 안에서 호출된 경우 자기 자신은 취소하지 않음)
+            if self._listening_task and not self._listening_task.done() and self._listening_task is not asyncio.current_task():
                 self._listening_task.cancel()
                 try:
                     await self._listening_task
                 except asyncio.CancelledError:
                     pass
                 self._listening_task = None
+            if self._replay_task and not self._replay_task.done() and self._replay_task is not asyncio.current_task():
+                self._replay_task.cancel()
+            self._replaying_journal = False
             
             if self.websocket:
                 await self.websocket.close()
                 
             # 연결 관련 상태 초기화
+            if self.is_subscribed:
+                self.last_disconnected_at = datetime.now()
+            if self.connection_state not in ("failed", "stopped"):
+                self.connection_state = "disconnected"
             self.is_connected = False
             self.is_subscribed = False
             self.is_handling_message = False
@@ -377,46 +993,127 @@ class ReverbTestController:
             logger.error(f'상태 초기화 중 에러 발생: {e}')
             return False
 
-    async def handle_websocket(self):
-        """WebSocket 연결 및 메시지 처리를 담당하는 메서드"""
-        while self._reconnect_attempts < self.MAX_RECONNECT_ATTEMPTS:
+    async def handle_websocket(self, connect_now: bool = True):
+        """
+        중앙 서버 연결 시작 - 첫 연결 시도 결과를 반환합니다.
+        첫 연결이 실패하거나 이후 연결이 끊겨도 감시 태스크가 백오프하며 계속 다시 연결합니다.
+        connect_now가 False면 (오프라인 로그인) 바로 시도하지 않고 감시 태스크만 시작합니다.
+        """
+        await self.stop_supervisor()
+        self._keep_connected = True
+        self._reconnect_attempts = 0
+        success = await self._connect_once() if connect_now else False
+        self._reconnect_now = asyncio.Event()
+        self._supervisor_task = asyncio.create_task(self._supervise())
+        return success
+
+    async def _connect_once(self) -> bool:
+        """WebSocket 연결 한 번 시도 후 수신 태스크 시작 (인증/구독은 수신 태스크에서 진행)"""
+        await self.reset_state()
+        self.connection_state = "connecting"
+        self.connect_attempt_count += 1
+        try:
+            self.websocket = await websockets.connect(
+                self.server_url,
+                ssl=ssl_context if self.is_ssl else None,
+                open_timeout=CONNECT_TIMEOUT
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.last_error = str(e)
+            self.connection_state = "disconnected"
+            logger.error(f'WebSocket 연결 실패 ({self._reconnect_attempts + 1}번째 연속 시도): {e}')
+            return False
+        
+        logger.info('WebSocket 연결 성공')
+        self.connection_state = "connected"
+        self._listening_task = asyncio.create_task(self.listen_for_messages())
+        return True
+
+    def _backoff_delay(self) -> float:
+        """연속 실패 횟수에 따른 재연결 대기 시간 (지수 증가, 절반 범위 지터)"""
+        delay = min(RECONNECT_BASE_DELAY * 2 ** max(self._reconnect_attempts - 1, 0), RECONNECT_MAX_DELAY)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def _supervise(self):
+        """수신 태스크가 끝나면(연결 끊김, 반쯤 끊긴 연결 감지, 처리 오류) 백오프 후 다시 연결"""
+        while self._keep_connected:
+            if self._listening_task is not None and not self._listening_task.done():
+                await asyncio.wait({self._listening_task})
+                if not self._keep_connected:
+                    break
+                self.disconnect_count += 1
+                logger.warning('중앙 서버 연결이 끊겼습니다. 다시 연결합니다.')
+            
+            self._reconnect_attempts += 1
+            delay = self._backoff_delay()
+            self.connection_state = "backoff"
+            self.next_retry_at = datetime.now() + timedelta(seconds=delay)
+            logger.info(f'{delay:.1f}초 후 중앙 서버 재연결 시도 ({self._reconnect_attempts}번째)')
+            try:
+                # reconnect() 호출 시 기다리지 않고 바로 시도
+                await asyncio.wait_for(self._reconnect_now.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            self._reconnect_now.clear()
+            self.next_retry_at = None
+            if not self._keep_connected:
+                break
+            await self._connect_once()
+
+    async def stop_supervisor(self):
+        """연결 감시 중단 (로그아웃/매장 변경 시)"""
+        self._keep_connected = False
+        if self._supervisor_task and not self._supervisor_task.done() and self._supervisor_task is not asyncio.current_task():
+            self._supervisor_task.cancel()
             try:
-                # 이전 상태 초기화
-                await self.reset_state()
-                
-                
-                # 새로운 WebSocket 연결 시도
-                self.websocket = await websockets.connect(
-                    self.server_url,
-                    ssl=ssl_context if self.is_ssl else None
-                )
-                logger.info('WebSocket 연결 성공')
-                
-                # 연결 성공 시 재시도 카운터 초기화
-                self._reconnect_attempts = 0
-                
-                # 새로운 listening 태스크 시작
-                self._listening_task = asyncio.create_task(self.listen_for_messages())
-                
-                return True
-                
-            except (websockets.exceptions.ConnectionClosed, ConnectionRefusedError) as e:
-                self._reconnect_attempts += 1
-                wait_time = min(2 ** self._reconnect_attempts, 60)  # 지수 백오프, 최대 60초
-                logger.error(f'WebSocket 연결 실패 ({self._reconnect_attempts}/{self.MAX_RECONNECT_ATTEMPTS}): {e}')
-                logger.info(f'{wait_time}초 후 재시도...')
-                await asyncio.sleep(wait_time)
-                
-            except Exception as e:
-                logger.error(f'예기치 않은 에러 발생: {e}')
-                await self.reset_state()
-                return False
-                
-        logger.error(f'최대 재시도 횟수({self.MAX_RECONNECT_ATTEMPTS})를 초과했습니다.')
-        return False
+                await self._supervisor_task
+            except asyncio.CancelledError:
+                pass
+        self._supervisor_task = None
+
+    async def reconnect(self) -> bool:
+        """백오프를 초기화하고 바로 다시 연결 (수동 재연결)"""
+        if not self.selected_store or self.tenant_id == "":
+            return False
+        if self._supervisor_task is None or self._supervisor_task.done():
+            return await self.handle_websocket()
+        self._reconnect_attempts = 0
+        if self._listening_task is not None and not self._listening_task.done():
+            # 수신 태스크가 끝나면 감시 태스크가 바로 다시 연결
+            await self.reset_state()
+        self._reconnect_now.set()
+        return True
+
+    def get_connection_stats(self) -> dict:
+        def _iso(value):
+            return value.isoformat() if value else None
+        return {
+            "state": self.connection_state,
+            "is_connected": self.is_connected,
+            "is_subscribed": self.is_subscribed,
+            "is_offline_mode": self.is_offline_mode,
+            "supervised": self._keep_connected,
+            "consecutive_failures": self._reconnect_attempts,
+            "connect_attempts": self.connect_attempt_count,
+            "reconnects": self.reconnect_count,
+            "disconnects": self.disconnect_count,
+            "half_open_detected": self.half_open_count,
+            "activity_timeout": self.activity_timeout,
+            "last_message_at": _iso(self.last_message_at),
+            "last_subscribed_at": _iso(self.last_subscribed_at),
+            "last_disconnected_at": _iso(self.last_disconnected_at),
+            "next_retry_at": _iso(self.next_retry_at),
+            "last_error": self.last_error,
+        }
 
     async def listen_for_messages(self):
         """WebSocket 메시지 수신을 담당하는 메서드"""
+        # 수신 태스크의 DB 작업은 선택된 매장으로 고정 (태스크 단위 컨텍스트)
+        if self.selected_store:
+            set_current_store_id(self.selected_store['id'])
+        awaiting_pong = False
         try:
             while True:
                 if not self.user_id and not self.bearer_token:  # 로그아웃 상태 체크
@@ -430,7 +1127,25 @@ class ReverbTestController:
                     break  # 연결이 끊긴 상태에서는 재연결을 시도하지 않고 종료
                 
                 try:
-                    message = await self.websocket.recv()
+                    try:
+                        message = await asyncio.wait_for(
+                            self.websocket.recv(),
+                            PUSHER_PONG_TIMEOUT if awaiting_pong else self.activity_timeout
+                        )
+                    except asyncio.TimeoutError:
+                        if awaiting_pong:
+                            # ping에도 응답이 없으면 반쯤 끊긴 연결 - 닫고 감시 태스크가 다시 연결
+                            self.half_open_count += 1
+                            self.last_error = 'pusher:ping 응답 없음'
+                            logger.warning(f'{PUSHER_PONG_TIMEOUT}초 동안 pusher:ping 응답이 없어 연결을 다시 시작합니다.')
+                            await self.reset_state()
+                            break
+                        # 활동 제한 시간 동안 조용하면 연결 확인
+                        awaiting_pong = True
+                        await self.websocket.send(json.dumps({"event": "pusher:ping", "data": {}}))
+                        continue
+                    awaiting_pong = False
+                    self.last_message_at = datetime.now()
                     data = json.loads(message)
                     logger.debug(f'수신된 메시지: {data}')
                     
@@ -444,6 +1159,8 @@ class ReverbTestController:
                     elif data['event'] == 'pusher:connection_established':
                         connection_data = json.loads(data['data'])
                         socket_id = connection_data['socket_id']
+                        # 서버가 알려준 활동 제한 시간 사용
+                        self.activity_timeout = min(connection_data.get('activity_timeout') or PUSHER_ACTIVITY_TIMEOUT, PUSHER_ACTIVITY_TIMEOUT)
                         logger.debug(f'Socket ID: {socket_id}')
                         
                         auth_data = await self.broadcast_authentication(socket_id)
@@ -458,159 +1175,48 @@ class ReverbTestController:
                         logger.info('채널 구독 성공')
                         self.is_connected = True
                         self.is_subscribed = True
+                        self.is_offline_mode = False
+                        self.connection_state = "subscribed"
+                        if self.subscribed_count > 0:
+                            self.reconnect_count += 1
+                        self.subscribed_count += 1
+                        self._reconnect_attempts = 0
+                        self.last_subscribed_at = datetime.now()
                         self.auth_event.set()
                         
-                        # 구독 성공 시 저장된 메시지 처리
-                        await self.process_queued_messages()
+                        # 구독 성공 시 저장된 메시지 재전송 (수신 루프가 ping에 계속 응답하도록 별도 태스크)
+                        self._replaying_journal = True
+                        self._replay_task = asyncio.create_task(self.process_queued_messages())
                     
                     elif data['event'] == 'pusher:error':
                         error_data = json.loads(data['data'])
                         logger.error(f'Pusher 에러: {error_data["code"]} - {error_data["message"]}')
+                        self.last_error = f'{error_data["code"]} - {error_data["message"]}'
+                        if error_data["code"] is not None and 4000 <= error_data["code"] < 4100:
+                            # Pusher 프로토콜상 같은 조건으로 다시 연결하면 안 되는 오류 (인증 실패 등)
+                            self._keep_connected = False
+                            self.connection_state = "failed"
                         if error_data["code"] == 4009:
                             await self.reset_state()
                             self.auth_event.set()
                             raise Exception(f'인증 실패: {error_data["message"]}')
-                    elif data['event'] == 'App\\Events\\ToAdminPanel\\PurchaseEvent':
-                        logger.info('메시지 수신')
-                        purchase_data = json.loads(data['data'])['purchaseLog']
-                        purchase_model = PurchaseData(
-                            payment_type=purchase_data['payment_type'],
-                            purchase_type=purchase_data['purchase_type'],
-                            game_id=purchase_data['game_id'],
-                            customer_id=purchase_data['customer_id'], 
-                            uuid=purchase_data['uuid'],
-                            purchased_at=datetime.strptime(purchase_data['purchased_at'], '%Y-%m-%d %H:%M:%S'),
-                            item=purchase_data['item'],
-                            payment_status=purchase_data['payment_status'],
-                            status=purchase_data['status'],
-                            price=purchase_data['price'],
-                            used_points=purchase_data['used_points']
-                        )
-                        
-                        # 데이터베이스 세션 가져오기
-                        db = get_db_direct()
-                        try:
-                            db.add(purchase_model)
-                            db.commit()
-                            db.refresh(purchase_model)
-                            logger.info(f'구매 데이터 저장: {purchase_model.id}')
-                        finally:
-                            db.close()
-                        
-                    elif data['event'] == 'App\\Events\\ToAdminPanel\\RegisterEvent':
-                        logger.info('가입 메시지 수신')
-                        customer_data = json.loads(data['data'])['customer']
-                        logger.info(f'가입 데이터: {customer_data}')
-                        
-                        # 데이터베이스 세션 가져오기
-                        db = get_db_direct()
-                        try:
-                            # 가입 데이터를 데이터베이스에 저장
-                            customer_model = models.UserData(
-                                id=customer_data['id'],
-                                name=customer_data['name'],
-                                phone_number=customer_data['phone_number'],
-                                email=customer_data['email'],
-                                uuid=customer_data['uuid'],
-                                game_join_count=customer_data['game_join_count'],
-                                visit_count=customer_data['visit_count'],
-                                register_at=datetime.strptime(customer_data['register_at'], '%Y-%m-%d %H:%M:%S'),
-                                last_visit_at=datetime.strptime(customer_data['last_visit_at'], '%Y-%m-%d %H:%M:%S'),
-                                remark=customer_data['remark'],
-                            )
-                            print(f"customer_model : {customer_model.id}")
-                            db.add(customer_model)
-                            db.commit()
-                            db.refresh(customer_model)
-                        finally:
-                            db.close()
-                    elif data['event'] == 'App\\Events\\ToAdminPanel\\UsePointEvent':
-                        logger.info('포인트 내역 메시지 수신')
-                        point_history_data = json.loads(data['data'])['point']
-                        logger.info(f'포인트 내역 데이터: {point_history_data}')
-                        
-                        # 한글 reason 처리 (이스케이프된 유니코드 문자열 디코딩)
-                        reason = point_history_data['reason']
-                        # try:
-                        #     # 이스케이프된 유니코드 문자열인 경우 디코딩
-                        #     if '\\u' in reason:
-                        #         reason = reason.decode('unicode_escape')
-                        #     logger.info(f'처리된 포인트 사용 이유: {reason}')
-                        # except Exception as e:
-                        #     logger.error(f'포인트 사용 이유 디코딩 중 오류: {e}')
-                        
-                        point_history_input_data = models.PointHistoryData(
-                            customer_id=point_history_data['customer_id'],
-                            uuid=str(uuid.uuid4()),
-                            reason=reason,
-                            amount=point_history_data['amount'],
-                            expire_at=datetime.now(),
-                            is_increase=False
-                        )
-                        
-                        db = get_db_direct() 
-                        try:
-                            if(point_history_input_data.is_increase == False):
-                                # 가장 먼저 포인트 내역 조회 (is_increase가 True, customer_id가 같으며, expire_at이 지나지 않았고, available_amount가 0보다 큰 데이터)
-                                point_history_data : list[models.PointHistoryData] = db.query(models.PointHistoryData).filter(
-                                    models.PointHistoryData.customer_id == point_history_input_data.customer_id,
-                                    models.PointHistoryData.is_increase == True, 
-                                    models.PointHistoryData.is_expired == False,
-                                    models.PointHistoryData.available_amount > 0,
-                                    models.PointHistoryData.expire_at > datetime.now()
-                                ).order_by(models.PointHistoryData.expire_at.asc()).all()
-                                # 포인트 차람
-                                remain_used_amount = point_history_input_data.amount
-                                for point_history in point_history_data:
-                                    if(point_history.available_amount > remain_used_amount):
-                                        point_history.available_amount -= remain_used_amount
-                                        break
-                                    else:
-                                        remain_available_amount = point_history.available_amount
-                                        point_history.available_amount -= remain_available_amount
-                                        remain_used_amount -= remain_available_amount
-                                        
-                                        
-                            db.add(point_history_input_data)
-                            db.commit()
-                            db.refresh(point_history_input_data)
-                        finally:
-                            db.close()
-                    elif data['event'] == 'App\\Events\\ToAdminPanel\\ExitGameEvent':
-                        logger.info('게임 종료 메시지 수신')
-                        db = get_db_direct()
-                        try:
-                            print(f"data: {data}")
-                            print(f"data['data'] : {data['data']}")
-                            data_data = json.loads(data['data'])
-                            print(f"data_data['data'] : {data_data['data']}")
-                            game_id = data_data['data']['gameId']
-                            customer_id = data_data['data']['customerId']
-                            print(f"game_id: {game_id}, customer_id: {customer_id}")
-                            
-                            game_data:models.GameData = db.query(models.GameData).filter(models.GameData.id == game_id).first()
-                            if(game_data):
-                                player = next(player for player in game_data.game_in_player if player['customer_id'] == customer_id)
-                                player['is_sit'] = False
-                                db.query(models.GameData).filter(models.GameData.id == game_id).update(
-                                    {"game_in_player": game_data.game_in_player}
-                                )
-                                db.commit()
-                                db.refresh(game_data)
-                                import main
-                                await main.socket_controller.update_game_data(game_data)
-
-                        finally:
-                            db.close()
-                except websockets.exceptions.ConnectionClosed:
+                    elif data['event'] in INBOUND_EVENT_HANDLERS:
+                        # DB 반영은 수신 처리 태스크에서 (수신 루프는 디코딩과 대기열 추가만 해서 ping 응답이 밀리지 않도록)
+                        payload = data.get('data')
+                        if isinstance(payload, str):
+                            payload = json.loads(payload)
+                        await self.enqueue_inbound(data['event'], payload)
+                except websockets.exceptions.ConnectionClosed as e:
                     logger.warning("WebSocket 연결이 닫혔습니다.")
+                    self.last_error = str(e)
                     await self.reset_state()
-                    break  # 연결이 끊긴 상태에서는 재연결을 시도하지 않고 종료
+                    break  # 재연결은 감시 태스크가 백오프 후 시도
                     
                 except Exception as e:
                     logger.error(f'메시지 처리 중 에러 발생: {e}')
+                    self.last_error = str(e)
                     await self.reset_state()
-                    break  # 에러 발생 시 재연결을 시도하지 않고 종료
+                    break  # 재연결은 감시 태스크가 백오프 후 시도
         
         except asyncio.CancelledError:
             logger.info("메시지 수신 태스크가 취소되었습니다.")
@@ -622,38 +1228,172 @@ class ReverbTestController:
         finally:
             logger.info("메시지 수신 태스크 종료")
 
+    async def enqueue_inbound(self, event_name: str, payload: dict) -> None:
+        """수신 이벤트를 처리 대기열에 추가 (현재 매장 ID와 함께)"""
+        if self._inbound is None:
+            self._inbound = asyncio.Queue(maxsize=INBOUND_QUEUE_SIZE)
+        if self._inbound_task is None or self._inbound_task.done():
+            self._inbound_task = asyncio.create_task(self._inbound_loop())
+        store_id = get_current_store_id()
+        event_key = inbound_event_key(event_name, payload)
+        if event_key is not None and self._processed_keys.get((store_id, event_key)) == inbound_payload_hash(payload):
+            # 재연결 후 다시 전달된 이벤트는 대기열에 넣지 않음
+            self.inbound_duplicate_count += 1
+            return
+        if self._inbound.full():
+            logger.warning('수신 이벤트 대기열이 가득 찼습니다. 처리될 때까지 수신을 잠시 멈춥니다.')
+        await self._inbound.put((store_id, event_name, payload))
+    
+    async def _inbound_loop(self):
+        """대기열에 쌓인 이벤트를 최대 INBOUND_BATCH_SIZE개씩 묶어 DB 작업 스레드에서 한 트랜잭션으로 반영"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._inbound.get()]
+            while len(batch) < INBOUND_BATCH_SIZE and not self._inbound.empty():
+                batch.append(self._inbound.get_nowait())
+            try:
+                # 같은 매장의 연속된 이벤트끼리 묶음
+                for store_id, items in groupby(batch, key=lambda item: item[0]):
+                    events = [(event_name, payload) for _, event_name, payload in items]
+                    # 매장 엔진 준비/세션 생성은 이벤트 루프에서 하고 작업 스레드에는 세션만 넘김
+                    db = db_manager.get_db_direct(store_id)
+                    result = await loop.run_in_executor(self._inbound_executor, self._apply_inbound_events, db, store_id, events)
+                    self._record_inbound_result(store_id, result)
+                    with store_context(store_id):
+                        for effect in result["effects"]:
+                            try:
+                                await effect()
+                            except Exception as e:
+                                logger.error(f'수신 이벤트 후속 처리 중 에러 발생: {e}')
+            except Exception as e:
+                logger.error(f'수신 이벤트 처리 중 에러 발생: {e}')
+            finally:
+                for _ in batch:
+                    self._inbound.task_done()
+    
+    def _apply_inbound_events(self, db, store_id, events: list) -> dict:
+        """
+        이벤트 루프에서 만든 세션으로 이벤트 묶음 반영 (DB 작업 스레드에서 실행)
+        카운터/처리 키 캐시는 건드리지 않고 결과만 반환합니다 - 이벤트 루프에서 _record_inbound_result로 기록
+        """
+        result = {"effects": [], "processed_keys": {}, "applied": 0, "duplicates": 0, "failed": 0, "batches": 0}
+        try:
+            self._apply_inbound_batch(db, store_id, events, result)
+        finally:
+            db.close()
+        return result
+    
+    def _apply_inbound_batch(self, db, store_id, events: list, result: dict) -> None:
+        """
+        이벤트 묶음을 한 트랜잭션으로 반영하고 후속 작업/처리 키를 result에 추가
+        묶음 중 하나라도 실패하면 롤백 후 한 건씩 다시 처리해 실패한 이벤트만 건너뜁니다.
+        """
+        effects = []
+        applied_keys = {}
+        duplicates = 0
+        try:
+            for event_name, payload in events:
+                event_key = inbound_event_key(event_name, payload)
+                if event_key is not None:
+                    payload_hash = inbound_payload_hash(payload)
+                    # 메모리 캐시에서 밀려난 오래된 중복은 처리 기록 테이블로 판별
+                    record = db.get(models.ProcessedEventData, event_key)
+                    if applied_keys.get(event_key, record.payload_hash if record else None) == payload_hash:
+                        duplicates += 1
+                        continue
+                    if record is None:
+                        db.add(models.ProcessedEventData(event_key=event_key, payload_hash=payload_hash))
+                    else:
+                        record.payload_hash = payload_hash
+                        record.processed_at = datetime.now()
+                    applied_keys[event_key] = payload_hash
+                INBOUND_EVENT_HANDLERS[event_name](db, payload, effects)
+            self._prune_processed_events(db, store_id)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            if len(events) == 1:
+                logger.error(f'수신 이벤트 처리 실패 ({events[0][0]}): {e}')
+                result["failed"] += 1
+                return
+            logger.warning(f'수신 이벤트 {len(events)}건 일괄 처리 실패, 한 건씩 다시 처리합니다: {e}')
+            for event in events:
+                self._apply_inbound_batch(db, store_id, [event], result)
+            return
+        result["effects"].extend(effects)
+        result["processed_keys"].update(applied_keys)
+        result["applied"] += len(events) - duplicates
+        result["duplicates"] += duplicates
+        result["batches"] += 1
+    
+    def _record_inbound_result(self, store_id, result: dict) -> None:
+        """작업 스레드의 처리 결과를 카운터와 처리 키 캐시에 기록 (이벤트 루프에서 실행)"""
+        self._remember_processed_keys(store_id, result["processed_keys"])
+        self.inbound_applied_count += result["applied"]
+        self.inbound_duplicate_count += result["duplicates"]
+        self.inbound_failed_count += result["failed"]
+        self.inbound_batch_count += result["batches"]
+    
+    def _remember_processed_keys(self, store_id, event_keys: dict) -> None:
+        """처리한 이벤트 키와 payload 해시를 메모리 캐시에 기록 (가장 최근 것만 유지)"""
+        for event_key, payload_hash in event_keys.items():
+            self._processed_keys.pop((store_id, event_key), None)
+            self._processed_keys[(store_id, event_key)] = payload_hash
+        while len(self._processed_keys) > PROCESSED_EVENT_CACHE_SIZE:
+            self._processed_keys.popitem(last=False)
+    
+    def _prune_processed_events(self, db, store_id) -> None:
+        """보관 기간이 지난 처리 기록 삭제 (매장별로 PROCESSED_EVENT_PRUNE_INTERVAL마다)"""
+        now = datetime.now()
+        pruned_at = self._processed_pruned_at.get(store_id)
+        if pruned_at is not None and now - pruned_at < PROCESSED_EVENT_PRUNE_INTERVAL:
+            return
+        self._processed_pruned_at[store_id] = now
+        db.query(models.ProcessedEventData).filter(
+            models.ProcessedEventData.processed_at < now - PROCESSED_EVENT_RETENTION
+        ).delete()
+    
+    def get_inbound_stats(self) -> dict:
+        return {
+            "queued": self._inbound.qsize() if self._inbound is not None else 0,
+            "applied": self.inbound_applied_count,
+            "duplicates": self.inbound_duplicate_count,
+            "failed": self.inbound_failed_count,
+            "batches": self.inbound_batch_count,
+        }
+
     async def create_game_data(self, game_data):
         """게임 데이터 생성 메시지를 보내는 메서드"""
         logger.info(f'게임 데이터 생성 메시지 전송 시도: 게임 ID {game_data.id}')
         game_data_json = game_data.to_json()
-        await self.send_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="GameData", message=game_data_json)
+        self.enqueue_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="GameData", message=game_data_json)
 
     async def update_game_data(self, game_data):
         """게임 데이터 업데이트 메시지를 보내는 메서드"""
         logger.info(f'게임 데이터 업데이트 메시지 전송 시도: 게임 ID {game_data.id}')
         game_data_json = game_data.to_json()
-        await self.send_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="GameData", message=game_data_json)
+        self.enqueue_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="GameData", message=game_data_json)
         
     async def update_purchase_data_payment_success(self, purchase_data:models.PurchaseData):
         """구매 데이터 업데이트 메시지를 보내는 메서드"""
         logger.info(f'구매 데이터 업데이트 메시지 전송 시도: 구매 ID {purchase_data.id}')
-        await self.send_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="PaymentSuccess", message=purchase_data.uuid)
+        self.enqueue_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="PaymentSuccess", message=purchase_data.uuid)
 
     async def update_purchase_data_chip_success(self, purchase_data:models.PurchaseData):
         """구매 데이터 업데이트 메시지를 보내는 메서드"""
         logger.info(f'구매 데이터 업데이트 메시지 전송 시도: 구매 ID {purchase_data.id}')
-        await self.send_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="ChipSuccess", message=purchase_data.uuid)
+        self.enqueue_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="ChipSuccess", message=purchase_data.uuid)
 
     async def register_customer_data(self, user_data:models.UserData):
         """사용자 데이터 생성 메시지를 보내는 메서드"""
         logger.info(f'사용자 데이터 생성 메시지 전송 시도: 사용자 ID {user_data.id}')
         user_data_json = user_data.to_json()
-        await self.send_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="RegisterCustomer", message=user_data_json)
+        self.enqueue_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="RegisterCustomer", message=user_data_json)
     
     async def add_point_history_data(self, point_history_data:models.PointHistoryData):
         """포인트 내역 데이터 생성 메시지를 보내는 메서드"""
         logger.info(f'포인트 내역 데이터 생성 메시지 전송 시도: 포인트 내역 ID {point_history_data.id}') 
-        await self.send_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="SavePoint", message={"customer_id":point_history_data.customer_id, 
+        self.enqueue_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="SavePoint", message={"customer_id":point_history_data.customer_id, 
                                                                                                                                                               "reason":point_history_data.reason, 
                                                                                                                                                               "point" : point_history_data.amount,
                                                                                                                                                               "expire_at" : point_history_data.expire_at.isoformat()})
@@ -662,29 +1402,28 @@ class ReverbTestController:
         """테이블 데이터 저장 메시지를 보내는 메서드"""
         logger.info(f'테이블 데이터 저장 메시지 전송 시도: 테이블 ID {tables[0].id}')
         tables_json = [table.to_json() for table in tables]
-        await self.send_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="TableData", message=tables_json)
+        self.enqueue_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="TableData", message=tables_json)
     
     async def save_preset(self, presets:models.PresetData):
         """프리셋 데이터 저장 메시지를 보내는 메서드"""
         logger.info(f'프리셋 데이터 저장 메시지 전송 시도: 프리셋 ID {presets.id}')
         presets_json = presets.to_json()
-        await self.send_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="PresetData", message=presets_json)
+        self.enqueue_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="PresetData", message=presets_json)
     async def delete_preset(self, preset_id:int):
         """프리셋 데이터 삭제 메시지를 보내는 메서드"""
         logger.info(f'프리셋 데이터 삭제 메시지 전송 시도: 프리셋 ID {preset_id}')
-        await self.send_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="PresetDelete", message=preset_id)
+        self.enqueue_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="PresetDelete", message=preset_id)
     async def add_awarding_history_data(self, awarding_history_data:models.AwardingHistoryData):
         """상금 내역 데이터 생성 메시지를 보내는 메서드"""
         logger.info(f'상금 내역 데이터 생성 메시지 전송 시도: 상금 내역 ID {awarding_history_data.id}')
-        await self.send_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="Awarding", message=awarding_history_data.to_json())
+        self.enqueue_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="Awarding", message=awarding_history_data.to_json())
     async def local_purchase_data(self, purchase_data:models.PurchaseData):
         """로컬 구매 데이터 생성 메시지를 보내는 메서드"""
         logger.info(f'로컬 구매 데이터 생성 메시지 전송 시도: 구매 ID {purchase_data.id}')
-        await self.send_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="LocalPurchaseLog", message=purchase_data.to_json())
+        self.enqueue_message("App\\Events\\WebSocketMessageListener", channel_name=self.channel_name+self.tenant_id, data_type="LocalPurchaseLog", message=purchase_data.to_json())
     
-    async def send_message(self, event_name, channel_name, data_type, message):
-        """메시지를 WebSocket을 통해 전송하는 메서드"""
-        subscription_message = {
+    def _build_message(self, event_name, channel_name, data_type, message):
+        return {
             "event": event_name,
             "channel": channel_name,
             "data": {
@@ -694,54 +1433,172 @@ class ReverbTestController:
                 "timestamp": datetime.now().isoformat()
             },
         }
-        
+    
+    def enqueue_message(self, event_name, channel_name, data_type, message) -> bool:
+        """
+        메시지를 송신 대기열에 넣고 바로 반환 (전송/재시도/저널 기록은 전송 태스크가 처리)
+        호출 시점의 내용으로 직렬화하므로 이후 ORM 객체가 바뀌어도 영향이 없습니다.
+        대기열이 가득 차면 저널에 바로 기록하고 False를 반환합니다.
+        """
+        text = json.dumps(self._build_message(event_name, channel_name, data_type, message))
+        if self._outbound is None or self._sender_task is None or self._sender_task.done():
+            if self._outbound is None:
+                self._outbound = asyncio.Queue(maxsize=OUTBOUND_QUEUE_SIZE)
+            self._sender_task = asyncio.create_task(self._sender_loop())
+        try:
+            self._outbound.put_nowait((self.tenant_id, text))
+            return True
+        except asyncio.QueueFull:
+            logger.warning('송신 대기열이 가득 차 메시지를 저널에 기록합니다.')
+            self._journal_message(self.tenant_id, text)
+            return False
+    
+    async def _sender_loop(self):
+        """송신 대기열의 메시지를 순서대로 전송 (연결이 없거나 실패하면 저널에 기록 후 재구독 시 재전송)"""
+        while True:
+            tenant_id, text = await self._outbound.get()
+            try:
+                await self._deliver(tenant_id, text)
+            except Exception as e:
+                logger.error(f'송신 대기열 처리 중 에러 발생: {e}')
+            finally:
+                self._outbound.task_done()
+    
+    def _journal_message(self, tenant_id, text):
+        self.queue_manager.save_message(tenant_id, json.loads(text))
+        self.outbound_journaled_count += 1
+    
+    async def _deliver(self, tenant_id, text):
         if not self.is_connected or not self.websocket or not self.is_subscribed:
             logger.warning('WebSocket이 연결되어 있지 않거나 구독되지 않았습니다.')
-            # 메시지를 JSON 파일에 저장
-            self.queue_manager.save_message(self.tenant_id, subscription_message)
+            # 메시지를 큐 저널에 저장
+            self._journal_message(tenant_id, text)
             return False
+        if self._replaying_journal:
+            # 재구독 후 저널 재전송 중에는 순서를 지키도록 저널 뒤에 이어 붙임
+            self._journal_message(tenant_id, text)
+            return True
             
         try:
-            await self.websocket.send(json.dumps(subscription_message))
-            logger.info(f'메시지 전송 성공: {event_name}')
+            await self.websocket.send(text)
+            self.outbound_sent_count += 1
             return True
         except Exception as e:
             logger.error(f'메시지 전송 실패: {e}')
-            # 실패한 메시지를 JSON 파일에 저장
-            self.queue_manager.save_message(self.tenant_id, subscription_message)
+            # 실패한 메시지를 큐 저널에 저장
+            self._journal_message(tenant_id, text)
             await self.reset_state()
             return False
+    
+    async def drain_outbound(self, timeout: float = OUTBOUND_DRAIN_TIMEOUT) -> bool:
+        """송신 대기열이 빌 때까지 대기 (시간 초과 시 남은 메시지는 저널에 기록)"""
+        if self._outbound is None:
+            return True
+        try:
+            await asyncio.wait_for(self._outbound.join(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            remaining = 0
+            while not self._outbound.empty():
+                tenant_id, text = self._outbound.get_nowait()
+                self._journal_message(tenant_id, text)
+                self._outbound.task_done()
+                remaining += 1
+            logger.warning(f'송신 대기열을 비우지 못해 메시지 {remaining}개를 저널에 기록했습니다.')
+            return False
+    
+    def pending_outbox_keys(self) -> dict:
+        """
+        저널에 남은(아직 중앙 서버로 보내지 않은) 로컬 변경의 엔티티 키 - 델타 동기화가 덮어쓰지 않도록
+        연결이 없을 때는 송신 태스크가 바로 저널에 기록하므로 저널만 확인합니다.
+        """
+        purchases = set()
+        if self.tenant_id:
+            for message_data in self.queue_manager.get_messages(self.tenant_id):
+                data = message_data.get('message', {}).get('data', {})
+                payload = data.get('data')
+                if data.get('dataType') == 'LocalPurchaseLog' and isinstance(payload, dict) and payload.get('uuid'):
+                    purchases.add(payload['uuid'])
+                elif data.get('dataType') in ('PaymentSuccess', 'ChipSuccess') and isinstance(payload, str):
+                    purchases.add(payload)
+        return {'purchases': purchases}
+    
+    def get_outbound_stats(self) -> dict:
+        return {
+            "queued": self._outbound.qsize() if self._outbound is not None else 0,
+            "max_queue_size": OUTBOUND_QUEUE_SIZE,
+            "sent": self.outbound_sent_count,
+            "journaled": self.outbound_journaled_count,
+            "compacted": self.outbox_compacted_count,
+        }
+    
+    async def send_message(self, event_name, channel_name, data_type, message):
+        """메시지를 WebSocket을 통해 바로 전송하는 메서드 (전송 결과가 필요할 때만 사용)"""
+        text = json.dumps(self._build_message(event_name, channel_name, data_type, message))
+        result = await self._deliver(self.tenant_id, text)
+        if result:
+            logger.info(f'메시지 전송 성공: {event_name}')
+        return result
 
     async def process_queued_messages(self):
-        """저장된 메시지 처리"""
-        if not self.is_connected or not self.websocket or not self.is_subscribed:
-            return False
-            
+        """
+        저장된 메시지 처리 (재구독 시 자동 실행)
+        재전송 중 새로 저널에 쌓인 메시지까지 모두 보낸 뒤 일반 전송으로 돌아갑니다.
+        """
+        self._replaying_journal = True
         try:
-            messages = self.queue_manager.get_messages(self.tenant_id)
-            if not messages:
-                return True
-                
-            logger.info(f'저장된 메시지 처리 시작: {len(messages)}개')
-            success = True
-            
-            for message_data in messages:
-                try:
-                    await self.websocket.send(json.dumps(message_data['message']))
-                    logger.info(f'저장된 메시지 전송 성공: {message_data["message"]["event"]}')
-                except Exception as e:
-                    logger.error(f'저장된 메시지 전송 실패: {e}')
-                    success = False
+            total = 0
+            while True:
+                if not self.is_connected or not self.websocket or not self.is_subscribed:
+                    return False
+                generation, messages = self.queue_manager.read_pending_batch(self.tenant_id)
+                if not messages:
                     break
-            
-            if success:
-                self.queue_manager.clear_messages(self.tenant_id)
-                logger.info('모든 저장된 메시지 처리 완료')
-            
-            return success
+                if total == 0:
+                    logger.info(f'저장된 메시지 처리 시작: {len(messages)}개')
+                if not await self._replay_messages(messages, generation):
+                    return False
+                total += len(messages)
+            if total:
+                logger.info(f'모든 저장된 메시지 처리 완료: {total}개')
+            return True
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f'저장된 메시지 처리 중 에러 발생: {e}')
             return False
+        finally:
+            self._replaying_journal = False
+            # 재전송 루프가 끝난 뒤에만 압축 (압축 후 이전 세대 오프셋 ack는 무시됨)
+            if self.queue_manager.needs_compaction(self.tenant_id):
+                asyncio.create_task(asyncio.to_thread(self.queue_manager.compact, self.tenant_id))
+
+    async def _replay_messages(self, messages, generation: int = None) -> bool:
+        success = True
+        acked_offset = None
+        # 같은 엔티티의 오래된 상태 메시지는 보내지 않음 (ack는 원래 저널 위치 기준)
+        compacted = compact_outbox(messages)
+        if len(compacted) < len(messages):
+            self.outbox_compacted_count += len(messages) - len(compacted)
+            logger.info(f'재전송 메시지 압축: {len(messages)}개 -> {len(compacted)}개')
+        for index, (offset, message_data) in enumerate(compacted, 1):
+            try:
+                await self.websocket.send(json.dumps(message_data['message']))
+            except Exception as e:
+                logger.error(f'저장된 메시지 전송 실패: {e}')
+                success = False
+                break
+            acked_offset = offset
+            # 중간에 끊겨도 보낸 메시지는 다시 보내지 않도록 주기적으로 ack 기록
+            if index % JOURNAL_ACK_BATCH == 0:
+                self.queue_manager.ack(self.tenant_id, acked_offset, generation)
+        if success:
+            # 마지막에 빠진 메시지까지 전송 완료로 기록
+            acked_offset = messages[-1][0]
+        
+        if acked_offset is not None:
+            self.queue_manager.ack(self.tenant_id, acked_offset, generation)
+        return success
 
     async def subscribe_send_message(self, event_name, channel_name, data_type, message):
         """이전 버전의 메시지 전송 메서드 (하위 호환성을 위해 유지)"""
@@ -766,6 +1623,14 @@ class ReverbTestController:
         """로그아웃 처리를 수행하는 메서드"""
         logger.info('로그아웃 처리 시작')
         try:
+            # 대기 중인 알림을 먼저 전송 (연결이 없으면 저널에 기록)
+            await self.drain_outbound()
+            
+            # 재연결 중단
+            await self.stop_supervisor()
+            if self._replay_task and not self._replay_task.done():
+                self._replay_task.cancel()
+            
             # 리스닝 태스크 취소
             if self._listening_task and not self._listening_task.done():
                 self._listening_task.cancel()
@@ -786,8 +1651,10 @@ class ReverbTestController:
             self.bearer_token = ""
             self.socket_id = ""
             self.message_queue = []
+            self.queue_manager.sync(self.tenant_id)
             self.auth_event.clear()
             self.is_offline_mode = False
+            self.connection_state = "stopped"
             
             # 인증 데이터는 유지 (user_id, user_pwd, stores, tenant_id, store_name)
             
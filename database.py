@@ -2,13 +2,23 @@ from datetime import datetime
 import ssl
 from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 import os
+import asyncio
 import logging
+import threading
+import time
+import traceback
+import weakref
+from collections import OrderedDict
 from fastapi import Depends, Request, HTTPException
-import requests 
-from starlette.middleware.base import BaseHTTPMiddleware
-from contextlib import contextmanager
+from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.datastructures import Headers, QueryParams
+from contextvars import Context, ContextVar
+from typing import Optional
+from contextlib import contextmanager, asynccontextmanager
 import aiohttp
 import json
 
@@ -23,29 +33,121 @@ logger.addHandler(handler)
 # Base 클래스 생성
 Base = declarative_base()
 
-# 전역 변수로 현재 선택된 매장 ID 저장
-current_store_id = None
+# 매장 DB 연결마다 적용되는 SQLite PRAGMA 프로파일
+# - journal_mode=WAL: 쓰기 중에도 읽기가 막히지 않음
+# - synchronous=NORMAL: WAL 모드에서는 체크포인트 시점에만 fsync (커밋마다 fsync 하지 않음)
+# - mmap_size / cache_size: 읽기 위주 조회(리포트, 포인트 내역)의 디스크 I/O 감소
+# - busy_timeout: 동시 쓰기 시 즉시 'database is locked' 대신 잠시 대기
+DEFAULT_SQLITE_PRAGMAS = {
+    "encoding": "'UTF-8'",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,  # 256MB
+    "cache_size": -64 * 1024,  # 음수는 KiB 단위 (64MB)
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,  # ms
+}
 
-def set_current_store_id(store_id):
-    """현재 선택된 매장 ID 설정"""
-    global current_store_id
-    current_store_id = store_id
-    logger.info(f"현재 매장 ID 설정: {store_id}")
+# 매장별 커넥션 풀 설정 (동기/비동기 엔진 공통)
+DEFAULT_POOL_CONFIG = {
+    "pool_size": 5,  # 상시 유지 연결 수
+    "max_overflow": 10,  # 순간적으로 추가 허용하는 연결 수
+    "pool_timeout": 10,  # 연결을 얻지 못하면 10초 후 오류 (무한 대기 방지)
+    "pool_recycle": 3600,  # 1시간 지난 연결은 재생성
+}
+
+# 동시에 열어 두는 매장 엔진 수와 유휴 엔진 정리 기준
+DEFAULT_MAX_OPEN_STORES = 8
+DEFAULT_ENGINE_IDLE_TIMEOUT = 600  # 초
+
+# 세션 누수 감지 기준 (트랜잭션을 이 시간 이상 잡고 있으면 경고)
+DEFAULT_SESSION_LEAK_THRESHOLD = 60  # 초
+DEFAULT_MAINTENANCE_INTERVAL = 30  # 초
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    """DBAPI 연결에 PRAGMA 프로파일 적용"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+# 요청/WebSocket 단위로 선택된 매장 ID (ContextVar라서 동시 요청 간에 섞이지 않음)
+_current_store_id: ContextVar[Optional[int]] = ContextVar("current_store_id", default=None)
+
+# 요청에 매장 ID가 없을 때 사용할 기본 매장 (/select-store 로 선택한 매장)
+default_store_id = None
+
+def set_default_store_id(store_id):
+    """요청에 매장 ID가 없을 때 사용할 기본 매장 ID 설정"""
+    global default_store_id
+    default_store_id = store_id
+    logger.info(f"기본 매장 ID 설정: {store_id}")
     return store_id
 
+def set_current_store_id(store_id):
+    """현재 컨텍스트(요청, WebSocket, 태스크)의 매장 ID 설정. reset용 토큰 반환"""
+    return _current_store_id.set(store_id)
+
+def reset_current_store_id(token):
+    """set_current_store_id 이전 상태로 복원"""
+    _current_store_id.reset(token)
+
 def get_current_store_id():
-    """현재 선택된 매장 ID 반환"""
-    global current_store_id
-    if current_store_id is None:
-        logger.warning("현재 선택된 매장이 없습니다. 기본 매장 ID를 사용합니다.")
-        return 0  # 기본 매장 ID
-    return current_store_id
+    """현재 컨텍스트의 매장 ID 반환 (없으면 기본 매장)"""
+    store_id = _current_store_id.get()
+    if store_id is not None:
+        return store_id
+    if default_store_id is not None:
+        return default_store_id
+    logger.warning("현재 선택된 매장이 없습니다. 기본 매장 ID를 사용합니다.")
+    return 0  # 기본 매장 ID
+
+@contextmanager
+def store_context(store_id):
+    """블록 안에서만 지정한 매장 ID를 사용 (백그라운드 작업용)"""
+    token = set_current_store_id(store_id)
+    try:
+        yield store_id
+    finally:
+        reset_current_store_id(token)
 
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, pragma_profile=None, db_directory=None, pool_config=None,
+                 max_open_stores=DEFAULT_MAX_OPEN_STORES, engine_idle_timeout=DEFAULT_ENGINE_IDLE_TIMEOUT,
+                 session_leak_threshold=DEFAULT_SESSION_LEAK_THRESHOLD):
+        # 기본 프로파일에 매장 환경별 설정을 덮어씀 (값이 None이면 해당 PRAGMA 미적용)
+        self.pragma_profile = {
+            name: value
+            for name, value in {**DEFAULT_SQLITE_PRAGMAS, **(pragma_profile or {})}.items()
+            if value is not None
+        }
+        self.pool_config = {**DEFAULT_POOL_CONFIG, **(pool_config or {})}
+        self.max_open_stores = max_open_stores
+        self.engine_idle_timeout = engine_idle_timeout
+        self.session_leak_threshold = session_leak_threshold
+        # 매장별 마지막 사용 시각 (LRU 순서 유지)
+        self.last_used = OrderedDict()
+        # 트랜잭션(연결)을 잡고 있는 세션: session -> {store_id, began_at, opened_by}
+        # 닫지 않고 버려진 세션은 after_transaction_end가 오지 않으므로 약한 참조로 보관해 GC 시 함께 제거
+        self.active_sessions = weakref.WeakKeyDictionary()
+        self._reported_leaks = weakref.WeakSet()
+        # 세션 이벤트는 수신 이벤트 작업 스레드에서도 발생하므로 기록은 잠금 안에서
+        self._session_lock = threading.Lock()
+        self._maintenance_task = None
+        event.listen(Session, "after_begin", self._on_session_begin)
+        event.listen(Session, "after_transaction_end", self._on_session_transaction_end)
         self.engines = {}
         self.session_makers = {}
-        self.db_directory = os.path.join(os.path.expanduser("~/.dealer_desk"), ".databases")  # 윈도우 호환성을 위해 경로 수정
+        self.async_engines = {}
+        self.async_session_makers = {}
+        # 새로 생성되어 중앙 서버 초기 동기화가 필요한 매장
+        self.pending_initial_sync = set()
+        # 매장별 초기화 태스크와 상태 (pending, initializing, ready, failed)
+        self.init_tasks = {}
+        self.store_status = {}
+        self.db_directory = db_directory or os.path.join(os.path.expanduser("~/.dealer_desk"), ".databases")  # 윈도우 호환성을 위해 경로 수정
         
         # 데이터베이스 디렉토리가 없으면 생성
         if not os.path.exists(self.db_directory):
@@ -63,14 +165,27 @@ class DatabaseManager:
         
         engine = create_engine(
             f"sqlite:///{db_path}",
-            connect_args={"check_same_thread": False}
+            connect_args={"check_same_thread": False},
+            poolclass=QueuePool,
+            **self.pool_config
         )
         
         @event.listens_for(engine, "connect")
         def set_sqlite_pragma(dbapi_connection, connection_record):
-            cursor = dbapi_connection.cursor()
-            cursor.execute("PRAGMA encoding='UTF-8'")
-            cursor.close()
+            apply_sqlite_pragmas(dbapi_connection, self.pragma_profile)
+            
+        return engine
+    
+    def create_async_engine_for_store(self, store_id):
+        """매장별 비동기 데이터베이스 엔진 생성 (aiosqlite)"""
+        db_path = self.get_db_path(store_id)
+        logger.info(f"비동기 데이터베이스 엔진 생성 시도: {db_path}")
+        
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", **self.pool_config)
+        
+        @event.listens_for(engine.sync_engine, "connect")
+        def set_sqlite_pragma(dbapi_connection, connection_record):
+            apply_sqlite_pragmas(dbapi_connection, self.pragma_profile)
             
         return engine
     
@@ -93,241 +208,245 @@ class DatabaseManager:
                 bind=engine
             )
             
-            # models 모듈 임포트
+            # 컨트롤러용 비동기 엔진 생성 (이벤트 루프를 막지 않도록 aiosqlite 사용)
+            async_engine = self.create_async_engine_for_store(store_id)
+            self.async_engines[store_id] = async_engine
+            self.async_session_makers[store_id] = async_sessionmaker(
+                bind=async_engine,
+                class_=AsyncSession,
+                autoflush=False,
+                expire_on_commit=False
+            )
+            
+            # models 모듈 임포트 (테이블 메타데이터 등록)
             import models
-            import main
             
             # 데이터베이스 파일이 없거나 테이블이 없으면 생성
             db_path = self.get_db_path(store_id)
             if not os.path.exists(db_path):
                 logger.info(f"매장 {store_id}의 새 데이터베이스 파일 생성")
                 Base.metadata.create_all(bind=engine)
-                db = self.session_makers[store_id]()
-                # 서버에 데이터 가져오기
-                try:
-                    # 오프라인 모드가 아닐 때만 서버에서 데이터 동기화 시도
-                    if not main.socket_controller.is_offline_mode:
-                        host_name = next((store['host'] for store in main.socket_controller.stores if store['id'] == store_id), None)
-                        request_url = f"http://{main.socket_controller.base_url}/api/sync/all/{host_name}"
-                        headers = {
-                            'Content-Type': 'application/json',
-                            'Accept': 'application/json',
-                            "Authorization": f"Bearer {main.socket_controller.bearer_token}"
-                        }
-                        logger.info(request_url)
-                        logger.info(f"Bearer 토큰: {main.socket_controller.bearer_token}")
-                        
-                        # 데이터베이스 디렉토리 확인 및 생성
-                        db_dir = os.path.dirname(db_path)
-                        if not os.path.exists(db_dir):
-                            os.makedirs(db_dir)
-                            logger.info(f"데이터베이스 디렉토리 생성: {db_dir}")
-                        
-                        # SSL 인증서 검증을 비활성화하는 컨텍스트 생성
-                        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-                        ssl_context.minimum_version = ssl.TLSVersion.TLSv1_2
-                        ssl_context.maximum_version = ssl.TLSVersion.TLSv1_3
-                        ssl_context.check_hostname = False
-                        ssl_context.verify_mode = ssl.CERT_NONE
-                        
-                        session = requests.Session()
-                        response = session.get(request_url, headers=headers,)
-                        
-                        if response.status_code == 200:
-                            data = response.json()
-                            logger.info(f"매장 {store_id}의 데이터 동기화 성공")
-                            logger.info(f"매장 {store_id}의 데이터: {data}")
-                            
-                            # 데이터 저장 전에 트랜잭션 관리 개선
-                            try:
-                                # 테이블 데이터 저장
-                                if 'tables' in data and data['tables']:
-                                    for table in data['tables']:
-                                        # 테이블 데이터에서 필요한 필드만 추출하여 모델 생성
-                                        table_obj = {}
-                                        for key, value in table.items():
-                                            if hasattr(models.TableData, key):
-                                                # title이 {"ko": name} 형식으로 들어오는 경우 name만 추출
-                                                if key == "title" and isinstance(value, dict) and "ko" in value:
-                                                    table_obj[key] = value["ko"]
-                                                else:
-                                                    table_obj[key] = value
-                                        table_data = models.TableData(**table_obj)
-                                        db.add(table_data)
-                                    db.commit()
-                                
-                                # 프리셋 데이터 저장
-                                if 'presets' in data and data['presets']:
-                                    for preset in data['presets']:
-                                        preset_obj = {}
-                                        for key, value in preset.items():
-                                            if hasattr(models.PresetData, key):
-                                                preset_obj[key] = value
-                                        preset_data = models.PresetData(**preset_obj)
-                                        db.add(preset_data)
-                                    db.commit()
-                                
-                                # 게임 데이터 저장
-                                if 'games' in data and data['games']:
-                                    for game in data['games']:
-                                        game_obj = {}
-                                        for key, value in game.items():
-                                            if key == 'starting_chip':
-                                                print(f"starting_chip: {value}")
-                                                game_obj['starting_chip'] = value
-                                            elif key == 'starting_chips':
-                                                print(f"starting_chips -> starting_chip으로 변환: {value}")
-                                                game_obj['starting_chip'] = value
-                                            if hasattr(models.GameData, key):
-                                                # datetime 필드 처리
-                                                if key in ['game_start_time', 'game_calcul_time', 'game_stop_time', 'game_end_time'] and isinstance(value, str):
-                                                    try:
-                                                        if 'T' in value:  # ISO 형식
-                                                            game_obj[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                                                        else:  # 일반 형식
-                                                            game_obj[key] = datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
-                                                    except ValueError:
-                                                        logger.warning(f"게임 날짜 형식 변환 실패: {key}={value}, None으로 설정")
-                                                        game_obj[key] = None
-                                                # title 필드 처리 (dict 형식인 경우)
-                                                elif key == 'title' and isinstance(value, dict) and 'ko' in value:
-                                                    game_obj[key] = value['ko']
-                                                # starting_chip 필드를 starting_chip으로 변환
-                                                    # JSON 필드는 그대로 저장 (문자열로 변환하지 않음)
-                                                elif key in ['game_in_player', 'table_connect_log', 'time_table_data', 'rebuyin_payment_chips', 
-                                                           'rebuyin_number_limits', 'addon_data', 'prize_settings', 'rebuy_cut_off']:
-                                                    # 문자열로 들어온 경우 JSON으로 파싱
-                                                    if isinstance(value, str):
-                                                        try:
-                                                            game_obj[key] = json.loads(value)
-                                                        except json.JSONDecodeError:
-                                                            logger.warning(f"JSON 파싱 실패: {key}={value}, 빈 배열로 설정")
-                                                            game_obj[key] = []
-                                                    else:
-                                                        game_obj[key] = value
-                                                else:
-                                                    game_obj[key] = value
-                                        game_data = models.GameData(**game_obj)
-                                        db.add(game_data)
-                                    db.commit()
-                                # 포인트 데이터 저장
-                                if 'points' in data and data['points']:
-                                    for point in data['points']:
-                                        point_obj = {}
-                                        for key, value in point.items():
-                                            if hasattr(models.PointHistoryData, key):
-                                                # datetime 필드 처리
-                                                if key in ['expire_at', 'created_at'] and isinstance(value, str):
-                                                    try:
-                                                        if 'T' in value:  # ISO 형식
-                                                            point_obj[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                                                        else:  # 일반 형식
-                                                            point_obj[key] = datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
-                                                    except ValueError:
-                                                        logger.warning(f"날짜 형식 변환 실패: {key}={value}, None으로 설정")
-                                                        point_obj[key] = None
-                                                else:
-                                                    point_obj[key] = value
-                                        point_data = models.PointHistoryData(**point_obj)
-                                        db.add(point_data)
-                                    db.commit()
-                                
-                                # 고객 데이터 저장
-                                if 'customers' in data and data['customers']:
-                                    for customer in data['customers']:
-                                        customer_obj = {}
-                                        for key, value in customer.items():
-                                            if hasattr(models.UserData, key):
-                                                # datetime 문자열을 datetime 객체로 변환
-                                                if key in ['register_at', 'last_visit_at'] and isinstance(value, str):
-                                                    try:
-                                                        customer_obj[key] = datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
-                                                    except ValueError:
-                                                        try:
-                                                            # ISO 형식 시도
-                                                            customer_obj[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                                                        except ValueError:
-                                                            logger.warning(f"날짜 형식 변환 실패: {key}={value}, 현재 시간으로 설정")
-                                                            customer_obj[key] = datetime.now()
-                                                else:
-                                                    customer_obj[key] = value
-                                        customer_data = models.UserData(**customer_obj)
-                                        db.add(customer_data)
-                                    db.commit()
-                                
-                                # 구매 데이터 저장
-                                if 'purchases' in data and data['purchases']:
-                                    for purchase in data['purchases']:
-                                        purchase_obj = {}
-                                        for key, value in purchase.items():
-                                            if hasattr(models.PurchaseData, key):
-                                                # datetime 필드 처리
-                                                if key.endswith('_at') and isinstance(value, str):
-                                                    try:
-                                                        if 'T' in value:  # ISO 형식
-                                                            purchase_obj[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                                                        else:  # 일반 형식
-                                                            purchase_obj[key] = datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
-                                                    except ValueError:
-                                                        logger.warning(f"날짜 형식 변환 실패: {key}={value}, 현재 시간으로 설정")
-                                                        purchase_obj[key] = datetime.now()
-                                                else:
-                                                    purchase_obj[key] = value
-                                        purchase_data = models.PurchaseData(**purchase_obj)
-                                        db.add(purchase_data)
-                                    db.commit()
-                                # 상금 내역 데이터 저장
-                                if 'awardings' in data and data['awardings']:
-                                    for awarding in data['awardings']:
-                                        awarding_obj = {}
-                                        for key, value in awarding.items():
-                                            if hasattr(models.AwardingHistoryData, key):
-                                                if key.endswith('_at') and isinstance(value, str):
-                                                    try:
-                                                        awarding_obj[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                                                    except ValueError:
-                                                        logger.warning(f"날짜 형식 변환 실패: {key}={value}, 현재 시간으로 설정")
-                                                        awarding_obj[key] = datetime.now()
-                                                else:
-                                                    awarding_obj[key] = value
-                                                    
-                                        awarding_data = models.AwardingHistoryData(**awarding_obj)
-                                        db.add(awarding_data)
-                                    db.commit()
-                                
-                            except Exception as tx_error:
-                                db.rollback()
-                                logger.error(f"데이터 저장 중 오류 발생: {tx_error}")
-                                raise
-                        else:
-                            logger.warning(f"매장 {store_id}의 데이터 동기화 실패: 상태 코드 {response.status_code}")
-                    else:
-                        logger.info(f"오프라인 모드로 실행 중이므로 매장 {store_id}의 데이터 동기화를 건너뜁니다")
-                except Exception as sync_error:
-                    logger.error(f"매장 {store_id}의 데이터 동기화 중 오류 발생: {sync_error}")
-                    # 동기화 실패해도 기본 테이블은 생성
-                finally:
-                    db.close()
+                # 서버 데이터 가져오기는 initialize_store_db_async에서 스트리밍으로 수행
+                self.pending_initial_sync.add(store_id)
             else:
                 # 기존 데이터베이스에 누락된 테이블이 있는지 확인하고 생성
                 logger.info(f"매장 {store_id}의 기존 데이터베이스 테이블 검사")
                 Base.metadata.create_all(bind=engine)
             
+            # 기존 DB에 인덱스 등 스키마 변경 적용 (실행 계획 검사는 테스트/`python migrations.py`에서)
+            from migrations import run_migrations
+            applied = run_migrations(engine)
+            if applied:
+                logger.info(f"매장 {store_id}에 마이그레이션 적용: {applied}")
+            
             logger.info(f"매장 {store_id}의 데이터베이스 초기화 완료")
             
         except Exception as e:
             logger.error(f"매장 {store_id}의 데이터베이스 초기화 중 오류 발생: {e}")
             raise
     
-    def get_db(self, store_id=None):
-        """매장별 데이터베이스 세션 생성 (FastAPI 의존성 주입용)"""
+    def _central_sync_target(self, store_id):
+        """중앙 서버 동기화 대상 (base_url, host_name, bearer_token). 오프라인이면 None"""
+        import main
+        
+        socket_controller = main.socket_controller
+        if socket_controller is None or socket_controller.is_offline_mode:
+            return None
+        host_name = next((store['host'] for store in socket_controller.stores if store['id'] == store_id), None)
+        return socket_controller.base_url, host_name, socket_controller.bearer_token
+    
+    def _central_http_session(self):
+        """중앙 서버 호출에 재사용할 HTTP 세션 (소켓 컨트롤러 소유, 없으면 None)"""
+        import main
+        
+        socket_controller = main.socket_controller
+        return socket_controller.get_http_session() if socket_controller is not None else None
+    
+    def _pending_outbox_keys(self):
+        """전송 대기 중인 로컬 변경이 있는 엔티티 키 (델타 동기화 시 덮어쓰지 않음)"""
+        import main
+        
+        socket_controller = main.socket_controller
+        return socket_controller.pending_outbox_keys() if socket_controller is not None else None
+    
+    def _sync_progress_logger(self, store_id):
+        def log_progress(entity, count, done):
+            if done:
+                logger.info(f"매장 {store_id} {entity} 동기화 완료: {count}건")
+            else:
+                logger.debug(f"매장 {store_id} {entity} 동기화 중: {count}건")
+        return log_progress
+    
+    async def _migrate_synced_game_players(self, store_id):
+        """동기화로 받은 game_in_player JSON을 game_player_data 행으로 변환"""
+        from Controllers.game_player_manager import migrate_legacy_game_players
+        
+        async with self.async_engines[store_id].begin() as connection:
+            await connection.run_sync(migrate_legacy_game_players)
+    
+    async def initialize_store_db_async(self, store_id, progress_callback=None):
+        """
+        매장별 데이터베이스 초기화
+        새 DB는 중앙 서버 전체 데이터를 스트리밍으로 가져오고, 기존 DB는 변경분만 동기화
+        """
+        self.initialize_store_db(store_id)
+        if store_id not in self.pending_initial_sync:
+            await self.sync_store_delta(store_id, progress_callback=progress_callback)
+            return
+        self.pending_initial_sync.discard(store_id)
+        
+        from sync_importer import download_and_import, save_sync_cursors, IMPORT_SPECS
+        
+        try:
+            # 오프라인 모드가 아닐 때만 서버에서 데이터 동기화 시도
+            target = self._central_sync_target(store_id)
+            if target is None:
+                logger.info(f"오프라인 모드로 실행 중이므로 매장 {store_id}의 데이터 동기화를 건너뜁니다")
+                return
+            base_url, host_name, bearer_token = target
+            request_url = f"http://{base_url}/api/sync/all/{host_name}"
+            logger.info(request_url)
+            
+            importer = await download_and_import(
+                self.async_engines[store_id],
+                request_url,
+                bearer_token,
+                progress_callback=progress_callback or self._sync_progress_logger(store_id),
+                session=self._central_http_session()
+            )
+            if importer is not None:
+                await self._migrate_synced_game_players(store_id)
+                # 이후 델타 동기화의 시작점 기록
+                await save_sync_cursors(
+                    self.async_engines[store_id],
+                    {entity: importer.cursor_for(entity) for entity in IMPORT_SPECS}
+                )
+                logger.info(f"매장 {store_id}의 데이터 동기화 성공: {importer.counts}")
+            else:
+                logger.warning(f"매장 {store_id}의 데이터 동기화 실패")
+        except Exception as sync_error:
+            logger.error(f"매장 {store_id}의 데이터 동기화 중 오류 발생: {sync_error}")
+            # 동기화 실패해도 기본 테이블은 생성됨
+    
+    async def sync_store_delta(self, store_id, entities=None, progress_callback=None):
+        """엔티티별 updated_since 커서 이후 변경분만 중앙 서버에서 가져오기. 엔티티별 건수 반환"""
+        from sync_importer import delta_sync
+        
+        if store_id not in self.async_engines:
+            self.initialize_store_db(store_id)
+        target = self._central_sync_target(store_id)
+        if target is None:
+            logger.info(f"오프라인 모드로 실행 중이므로 매장 {store_id}의 델타 동기화를 건너뜁니다")
+            return None
+        base_url, host_name, bearer_token = target
+        try:
+            results = await delta_sync(
+                self.async_engines[store_id],
+                base_url,
+                host_name,
+                bearer_token,
+                entities=entities,
+                progress_callback=progress_callback or self._sync_progress_logger(store_id),
+                session=self._central_http_session(),
+                protected=self._pending_outbox_keys()
+            )
+            await self._migrate_synced_game_players(store_id)
+            logger.info(f"매장 {store_id}의 델타 동기화 결과: {results}")
+            return results
+        except Exception as sync_error:
+            logger.error(f"매장 {store_id}의 델타 동기화 중 오류 발생: {sync_error}")
+            return None
+    
+    def _set_store_status(self, store_id, status, error=None):
+        entry = self.store_status.setdefault(store_id, {"store_id": store_id})
+        entry["status"] = status
+        entry["error"] = error
+        if status == "initializing":
+            entry["started_at"] = datetime.now().isoformat()
+            entry["finished_at"] = None
+        elif status in ("ready", "failed"):
+            entry["finished_at"] = datetime.now().isoformat()
+    
+    async def _run_store_init(self, store_id, semaphore=None):
+        """매장 초기화 태스크 본체 (동시 실행 수 제한용 semaphore 선택)"""
+        try:
+            if semaphore is not None:
+                async with semaphore:
+                    self._set_store_status(store_id, "initializing")
+                    await self.initialize_store_db_async(store_id)
+            else:
+                self._set_store_status(store_id, "initializing")
+                await self.initialize_store_db_async(store_id)
+            self._set_store_status(store_id, "ready")
+            return True
+        except Exception as e:
+            logger.error(f"매장 {store_id} 데이터베이스 초기화 실패: {e}")
+            self._set_store_status(store_id, "failed", error=str(e))
+            return False
+    
+    def _start_store_init(self, store_id, semaphore=None):
+        """매장 초기화 태스크 시작 (이미 진행 중이거나 완료된 태스크가 있으면 재사용)"""
+        task = self.init_tasks.get(store_id)
+        # 실패하거나 취소된 태스크만 다시 시작
+        if task is not None and (not task.done() or (not task.cancelled() and task.result())):
+            return task
+        self._set_store_status(store_id, "pending")
+        task = asyncio.create_task(self._run_store_init(store_id, semaphore))
+        self.init_tasks[store_id] = task
+        return task
+    
+    async def ensure_store_ready(self, store_id):
+        """매장 초기화가 끝날 때까지 대기 (백그라운드에서 진행 중이면 해당 태스크를 기다림)"""
+        task = self._start_store_init(store_id)
+        # 요청이 취소되어도 초기화 태스크는 계속 진행
+        return await asyncio.shield(task)
+    
+    def warm_up_stores(self, store_ids, concurrency=2):
+        """선택되지 않은 매장들을 백그라운드에서 동시 concurrency개씩 초기화"""
+        semaphore = asyncio.Semaphore(concurrency)
+        return [self._start_store_init(store_id, semaphore) for store_id in store_ids]
+    
+    def get_store_status(self):
+        """매장별 초기화 상태 목록"""
+        return [dict(entry) for entry in self.store_status.values()]
+    
+    async def cancel_store_warmups(self):
+        """진행 중인 매장 초기화 태스크 취소 (로그아웃 시)"""
+        tasks = [task for task in self.init_tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.init_tasks.clear()
+        self.store_status.clear()
+    
+    def _prepare_store(self, store_id):
+        """세션 생성 전 매장 엔진 준비, LRU 갱신, 필요 시 유휴 엔진 정리 예약"""
         if store_id is None:
             store_id = get_current_store_id()
-            
         if store_id not in self.session_makers:
             self.initialize_store_db(store_id)
-            
-        db = self.session_makers[store_id]()
+        self.last_used[store_id] = time.monotonic()
+        self.last_used.move_to_end(store_id)
+        self._ensure_maintenance_task()
+        if len(self.engines) > self.max_open_stores:
+            try:
+                asyncio.get_running_loop().create_task(self.evict_idle_engines())
+            except RuntimeError:
+                pass
+        return store_id
+    
+    def _open_session(self, session_maker, store_id):
+        """세션 생성 + 누수 추적용 정보 기록 (세션을 연 코드 위치)"""
+        session = session_maker()
+        session.info["db_manager"] = self
+        session.info["store_id"] = store_id
+        session.info["opened_by"] = _caller_stack()
+        return session
+    
+    def get_db(self, store_id=None):
+        """매장별 데이터베이스 세션 생성 (FastAPI 의존성 주입용)"""
+        store_id = self._prepare_store(store_id)
+        db = self._open_session(self.session_makers[store_id], store_id)
         try:
             yield db
         finally:
@@ -336,13 +455,8 @@ class DatabaseManager:
     @contextmanager
     def get_db_session(self, store_id=None):
         """매장별 데이터베이스 세션 생성 (컨텍스트 매니저)"""
-        if store_id is None:
-            store_id = get_current_store_id()
-            
-        if store_id not in self.session_makers:
-            self.initialize_store_db(store_id)
-            
-        db = self.session_makers[store_id]()
+        store_id = self._prepare_store(store_id)
+        db = self._open_session(self.session_makers[store_id], store_id)
         try:
             yield db
         finally:
@@ -350,13 +464,186 @@ class DatabaseManager:
     
     def get_db_direct(self, store_id=None):
         """매장별 데이터베이스 세션 직접 반환 (컨트롤러용)"""
-        if store_id is None:
-            store_id = get_current_store_id()
-            
-        if store_id not in self.session_makers:
-            self.initialize_store_db(store_id)
-            
-        return self.session_makers[store_id]()
+        store_id = self._prepare_store(store_id)
+        return self._open_session(self.session_makers[store_id], store_id)
+    
+    async def get_async_db(self, store_id=None):
+        """매장별 비동기 데이터베이스 세션 생성 (FastAPI 의존성 주입용)"""
+        async with self.get_async_db_session(store_id) as db:
+            yield db
+    
+    @asynccontextmanager
+    async def get_async_db_session(self, store_id=None):
+        """매장별 비동기 데이터베이스 세션 생성 (컨텍스트 매니저)"""
+        db = self.get_async_db_direct(store_id)
+        try:
+            yield db
+        finally:
+            await db.close()
+    
+    def get_async_db_direct(self, store_id=None) -> AsyncSession:
+        """매장별 비동기 데이터베이스 세션 직접 반환 (컨트롤러용, 사용 후 await db.close() 필요)"""
+        store_id = self._prepare_store(store_id)
+        return self._open_session(self.async_session_makers[store_id], store_id)
+    
+    # ---- 세션 누수 감지 ----
+    
+    def _on_session_begin(self, session, transaction, connection):
+        if session.info.get("db_manager") is not self:
+            return
+        with self._session_lock:
+            self.active_sessions.setdefault(session, {
+                "store_id": session.info.get("store_id"),
+                "began_at": time.monotonic(),
+                "opened_by": session.info.get("opened_by"),
+            })
+    
+    def _on_session_transaction_end(self, session, transaction):
+        # 최상위 트랜잭션이 끝나면 (commit, rollback, close) 연결 반환
+        if transaction.parent is None:
+            with self._session_lock:
+                self.active_sessions.pop(session, None)
+                self._reported_leaks.discard(session)
+    
+    def _leaked_sessions(self, threshold=None):
+        """threshold(초) 이상 트랜잭션을 잡고 있는 (세션, 정보) 목록 (오래된 순)"""
+        threshold = self.session_leak_threshold if threshold is None else threshold
+        now = time.monotonic()
+        with self._session_lock:
+            sessions = list(self.active_sessions.items())
+        leaks = [
+            (session, {**info, "session_id": id(session), "held_seconds": round(now - info["began_at"], 1)})
+            for session, info in sessions
+            if now - info["began_at"] >= threshold
+        ]
+        return sorted(leaks, key=lambda item: item[1]["held_seconds"], reverse=True)
+    
+    def find_leaked_sessions(self, threshold=None):
+        """threshold(초) 이상 트랜잭션을 잡고 있는 세션 목록 (오래된 순)"""
+        return [leak for _, leak in self._leaked_sessions(threshold)]
+    
+    def report_leaked_sessions(self):
+        """새로 감지된 누수 세션을 세션을 연 코드 위치와 함께 경고 로그로 출력"""
+        leaks = []
+        for session, leak in self._leaked_sessions():
+            leaks.append(leak)
+            with self._session_lock:
+                if session in self._reported_leaks:
+                    continue
+                self._reported_leaks.add(session)
+            logger.warning(
+                f"매장 {leak['store_id']} 세션이 {leak['held_seconds']}초 동안 닫히지 않았습니다 (db.close() 누락 의심)\n"
+                f"{leak['opened_by']}"
+            )
+        return leaks
+    
+    # ---- 유휴 엔진 정리 ----
+    
+    def _checked_out(self, store_id):
+        """매장 엔진에서 사용 중인 연결 수 (동기 + 비동기)"""
+        count = 0
+        if store_id in self.engines:
+            count += self.engines[store_id].pool.checkedout()
+        if store_id in self.async_engines:
+            count += self.async_engines[store_id].sync_engine.pool.checkedout()
+        return count
+    
+    def _is_evictable(self, store_id):
+        if store_id == default_store_id or store_id == _current_store_id.get():
+            return False
+        task = self.init_tasks.get(store_id)
+        if task is not None and not task.done():
+            return False
+        return self._checked_out(store_id) == 0
+    
+    async def evict_store_engine(self, store_id):
+        """매장 엔진 정리 (다음 요청 시 initialize_store_db로 다시 생성)"""
+        engine = self.engines.pop(store_id, None)
+        async_engine = self.async_engines.pop(store_id, None)
+        self.session_makers.pop(store_id, None)
+        self.async_session_makers.pop(store_id, None)
+        self.last_used.pop(store_id, None)
+        if engine is not None:
+            engine.dispose()
+        if async_engine is not None:
+            await async_engine.dispose()
+        logger.info(f"매장 {store_id}의 유휴 데이터베이스 엔진 정리")
+    
+    async def evict_idle_engines(self):
+        """유휴 시간이 지난 엔진과, 최대 개수를 넘는 가장 오래 안 쓴 엔진 정리"""
+        now = time.monotonic()
+        evicted = []
+        for store_id, last_used in list(self.last_used.items()):
+            over_capacity = len(self.engines) - len(evicted) > self.max_open_stores
+            idle = now - last_used >= self.engine_idle_timeout
+            if not (over_capacity or idle):
+                continue
+            if self._is_evictable(store_id):
+                evicted.append(store_id)
+        for store_id in evicted:
+            await self.evict_store_engine(store_id)
+        return evicted
+    
+    def _ensure_maintenance_task(self):
+        """이벤트 루프가 있으면 누수 감지/유휴 엔진 정리 주기 작업 시작"""
+        if self._maintenance_task is not None and not self._maintenance_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # 세션을 처음 연 요청의 매장 ID가 유지 작업에 남지 않도록 빈 컨텍스트에서 실행
+        self._maintenance_task = loop.create_task(self._maintenance_loop(), context=Context())
+    
+    async def _maintenance_loop(self, interval=DEFAULT_MAINTENANCE_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.report_leaked_sessions()
+                await self.evict_idle_engines()
+            except Exception as e:
+                logger.error(f"데이터베이스 유지 작업 중 오류 발생: {e}")
+    
+    async def dispose_all_engines(self):
+        """서버 종료 시 유지 작업을 멈추고 모든 매장의 동기/비동기 엔진 정리"""
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            await asyncio.gather(self._maintenance_task, return_exceptions=True)
+            self._maintenance_task = None
+        await self.cancel_store_warmups()
+        for store_id in list(set(self.engines) | set(self.async_engines)):
+            await self.evict_store_engine(store_id)
+    
+    def get_pool_status(self):
+        """매장별 풀 사용 현황과 누수 의심 세션"""
+        now = time.monotonic()
+        stores = []
+        for store_id, engine in self.engines.items():
+            async_pool = self.async_engines[store_id].sync_engine.pool
+            stores.append({
+                "store_id": store_id,
+                "sync_checked_out": engine.pool.checkedout(),
+                "async_checked_out": async_pool.checkedout(),
+                "async_pool_size": async_pool.size(),
+                "async_overflow": async_pool.overflow(),
+                "idle_seconds": round(now - self.last_used[store_id], 1) if store_id in self.last_used else None,
+            })
+        leaks = [
+            {key: value for key, value in leak.items() if key != "began_at"}
+            for leak in self.find_leaked_sessions()
+        ]
+        return {
+            "pool_config": self.pool_config,
+            "max_open_stores": self.max_open_stores,
+            "stores": stores,
+            "leaked_sessions": leaks,
+        }
+
+
+def _caller_stack(limit=6):
+    """database.py 밖에서 세션을 연 호출 경로 (가장 안쪽 limit개 프레임)"""
+    frames = [frame for frame in traceback.extract_stack()[:-1] if frame.filename != __file__]
+    return "".join(traceback.format_list(frames[-limit:]))
 
 # 전역 데이터베이스 매니저 인스턴스 생성
 db_manager = DatabaseManager()
@@ -373,12 +660,25 @@ def get_db_direct():
     store_id = get_current_store_id()
     return db_manager.get_db_direct(store_id)
 
+# 비동기 DB 세션 의존성 (FastAPI 의존성 주입용)
+async def get_async_db():
+    """현재 선택된 매장의 비동기 데이터베이스 세션 반환 (FastAPI 의존성 주입용)"""
+    store_id = get_current_store_id()
+    async with db_manager.get_async_db_session(store_id) as db:
+        yield db
+
+# 비동기 DB 세션 직접 반환 (컨트롤러용)
+def get_async_db_direct() -> AsyncSession:
+    """현재 선택된 매장의 비동기 데이터베이스 세션 직접 반환 (컨트롤러용)"""
+    store_id = get_current_store_id()
+    return db_manager.get_async_db_direct(store_id)
+
 # 매장 데이터베이스 초기화
-def initialize_store_database(store_id):
+async def initialize_store_database(store_id, progress_callback=None):
     """매장 데이터베이스 초기화 함수"""
     try:
         logger.info(f"매장 {store_id} 데이터베이스 초기화 요청")
-        db_manager.initialize_store_db(store_id)
+        await db_manager.initialize_store_db_async(store_id, progress_callback=progress_callback)
         return True
     except Exception as e:
         logger.error(f"매장 {store_id} 데이터베이스 초기화 실패: {e}")
@@ -400,17 +700,35 @@ def add_player_data():
     db.refresh(player_data)
 
 # 매장 ID 미들웨어
-class StoreIDMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+class StoreIDMiddleware:
+    """
+    X-Store-ID 헤더(WebSocket은 store_id 쿼리 파라미터도 허용)로 요청별 매장 지정
+    HTTP와 WebSocket 모두 처리하며, 요청이 끝나면 이전 컨텍스트로 복원
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
         # 요청 헤더에서 매장 ID 확인
-        store_id = request.headers.get("X-Store-ID")
+        store_id = Headers(scope=scope).get("X-Store-ID")
+        if not store_id and scope["type"] == "websocket":
+            # 브라우저 WebSocket은 커스텀 헤더를 보낼 수 없으므로 쿼리 파라미터 허용
+            store_id = QueryParams(scope.get("query_string", b"")).get("store_id")
+
+        token = None
         if store_id:
             try:
-                store_id = int(store_id)
-                set_current_store_id(store_id)
+                token = set_current_store_id(int(store_id))
             except ValueError:
                 logger.error(f"잘못된 매장 ID 형식: {store_id}")
-        
-        # 다음 미들웨어 또는 엔드포인트 호출
-        response = await call_next(request)
-        return response
\ No newline at end of file
+
+        try:
+            # 다음 미들웨어 또는 엔드포인트 호출
+            await self.app(scope, receive, send)
+        finally:
+            if token is not None:
+                reset_current_store_id(token)
@@ -7,10 +7,14 @@ from sqlalchemy.orm import Session
 from central_socket import ReverbTestController
 import models, schemas, database
 import dataclasses
+from typing import Optional
 import socket
 from Controllers import game_controller, operator_controller, purchase_controller, qr_controller, table_controller, device_controller, preset_controller, user_controller, awarding_controller, point_controller
+from Controllers.game_update_scheduler import game_update_scheduler
+from Controllers.tournament_clock import tournament_clock
 import sys
 import signal
+import os
 
 app = FastAPI(
     title="Dealer Desk API Server",
@@ -43,6 +47,17 @@ app.include_router(qr_controller.router)
 app.include_router(operator_controller.router)
 socket_controller: ReverbTestController = ReverbTestController()
 
+@app.on_event("shutdown")
+async def close_central_http_session():
+    """중앙 서버 HTTP 연결 정리"""
+    if socket_controller is not None:
+        await socket_controller.close_http_session()
+
+@app.on_event("shutdown")
+async def dispose_database_engines():
+    """모든 매장의 동기/비동기 DB 엔진 정리 (aiosqlite 연결 스레드가 종료를 막지 않도록)"""
+    await database.db_manager.dispose_all_engines()
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
@@ -58,6 +73,7 @@ async def get_ip_address():
 class LoginData:
     user_id: str
     user_pwd: str
+    store_id: Optional[int] = None  # 바로 열 매장 (지정 시 해당 매장만 로그인 응답 전에 초기화)
 
 @dataclasses.dataclass
 class StoreSelectData:
@@ -71,24 +87,25 @@ async def login(login_data: LoginData):
         if success:
             print("로그인 성공")
             
-            # 로그인 성공 시 각 매장별 데이터베이스 초기화
-            store_ids = []
-            for store in socket_controller.stores:
-                store_id = store['id']
-                store_ids.append(store_id)
-                db_init_success = database.initialize_store_database(store_id)
+            # 선택한 매장만 바로 초기화하고 나머지 매장은 백그라운드에서 준비
+            store_ids = [store['id'] for store in socket_controller.stores]
+            if login_data.store_id is not None and login_data.store_id in store_ids:
+                store = next(store for store in socket_controller.stores if store['id'] == login_data.store_id)
+                db_init_success = await database.db_manager.ensure_store_ready(login_data.store_id)
                 if db_init_success:
                     print(f"매장 {store['name']}의 데이터베이스가 초기화되었습니다")
                 else:
                     print(f"매장 {store['name']}의 데이터베이스 초기화 실패")
                     return {"status": "error", "message": f"매장 {store['name']}의 데이터베이스 초기화 실패"}
+            database.db_manager.warm_up_stores([store_id for store_id in store_ids if store_id != login_data.store_id])
             
             # 오프라인 모드 여부와 매장 정보 반환
             return {
                 "status": "success",
                 "is_offline_mode": socket_controller.is_offline_mode,
                 "stores": socket_controller.stores,
-                "store_ids": store_ids
+                "store_ids": store_ids,
+                "store_status": database.db_manager.get_store_status()
             }
         else:
             print("로그인 실패")
@@ -109,11 +126,18 @@ async def select_store(store_data: StoreSelectData):
         if socket_controller is None:
             return {"status": "error", "message": "로그인이 필요합니다"}
             
-        # 현재 매장 ID 설정
-        database.set_current_store_id(store_data.store_id)
-        
         success = await socket_controller.select_store(store_data.store_id)
         if success:
+            # 매장 DB 준비 대기 (백그라운드 초기화 중이면 해당 작업 완료까지)
+            if not await database.db_manager.ensure_store_ready(store_data.store_id):
+                return {"status": "error", "message": "매장 데이터베이스 초기화 실패"}
+            
+            # 매장 ID 헤더가 없는 요청이 사용할 기본 매장 설정
+            database.set_default_store_id(store_data.store_id)
+            
+            # 진행 중인 게임의 레벨 전환 시계 시작
+            await tournament_clock.load_store_games(store_data.store_id)
+            
             selected_store = socket_controller.selected_store
             return {
                 "status": "success",
@@ -131,10 +155,48 @@ async def select_store(store_data: StoreSelectData):
 
 @app.post("/re-connect-central-socket")
 async def re_connect_central_socket():
+    """백오프 대기 없이 중앙 서버 소켓 재연결 (평소에는 연결이 끊기면 자동으로 재연결됨)"""
     global socket_controller
-    socket_controller.handle_message()
+    if socket_controller is None:
+        return {"status": "error", "message": "로그인이 필요합니다"}
+    if not await socket_controller.reconnect():
+        return {"status": "failed", "message": "선택된 매장이 없어 재연결할 수 없습니다"}
     return {"status": "success", "message": "소켓 연결 재시도"}
 
+@app.get("/central-socket-status")
+async def central_socket_status():
+    """중앙 서버 소켓 연결 상태, 재연결 카운터, 송수신 대기열 현황"""
+    if socket_controller is None:
+        return {"status": "error", "message": "로그인이 필요합니다"}
+    return {
+        "status": "success",
+        "connection": socket_controller.get_connection_stats(),
+        "outbound": socket_controller.get_outbound_stats(),
+        "inbound": socket_controller.get_inbound_stats(),
+        "health": socket_controller.health.get_stats(),
+    }
+
+@app.get("/store-status")
+async def store_status():
+    """매장별 데이터베이스 초기화 상태 (pending, initializing, ready, failed)"""
+    return {"status": "success", "stores": database.db_manager.get_store_status()}
+
+@app.get("/db-status")
+async def db_status():
+    """매장별 커넥션 풀 사용 현황과 오래 닫히지 않은 세션(누수 의심) 목록"""
+    return {"status": "success", **database.db_manager.get_pool_status()}
+
+@app.post("/sync-delta")
+async def sync_delta():
+    """현재 매장의 변경분만 중앙 서버에서 동기화 (오프라인 복귀 후 사용)"""
+    if socket_controller is None:
+        return {"status": "error", "message": "로그인이 필요합니다"}
+    store_id = database.get_current_store_id()
+    results = await database.db_manager.sync_store_delta(store_id)
+    if results is None:
+        return {"status": "failed", "message": "델타 동기화를 수행할 수 없습니다 (오프라인 모드 또는 오류)"}
+    return {"status": "success", "store_id": store_id, "results": results}
+
 @app.post("/logout")
 async def logout():
     """로그아웃 처리를 수행하는 엔드포인트"""
@@ -143,6 +205,12 @@ async def logout():
         if socket_controller is None:
             return {"status": "success", "message": "이미 로그아웃된 상태입니다"}
             
+        # 아직 진행 중인 매장 DB 백그라운드 초기화 중단
+        await database.db_manager.cancel_store_warmups()
+        
+        # 병합 대기 중인 게임 변경 알림을 먼저 전송
+        await game_update_scheduler.flush_all()
+        
         success = await socket_controller.logout()
         if success:
             print("소켓 컨트롤러가 성공적으로 종료되었습니다")
@@ -155,12 +223,31 @@ async def logout():
         print(f"로그아웃 처리 중 오류 발생: {error_message}")
         return {"status": "error", "message": error_message}
 
+# 실행 모드 (development: 기본값, 코드 변경 감지 / production: 감지 끄고 실행)
+RUN_MODE_ENV = "DEALER_DESK_MODE"
+WORKERS_ENV = "DEALER_DESK_WORKERS"
+
+def get_run_config() -> dict:
+    """
+    환경 변수에서 실행 모드를 읽음
+    로그인 상태, 기본 매장, 중앙 서버 연결, 오프라인 저널, 토너먼트 시계가 프로세스 안에만 있으므로
+    워커 여러 개는 지원하지 않습니다 (DEALER_DESK_WORKERS가 2 이상이면 경고 후 워커 1개로 실행).
+    """
+    mode = os.environ.get(RUN_MODE_ENV, "development").lower()
+    requested = os.environ.get(WORKERS_ENV)
+    if requested is not None and requested.strip() not in ("", "1"):
+        print(f"{WORKERS_ENV}={requested}: 로그인/중앙 서버 연결 상태를 워커 간에 공유하지 않으므로 워커 1개로 실행합니다")
+    if mode != "production":
+        return {"mode": "development", "reload": True}
+    return {"mode": "production", "reload": False}
+
 class UvicornServer:
-    def __init__(self, app, host="0.0.0.0", port=401):
+    def __init__(self, app, host="0.0.0.0", port=401, reload=True):
         self.app = app
         self.host = host
         self.port = port
-        self.config = uvicorn.Config(app, host=host, port=port, reload=True)
+        self.reload = reload
+        self.config = uvicorn.Config(app, host=host, port=port, reload=reload)
         self.server = uvicorn.Server(config=self.config)
     
     async def run(self):
@@ -168,7 +255,8 @@ class UvicornServer:
 
 async def run_api_server():
     try:
-        api_server = UvicornServer(app="main:app", host="0.0.0.0", port=401)
+        run_config = get_run_config()
+        api_server = UvicornServer(app="main:app", host="0.0.0.0", port=401, reload=run_config["reload"])
         await api_server.run()
     except OSError as e:
         if e.errno == 98 or e.errno == 10048:  # 포트가 이미 사용 중일 때의 에러 코드 (Linux: 98, Windows: 10048)
@@ -0,0 +1,147 @@
+"""
+매장 DB 버전별 스키마 마이그레이션
+
+create_all은 새 테이블만 만들고 기존 테이블의 인덱스는 추가하지 않으므로,
+이미 존재하는 store_{id}.db에 필요한 변경은 여기에 버전 순서대로 등록합니다.
+현재 버전은 SQLite PRAGMA user_version에 저장되며, 각 마이그레이션은 재실행해도 안전해야 합니다.
+
+단독 실행 시 지정한 DB의 핫 쿼리 실행 계획을 검사하고 전체 스캔이 있으면 종료 코드 1을 반환합니다.
+    python migrations.py ~/.dealer_desk/.databases/store_1.db
+"""
+import logging
+import sys
+
+from sqlalchemy import create_engine
+
+import models
+from Controllers.game_player_manager import migrate_legacy_game_players
+
+# 로거 설정
+logger = logging.getLogger('Migrations')
+logger.setLevel(logging.DEBUG)
+handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+# (버전, 설명, 함수(connection)) - 버전은 1부터 연속으로 증가
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """마이그레이션 등록 데코레이터"""
+    def register(func):
+        MIGRATIONS.append((version, description, func))
+        return func
+    return register
+
+
+def _create_model_index(connection, table, index_name):
+    """모델에 선언된 인덱스를 기존 DB에 생성 (이미 있으면 건너뜀)"""
+    index = next(index for index in table.indexes if index.name == index_name)
+    index.create(bind=connection, checkfirst=True)
+
+
+@migration(1, "game_in_player JSON -> game_player_data 이전")
+def _migrate_game_players(connection):
+    migrate_legacy_game_players(connection)
+
+
+@migration(2, "핫 쿼리용 복합 인덱스 추가")
+def _add_composite_indexes(connection):
+    _create_model_index(connection, models.PurchaseData.__table__, "ix_purchase_data_status_purchased_at")
+    _create_model_index(connection, models.PointHistoryData.__table__, "ix_point_history_data_customer_flags_expire")
+    _create_model_index(connection, models.GameData.__table__, "ix_game_data_status_start_time")
+
+
+@migration(3, "purchase_data.uuid 고유 인덱스, processed_event_data.payload_hash 추가")
+def _unique_purchase_uuid(connection):
+    # 같은 uuid 중 가장 먼저 저장된 행만 남김 (기존 수신 처리는 첫 행을 조회해 갱신했음)
+    connection.exec_driver_sql(
+        "DELETE FROM purchase_data WHERE uuid IS NOT NULL AND id NOT IN "
+        "(SELECT MIN(id) FROM purchase_data WHERE uuid IS NOT NULL GROUP BY uuid)"
+    )
+    # 일반 인덱스로 만들어진 기존 DB는 같은 이름의 고유 인덱스로 다시 생성
+    connection.exec_driver_sql("DROP INDEX IF EXISTS ix_purchase_data_uuid")
+    _create_model_index(connection, models.PurchaseData.__table__, "ix_purchase_data_uuid")
+    columns = [row[1] for row in connection.exec_driver_sql("PRAGMA table_info(processed_event_data)")]
+    if "payload_hash" not in columns:
+        connection.exec_driver_sql("ALTER TABLE processed_event_data ADD COLUMN payload_hash VARCHAR")
+
+
+def get_schema_version(connection):
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def run_migrations(engine):
+    """아직 적용되지 않은 마이그레이션을 순서대로 적용하고 적용한 버전 목록 반환"""
+    applied = []
+    with engine.connect() as connection:
+        current_version = get_schema_version(connection)
+    for version, description, func in sorted(MIGRATIONS, key=lambda item: item[0]):
+        if version <= current_version:
+            continue
+        logger.info(f"마이그레이션 {version} 적용: {description}")
+        with engine.begin() as connection:
+            func(connection)
+            # PRAGMA는 바인드 파라미터를 받지 않으므로 정수만 직접 삽입
+            connection.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+        applied.append(version)
+    return applied
+
+
+# (설명, SQL, 파라미터, 사용해야 하는 인덱스)
+HOT_QUERY_PLANS = [
+    (
+        "기간별 결제 완료 내역",
+        "SELECT id FROM purchase_data WHERE status = ? AND purchased_at >= ? AND purchased_at <= ? "
+        "ORDER BY purchased_at DESC LIMIT 20",
+        ("SUCCESS", "2024-01-01 00:00:00", "2024-12-31 23:59:59"),
+        "ix_purchase_data_status_purchased_at",
+    ),
+    (
+        "만료 예정 포인트",
+        "SELECT id FROM point_history_data WHERE customer_id = ? AND is_increase = 1 AND is_expired = 0 "
+        "AND available_amount > 0 AND expire_at < ?",
+        (1, "2024-12-31 23:59:59"),
+        "ix_point_history_data_customer_flags_expire",
+    ),
+    (
+        "진행 중 게임",
+        "SELECT id FROM game_data WHERE game_status IN ('waiting', 'in-progress') ORDER BY game_start_time",
+        (),
+        "ix_game_data_status_start_time",
+    ),
+    (
+        "게임 참가자",
+        "SELECT id FROM game_player_data WHERE game_id = ? AND customer_id = ?",
+        (1, 1),
+        "ix_game_player_data_game_customer",
+    ),
+]
+
+
+def verify_query_plans(connection):
+    """
+    핫 쿼리의 EXPLAIN QUERY PLAN을 검사해 기대한 인덱스를 쓰지 않는 쿼리 목록 반환
+    반환값: [(설명, 실행 계획 문자열), ...] - 비어 있으면 정상
+    """
+    problems = []
+    for description, sql, params, index_name in HOT_QUERY_PLANS:
+        plan = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params)]
+        if not any(index_name in detail for detail in plan):
+            problems.append((description, " / ".join(plan)))
+    return problems
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("사용법: python migrations.py <store db 경로>")
+        sys.exit(2)
+    engine = create_engine(f"sqlite:///{sys.argv[1]}")
+    with engine.connect() as connection:
+        print(f"스키마 버전: {get_schema_version(connection)}")
+        problems = verify_query_plans(connection)
+    for description, plan in problems:
+        print(f"[전체 스캔] {description}: {plan}")
+    sys.exit(1 if problems else 0)
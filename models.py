@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -107,6 +107,10 @@ class PresetData(Base):
 
 class GameData(Base):
     __tablename__ = "game_data"
+    __table_args__ = (
+        # 진행 중 게임 조회 (game_status IN ... ORDER BY game_start_time)
+        Index("ix_game_data_status_start_time", "game_status", "game_start_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     game_code = Column(String, index=True)
@@ -116,7 +120,8 @@ class GameData(Base):
     game_stop_time = Column(DateTime, nullable=True, default=datetime.now())
     game_end_time = Column(DateTime, default=None, nullable=True)
     game_status = Column(String, index=True, default="waiting")  # waiting, in_progress, end
-    game_in_player = Column(JSON, default=list)
+    # 이전 형식의 참가자 JSON (중앙 서버 동기화 데이터 수신용). game_player_data로 옮긴 뒤 비움
+    legacy_game_in_player = Column("game_in_player", JSON(none_as_null=True), nullable=True)
     table_connect_log = Column(JSON, default=list)
     addon_count = Column(Integer, default=0)
 
@@ -134,6 +139,25 @@ class GameData(Base):
     # 최종 상금
     final_prize = Column(Integer, default=0)
     
+    # 게임 참가자 (참가 순서대로)
+    players = relationship(
+        "GamePlayerData",
+        back_populates="game",
+        lazy="selectin",
+        order_by="GamePlayerData.id",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+    
+    @property
+    def game_in_player(self):
+        """기존 클라이언트용 참가자 목록 [{customer_id, join_count, is_sit, is_addon}, ...]"""
+        return [player.to_json() for player in self.players]
+    
+    @game_in_player.setter
+    def game_in_player(self, players):
+        self.players = [GamePlayerData.from_json(player) for player in players or []]
+    
     def to_json(self):
         return {
             "id" : self.id,
@@ -160,15 +184,51 @@ class GameData(Base):
             "final_prize" : self.final_prize
         }
 
+class GamePlayerData(Base):
+    __tablename__ = "game_player_data"
+    __table_args__ = (
+        Index("ix_game_player_data_game_customer", "game_id", "customer_id", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    game_id = Column(Integer, ForeignKey("game_data.id", ondelete="CASCADE"), nullable=False)
+    customer_id = Column(Integer, nullable=False, index=True)
+    join_count = Column(Integer, default=0)
+    is_sit = Column(Boolean, default=True)
+    is_addon = Column(Boolean, default=False)
+
+    game = relationship("GameData", back_populates="players")
+
+    @classmethod
+    def from_json(cls, player):
+        return cls(
+            customer_id=player.get("customer_id"),
+            join_count=player.get("join_count", 0),
+            is_sit=player.get("is_sit", True),
+            is_addon=player.get("is_addon", False)
+        )
+
+    def to_json(self):
+        return {
+            "customer_id": self.customer_id,
+            "join_count": self.join_count,
+            "is_sit": self.is_sit,
+            "is_addon": self.is_addon
+        }
+
 class PurchaseData(Base):
     __tablename__ = "purchase_data"
+    __table_args__ = (
+        # 기간별 결제 완료 내역 조회 (status = ? AND purchased_at BETWEEN ...)
+        Index("ix_purchase_data_status_purchased_at", "status", "purchased_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     payment_type = Column(String, index=True)  # LOCAL_PAY, CASUAL_PAY
     purchase_type = Column(String, index=True)  # Game 등
     game_id = Column(Integer, ForeignKey("game_data.id"), nullable=True)
     customer_id = Column(Integer, index=True)
-    uuid = Column(String, index=True)
+    uuid = Column(String, unique=True, index=True)  # 중앙 서버와 같은 구매를 판별하는 키
     purchased_at = Column(DateTime, default=datetime.now())
     item = Column(String, index=True)  # BUYIN, REBUYIN 등
     payment_status = Column(String, default="WAITING")  # WAITING, COMPLETED, FAILED
@@ -242,6 +302,10 @@ class AwardingHistoryData(Base):
 
 class PointHistoryData(Base):
     __tablename__ = "point_history_data"
+    __table_args__ = (
+        # 사용자별 사용 가능/만료 예정 포인트 조회
+        Index("ix_point_history_data_customer_flags_expire", "customer_id", "is_increase", "is_expired", "expire_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     uuid = Column(String, unique=True, index=True)  # UUID 형식으로 고유해야 함
@@ -287,3 +351,31 @@ class OpenClossData(Base):
             "operator_day": self.operator_day,
             "timestamp": self.timestamp.isoformat() if self.timestamp else None
         }
+
+class SyncCursorData(Base):
+    __tablename__ = "sync_cursor_data"
+
+    entity = Column(String, primary_key=True)  # tables, presets, games, customers, points, purchases, awardings
+    updated_since = Column(String, nullable=True)  # 중앙 서버 기준 high-water mark (서버 형식 그대로 저장)
+    synced_at = Column(DateTime, default=datetime.now)
+
+    def to_json(self):
+        return {
+            "entity": self.entity,
+            "updated_since": self.updated_since,
+            "synced_at": self.synced_at.isoformat() if self.synced_at else None
+        }
+
+class ProcessedEventData(Base):
+    __tablename__ = "processed_event_data"
+
+    event_key = Column(String, primary_key=True)  # "{이벤트 이름}:{구매 uuid / 고객 id / 포인트 내역 uuid}"
+    payload_hash = Column(String, nullable=True)  # 마지막으로 반영한 payload sha256 - 같으면 중복 수신
+    processed_at = Column(DateTime, default=datetime.now, index=True)
+
+    def to_json(self):
+        return {
+            "event_key": self.event_key,
+            "payload_hash": self.payload_hash,
+            "processed_at": self.processed_at.isoformat() if self.processed_at else None
+        }
@@ -0,0 +1,542 @@
+"""
+중앙 서버 동기화(/api/sync/all, /api/sync/{entity}) 스트리밍 임포터
+
+응답 전체를 메모리에 올리지 않고 청크 단위로 받아 최상위 배열의 원소를 하나씩 꺼내고,
+테이블마다 하나의 트랜잭션 안에서 batch_size 단위 executemany로 저장합니다.
+이력이 아무리 많아도 메모리에는 현재 청크와 배치 하나만 유지됩니다.
+
+초기 동기화 이후에는 엔티티별 updated_since 커서(sync_cursor_data)를 기준으로
+변경된 행만 받아 id 기준 upsert 합니다 (delta_sync).
+구매/포인트 내역은 오프라인 중 로컬에서 만든 행과 id가 겹칠 수 있으므로 uuid 기준으로 갱신하고,
+아직 중앙 서버로 보내지 않은 로컬 변경이 있는 행(protected)은 덮어쓰지 않습니다.
+"""
+import codecs
+import inspect
+import json
+import logging
+import re
+from datetime import datetime
+
+import aiohttp
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import models
+
+# 로거 설정
+logger = logging.getLogger('SyncImporter')
+logger.setLevel(logging.DEBUG)
+handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# 게임 데이터 중 JSON 컬럼 (문자열로 오는 경우 파싱)
+GAME_JSON_FIELDS = ['game_in_player', 'table_connect_log', 'time_table_data', 'rebuyin_payment_chips',
+                    'rebuyin_number_limits', 'addon_data', 'prize_settings', 'rebuy_cut_off']
+
+
+class JSONArrayStreamParser:
+    """
+    {"tables": [...], "presets": [...], ...} 형태의 응답을 증분 파싱
+    feed()로 받은 바이트에서 완성된 이벤트만 반환합니다.
+    - ("start_array", key, None)
+    - ("item", key, value)
+    - ("end_array", key, None)
+    - ("value", key, value)  배열이 아닌 최상위 값
+    """
+    COMPACT_THRESHOLD = 64 * 1024
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+        self._key = None
+
+    def feed(self, chunk: bytes) -> list:
+        self._buffer += self._text_decoder.decode(chunk)
+        return self._parse(final=False)
+
+    def close(self) -> list:
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        events = self._parse(final=True)
+        if self._state != "done":
+            raise ValueError("동기화 응답이 완전하지 않습니다")
+        return events
+
+    def _decode_value(self, final):
+        """현재 위치의 JSON 값 디코딩. 데이터가 더 필요하면 None 반환"""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return None
+        # 숫자/리터럴은 뒤에 문자가 더 와야 끝났는지 알 수 있음
+        if end >= len(self._buffer) and not final:
+            return None
+        self._pos = end
+        return (value,)
+
+    def _expect(self, expected):
+        ch = self._buffer[self._pos]
+        if ch not in expected:
+            raise ValueError(f"잘못된 동기화 응답 형식: 위치 {self._pos}에서 {expected!r} 대신 {ch!r}")
+        self._pos += 1
+        return ch
+
+    def _parse(self, final):
+        events = []
+        while self._state != "done":
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos >= len(self._buffer):
+                break
+
+            if self._state == "start":
+                self._expect("{")
+                self._state = "first_key"
+            elif self._state in ("first_key", "key"):
+                if self._state == "first_key" and self._buffer[self._pos] == "}":
+                    self._pos += 1
+                    self._state = "done"
+                    continue
+                if self._buffer[self._pos] != '"':
+                    self._expect('"')
+                decoded = self._decode_value(final)
+                if decoded is None:
+                    break
+                self._key = decoded[0]
+                self._state = "colon"
+            elif self._state == "colon":
+                self._expect(":")
+                self._state = "value"
+            elif self._state == "value":
+                if self._buffer[self._pos] == "[":
+                    self._pos += 1
+                    events.append(("start_array", self._key, None))
+                    self._state = "first_item"
+                    continue
+                decoded = self._decode_value(final)
+                if decoded is None:
+                    break
+                events.append(("value", self._key, decoded[0]))
+                self._state = "after_member"
+            elif self._state in ("first_item", "item"):
+                if self._state == "first_item" and self._buffer[self._pos] == "]":
+                    self._pos += 1
+                    events.append(("end_array", self._key, None))
+                    self._state = "after_member"
+                    continue
+                decoded = self._decode_value(final)
+                if decoded is None:
+                    break
+                events.append(("item", self._key, decoded[0]))
+                self._state = "after_item"
+            elif self._state == "after_item":
+                if self._expect(",]") == ",":
+                    self._state = "item"
+                else:
+                    events.append(("end_array", self._key, None))
+                    self._state = "after_member"
+            elif self._state == "after_member":
+                if self._expect(",}") == ",":
+                    self._state = "key"
+                else:
+                    self._state = "done"
+
+        # 처리한 앞부분은 버려서 버퍼가 커지지 않도록 유지
+        if self._pos > self.COMPACT_THRESHOLD:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        return events
+
+
+def parse_datetime(value, fallback=None):
+    """ISO 형식 또는 'YYYY-MM-DD HH:MM:SS' 형식 문자열을 datetime으로 변환"""
+    if not isinstance(value, str):
+        return value
+    try:
+        if 'T' in value:  # ISO 형식
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            logger.warning(f"날짜 형식 변환 실패: {value}")
+            return fallback() if callable(fallback) else fallback
+
+
+def _column_values(model, item):
+    """모델 테이블에 존재하는 컬럼만 추출"""
+    columns = model.__table__.columns
+    return {key: value for key, value in item.items() if key in columns}
+
+
+def convert_table(item):
+    row = _column_values(models.TableData, item)
+    # title이 {"ko": name} 형식으로 들어오는 경우 name만 추출
+    if isinstance(row.get('title'), dict) and 'ko' in row['title']:
+        row['title'] = row['title']['ko']
+    return row
+
+
+def convert_preset(item):
+    return _column_values(models.PresetData, item)
+
+
+def convert_game(item):
+    row = _column_values(models.GameData, item)
+    # starting_chips -> starting_chip으로 변환
+    if 'starting_chips' in item and 'starting_chip' not in item:
+        row['starting_chip'] = item['starting_chips']
+    for key in ['game_start_time', 'game_calcul_time', 'game_stop_time', 'game_end_time']:
+        if key in row:
+            row[key] = parse_datetime(row[key])
+    if isinstance(row.get('title'), dict) and 'ko' in row['title']:
+        row['title'] = row['title']['ko']
+    for key in GAME_JSON_FIELDS:
+        # 문자열로 들어온 경우 JSON으로 파싱
+        if isinstance(row.get(key), str):
+            try:
+                row[key] = json.loads(row[key])
+            except json.JSONDecodeError:
+                logger.warning(f"JSON 파싱 실패: {key}={row[key]}, 빈 배열로 설정")
+                row[key] = []
+    return row
+
+
+def convert_point(item):
+    row = _column_values(models.PointHistoryData, item)
+    for key in ['expire_at', 'created_at']:
+        if key in row:
+            row[key] = parse_datetime(row[key])
+    return row
+
+
+def convert_customer(item):
+    row = _column_values(models.UserData, item)
+    for key in ['register_at', 'last_visit_at']:
+        if key in row:
+            row[key] = parse_datetime(row[key], fallback=datetime.now)
+    return row
+
+
+def convert_purchase(item):
+    row = _column_values(models.PurchaseData, item)
+    for key in row:
+        if key.endswith('_at'):
+            row[key] = parse_datetime(row[key], fallback=datetime.now)
+    return row
+
+
+def convert_awarding(item):
+    row = _column_values(models.AwardingHistoryData, item)
+    for key in row:
+        if key.endswith('_at'):
+            row[key] = parse_datetime(row[key], fallback=datetime.now)
+    return row
+
+
+# upsert 시 로컬 id 대신 사용할 자연 키 (오프라인 중 로컬에서 생성되는 엔티티)
+NATURAL_KEYS = {
+    'points': 'uuid',
+    'purchases': 'uuid',
+}
+
+# 응답 키별 저장 모델과 변환 함수
+IMPORT_SPECS = {
+    'tables': (models.TableData, convert_table),
+    'presets': (models.PresetData, convert_preset),
+    'games': (models.GameData, convert_game),
+    'points': (models.PointHistoryData, convert_point),
+    'customers': (models.UserData, convert_customer),
+    'purchases': (models.PurchaseData, convert_purchase),
+    'awardings': (models.AwardingHistoryData, convert_awarding),
+}
+
+
+class StoreSyncImporter:
+    """파싱된 원소를 테이블별 트랜잭션 + 배치 executemany로 저장"""
+
+    def __init__(self, async_engine, batch_size=DEFAULT_BATCH_SIZE, progress_callback=None, upsert=False,
+                 protected=None):
+        self.async_engine = async_engine
+        self.batch_size = batch_size
+        # progress_callback(entity, imported_count, done) - 동기/비동기 함수 모두 허용
+        self.progress_callback = progress_callback
+        # True면 id 충돌 시 기존 행을 갱신 (델타 동기화용)
+        self.upsert = upsert
+        # 엔티티별로 갱신하지 않을 자연 키 집합 (예: 전송 대기 중인 구매 uuid)
+        self.protected = protected or {}
+        self.counts = {}
+        self.skipped = {}
+        # 배열이 아닌 최상위 값 (예: server_time)
+        self.values = {}
+        # 엔티티별 가장 최근 updated_at (datetime, 서버 원본 문자열)
+        self.high_water_marks = {}
+        self._conn = None
+        self._transaction = None
+        self._entity = None
+        self._rows = []
+
+    async def _report(self, entity, done):
+        if self.progress_callback is None:
+            return
+        result = self.progress_callback(entity, self.counts.get(entity, 0), done)
+        if inspect.isawaitable(result):
+            await result
+
+    async def _begin(self, entity):
+        self._entity = entity
+        self._rows = []
+        self.counts[entity] = 0
+        self._conn = await self.async_engine.connect()
+        self._transaction = await self._conn.begin()
+
+    async def _execute_grouped(self, make_stmt, rows):
+        """executemany는 같은 컬럼 구성끼리만 묶을 수 있으므로 키 구성별로 나눠 실행"""
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        for columns, group in groups.items():
+            await self._conn.execute(make_stmt(columns), group)
+
+    def _id_upsert(self, model):
+        def make_stmt(columns):
+            stmt = sqlite_insert(model)
+            return stmt.on_conflict_do_update(
+                index_elements=[model.__table__.c.id],
+                set_={column: stmt.excluded[column] for column in columns if column != 'id'}
+            )
+        return make_stmt
+
+    async def _natural_key_upsert(self, model, key, rows):
+        """
+        자연 키(uuid) 기준 upsert
+        - 같은 uuid의 로컬 행이 있으면 그 행(로컬 id)을 갱신 (protected면 건너뜀)
+        - 없으면 추가하되, 중앙 id가 다른 로컬 행과 겹치면 id를 새로 발급
+        - uuid가 없는 행은 기존처럼 id 기준 upsert
+        """
+        key_column = model.__table__.c[key]
+        protected = self.protected.get(self._entity, ())
+        # 같은 배치 안에서 같은 uuid가 여러 번 오면 마지막 값만 사용
+        latest = {}
+        without_key = []
+        for row in rows:
+            if row.get(key):
+                latest[row[key]] = row
+            else:
+                without_key.append(row)
+        existing = dict((await self._conn.execute(
+            select(key_column, model.id).where(key_column.in_(list(latest)))
+        )).all()) if latest else {}
+        incoming_ids = [row['id'] for natural, row in latest.items() if natural not in existing and row.get('id') is not None]
+        taken_ids = set((await self._conn.scalars(
+            select(model.id).where(model.id.in_(incoming_ids))
+        )).all()) if incoming_ids else set()
+
+        inserts, updates = [], []
+        for natural, row in latest.items():
+            if natural in protected:
+                self.skipped[self._entity] = self.skipped.get(self._entity, 0) + 1
+                continue
+            if natural in existing:
+                values = {column: value for column, value in row.items() if column != 'id'}
+                values['_local_id'] = existing[natural]
+                updates.append(values)
+            elif row.get('id') in taken_ids:
+                inserts.append({column: value for column, value in row.items() if column != 'id'})
+            else:
+                inserts.append(row)
+
+        if inserts:
+            await self._execute_grouped(lambda columns: insert(model), inserts)
+        if updates:
+            await self._execute_grouped(
+                lambda columns: update(model).where(model.id == bindparam('_local_id')),
+                updates
+            )
+        if without_key:
+            await self._execute_grouped(self._id_upsert(model), without_key)
+
+    async def _flush(self):
+        if not self._rows:
+            return
+        model = IMPORT_SPECS[self._entity][0]
+        if self.upsert and self._entity in NATURAL_KEYS:
+            await self._natural_key_upsert(model, NATURAL_KEYS[self._entity], self._rows)
+        elif self.upsert:
+            await self._execute_grouped(self._id_upsert(model), self._rows)
+        else:
+            await self._execute_grouped(lambda columns: insert(model), self._rows)
+        self.counts[self._entity] += len(self._rows)
+        self._rows = []
+        await self._report(self._entity, done=False)
+
+    async def _commit(self):
+        await self._flush()
+        await self._transaction.commit()
+        await self._conn.close()
+        entity = self._entity
+        self._conn = self._transaction = self._entity = None
+        logger.info(f"{entity} {self.counts[entity]}건 저장 완료")
+        await self._report(entity, done=True)
+
+    async def _rollback(self):
+        if self._conn is None:
+            return
+        try:
+            await self._transaction.rollback()
+        finally:
+            await self._conn.close()
+            self._conn = self._transaction = self._entity = None
+            self._rows = []
+
+    def _track_updated_at(self, entity, item):
+        raw = item.get('updated_at') if isinstance(item, dict) else None
+        if not raw:
+            return
+        updated_at = parse_datetime(raw)
+        if not isinstance(updated_at, datetime):
+            return
+        current = self.high_water_marks.get(entity)
+        try:
+            if current is None or updated_at > current[0]:
+                self.high_water_marks[entity] = (updated_at, raw)
+        except TypeError:
+            # 타임존 포함/미포함 형식이 섞인 경우 원본 문자열만 유지
+            self.high_water_marks[entity] = (updated_at, raw)
+
+    def cursor_for(self, entity):
+        """다음 델타 동기화에 사용할 updated_since 값 (서버 시각 우선)"""
+        server_time = self.values.get('server_time')
+        if server_time:
+            return server_time
+        mark = self.high_water_marks.get(entity)
+        return mark[1] if mark else None
+
+    async def _handle(self, event, key, value):
+        if event == "value":
+            self.values[key] = value
+            return
+        if key not in IMPORT_SPECS:
+            return
+        if event == "start_array":
+            await self._begin(key)
+        elif event == "item":
+            self._track_updated_at(key, value)
+            self._rows.append(IMPORT_SPECS[key][1](value))
+            if len(self._rows) >= self.batch_size:
+                await self._flush()
+        elif event == "end_array":
+            await self._commit()
+
+    async def import_stream(self, chunks):
+        """바이트 청크 비동기 이터레이터를 받아 저장하고 테이블별 저장 건수 반환"""
+        parser = JSONArrayStreamParser()
+        try:
+            async for chunk in chunks:
+                for event in parser.feed(chunk):
+                    await self._handle(*event)
+            for event in parser.close():
+                await self._handle(*event)
+        except Exception:
+            await self._rollback()
+            raise
+        return self.counts
+
+
+async def download_and_import(async_engine, url, bearer_token, progress_callback=None,
+                              batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE,
+                              params=None, upsert=False, session=None, protected=None):
+    """
+    동기화 응답을 스트리밍으로 받아 매장 DB에 저장
+    성공 시 StoreSyncImporter(counts, cursor_for), 서버 응답이 200이 아니면 None 반환
+    session을 넘기면 그 세션의 연결을 재사용하고, 없으면 요청용 세션을 새로 만듭니다.
+    """
+    headers = {
+        'Content-Type': 'application/json',
+        'Accept': 'application/json',
+        "Authorization": f"Bearer {bearer_token}"
+    }
+    # 전체 동기화는 오래 걸릴 수 있으므로 세션 기본 제한 시간 대신 읽기 간격만 제한
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60)
+    if session is None:
+        async with aiohttp.ClientSession(timeout=timeout) as own_session:
+            return await download_and_import(async_engine, url, bearer_token, progress_callback,
+                                             batch_size, chunk_size, params, upsert, session=own_session,
+                                             protected=protected)
+    async with session.get(url, headers=headers, params=params, timeout=timeout) as response:
+        if response.status != 200:
+            logger.warning(f"동기화 데이터 요청 실패: 상태 코드 {response.status}")
+            return None
+        importer = StoreSyncImporter(async_engine, batch_size=batch_size,
+                                     progress_callback=progress_callback, upsert=upsert, protected=protected)
+        await importer.import_stream(response.content.iter_chunked(chunk_size))
+        return importer
+
+
+async def load_sync_cursors(async_engine):
+    """엔티티별 updated_since 커서 조회"""
+    async with async_engine.connect() as conn:
+        result = await conn.execute(select(models.SyncCursorData.entity, models.SyncCursorData.updated_since))
+        return {entity: updated_since for entity, updated_since in result}
+
+
+async def save_sync_cursors(async_engine, cursors):
+    """엔티티별 updated_since 커서 저장 (값이 없는 엔티티는 기존 커서 유지)"""
+    rows = [
+        {"entity": entity, "updated_since": updated_since, "synced_at": datetime.now()}
+        for entity, updated_since in cursors.items()
+        if updated_since
+    ]
+    if not rows:
+        return
+    stmt = sqlite_insert(models.SyncCursorData)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.SyncCursorData.entity],
+        set_={"updated_since": stmt.excluded.updated_since, "synced_at": stmt.excluded.synced_at}
+    )
+    async with async_engine.begin() as conn:
+        await conn.execute(stmt, rows)
+
+
+async def delta_sync(async_engine, base_url, host_name, bearer_token, entities=None, progress_callback=None, session=None,
+                     protected=None):
+    """
+    엔티티별 커서 이후 변경분만 받아 upsert
+    GET http://{base_url}/api/sync/{entity}/{host_name}?updated_since=...
+    응답은 {"<entity>": [...], "server_time": "..."} 형식을 기대하며,
+    server_time이 없으면 받은 행의 최대 updated_at을 다음 커서로 사용합니다.
+    엔티티별 결과 건수 반환 (요청 실패한 엔티티는 None)
+    protected: {엔티티: 자연 키 집합} - 전송 대기 중인 로컬 변경이 있어 덮어쓰지 않을 행
+    """
+    cursors = await load_sync_cursors(async_engine)
+    results = {}
+    for entity in entities or IMPORT_SPECS:
+        updated_since = cursors.get(entity)
+        params = {"updated_since": updated_since} if updated_since else None
+        importer = await download_and_import(
+            async_engine,
+            f"http://{base_url}/api/sync/{entity}/{host_name}",
+            bearer_token,
+            progress_callback=progress_callback,
+            params=params,
+            upsert=True,
+            session=session,
+            protected=protected
+        )
+        if importer is None:
+            results[entity] = None
+            continue
+        results[entity] = importer.counts.get(entity, 0)
+        await save_sync_cursors(async_engine, {entity: importer.cursor_for(entity)})
+    return results
@@ -0,0 +1,38 @@
+"""
+테스트 공통 설정
+
+모듈을 불러올 때 ~/.dealer_desk 아래에 DB/저널/인증 파일을 만드므로
+저장소 모듈을 import하기 전에 HOME을 임시 디렉토리로 바꿉니다.
+"""
+import os
+import sys
+import tempfile
+
+os.environ["HOME"] = tempfile.mkdtemp(prefix="dealer_desk_test_")
+os.environ["USERPROFILE"] = os.environ["HOME"]
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import itertools
+
+import pytest
+
+_store_ids = itertools.count(9001)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """
+    중앙 서버 없이 만든 새 매장 DB
+
+    중앙 동기화 대상을 없애 테스트 중 HTTP 요청이 나가지 않게 하고,
+    끝나면 엔진을 정리합니다 (정리하지 않은 aiosqlite 연결은 인터프리터 종료를 막음).
+    """
+    from database import db_manager
+
+    monkeypatch.setattr(db_manager, "_central_sync_target", lambda store_id: None)
+    store_id = next(_store_ids)
+    db_manager.initialize_store_db(store_id)
+    yield store_id
+    asyncio.run(db_manager.evict_store_engine(store_id))
@@ -0,0 +1,32 @@
+import asyncio
+
+import central_socket
+from central_socket import ReverbTestController
+
+
+def test_offline_login_still_starts_reconnect_supervisor(monkeypatch):
+    monkeypatch.setattr(central_socket, "RECONNECT_BASE_DELAY", 0.01)
+    controller = ReverbTestController()
+    controller.stores = [{"id": 1, "tenant_id": "t1", "name": "매장", "host": "store1"}]
+    controller.is_offline_mode = True
+    attempts = []
+
+    async def connect_once():
+        attempts.append(controller.is_offline_mode)
+        return False
+
+    monkeypatch.setattr(controller, "_connect_once", connect_once)
+
+    async def run():
+        assert await controller.select_store(1)
+        # 로그인 시점에는 바로 연결하지 않음
+        assert attempts == []
+        assert controller._supervisor_task is not None and not controller._supervisor_task.done()
+        for _ in range(100):
+            if len(attempts) >= 2:
+                break
+            await asyncio.sleep(0.01)
+        await controller.stop_supervisor()
+
+    asyncio.run(run())
+    assert len(attempts) >= 2
@@ -0,0 +1,39 @@
+import asyncio
+import gc
+
+from sqlalchemy import text
+
+from database import DatabaseManager, get_current_store_id, store_context
+
+
+def test_abandoned_session_is_not_tracked_after_gc(tmp_path):
+    manager = DatabaseManager(db_directory=str(tmp_path))
+    db = manager.get_db_direct(1)
+    db.execute(text("SELECT 1"))
+    assert len(manager.find_leaked_sessions(threshold=0)) == 1
+
+    # close() 없이 버려진 세션
+    del db
+    gc.collect()
+    assert manager.find_leaked_sessions(threshold=0) == []
+    asyncio.run(manager.dispose_all_engines())
+
+
+def test_maintenance_task_does_not_inherit_store_and_engines_are_disposed(tmp_path):
+    manager = DatabaseManager(db_directory=str(tmp_path))
+    seen = []
+
+    async def maintenance_loop(interval=None):
+        seen.append(get_current_store_id())
+
+    manager._maintenance_loop = maintenance_loop
+
+    async def run():
+        with store_context(7):
+            manager.get_async_db_direct(7)
+        await asyncio.sleep(0)
+        await manager.dispose_all_engines()
+
+    asyncio.run(run())
+    assert seen and seen[0] != 7
+    assert manager.engines == {} and manager.async_engines == {}
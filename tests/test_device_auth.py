@@ -0,0 +1,35 @@
+import asyncio
+
+from Controllers.device_controller import _wait_for_auth
+
+
+class _FakeWebSocket:
+    def __init__(self, messages):
+        self.messages = list(messages)
+
+    async def receive(self):
+        if self.messages:
+            return self.messages.pop(0)
+        await asyncio.sleep(3600)
+
+
+def test_binary_frame_before_auth_is_ignored():
+    async def run():
+        websocket = _FakeWebSocket([
+            {"type": "websocket.receive", "bytes": b"\x00\x01"},
+            {"type": "websocket.receive", "text": "ping"},
+        ])
+        waiter = asyncio.get_running_loop().create_future()
+        asyncio.get_running_loop().call_later(0.05, waiter.set_result, "approved")
+        return await _wait_for_auth(websocket, waiter, timeout=5)
+
+    assert asyncio.run(run()) == "approved"
+
+
+def test_socket_close_while_waiting_is_reported():
+    async def run():
+        websocket = _FakeWebSocket([{"type": "websocket.disconnect", "code": 1000}])
+        waiter = asyncio.get_running_loop().create_future()
+        return await _wait_for_auth(websocket, waiter, timeout=5)
+
+    assert asyncio.run(run()) == "disconnected"
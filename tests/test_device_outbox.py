@@ -0,0 +1,50 @@
+from Controllers import device_socket_manager
+from Controllers.device_socket_manager import GAME_PATCH_KEY, DeviceSocketConnection
+
+
+def _connection():
+    return DeviceSocketConnection(device_uid="d1", websocket=None)
+
+
+def _queued(connection):
+    return [text for _, text in connection.outbox]
+
+
+def test_coalesced_state_moves_to_tail():
+    connection = _connection()
+    connection.enqueue("table-1", "table")
+    connection.enqueue("chat-1")
+    connection.enqueue("table-2", "table")
+
+    assert _queued(connection) == ["chat-1", "table-2"]
+    assert connection.coalesced_count == 1
+
+
+def test_snapshot_purges_queued_patches_for_game():
+    connection = _connection()
+    connection.enqueue("snapshot-5", "game")
+    connection.enqueue("patch-6", GAME_PATCH_KEY)
+    connection.enqueue("clock", "clock")
+    connection.enqueue("patch-7", GAME_PATCH_KEY)
+    connection.enqueue("disconnect", "game")
+
+    assert _queued(connection) == ["clock", "disconnect"]
+
+
+def test_overflow_never_evicts_state_and_resyncs_instead_of_dropping_patches(monkeypatch):
+    monkeypatch.setattr(device_socket_manager, "OUTBOUND_QUEUE_SIZE", 4)
+    connection = _connection()
+    connection.enqueue("snapshot", "game")
+    connection.enqueue("table", "table")
+    connection.enqueue("plain")
+    connection.enqueue("patch-1", GAME_PATCH_KEY)
+    # 일반 메시지부터 버림
+    connection.enqueue("patch-2", GAME_PATCH_KEY)
+    assert _queued(connection) == ["snapshot", "table", "patch-1", "patch-2"]
+    assert not connection.resync_pending
+
+    # 버릴 일반 메시지가 없으면 패치를 버리고 스냅샷 재전송 예약
+    connection.enqueue("patch-3", GAME_PATCH_KEY)
+    assert _queued(connection) == ["snapshot", "table", "patch-3"]
+    assert connection.resync_pending
+    assert connection.dropped_count == 3
@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+from Controllers.device_socket_manager import DeviceSocketManager, PATCH_PROTOCOL
+from Controllers.game_patch import apply_game_patch, diff_game_json
+
+
+def _player(customer_id, is_sit=True, join_count=1):
+    return {"customer_id": customer_id, "is_sit": is_sit, "join_count": join_count, "is_addon": False}
+
+
+def _game(**fields):
+    game = {"id": 1, "title": "Main", "game_status": "waiting", "game_in_player": [_player(1), _player(2)]}
+    game.update(fields)
+    return game
+
+
+def test_round_trip_rebuilds_new_state():
+    old = _game()
+    cases = [
+        _game(game_status="in-progress", title="Main Event"),
+        _game(game_in_player=[_player(1, is_sit=False), _player(2), _player(3)]),
+        _game(game_in_player=[_player(2, join_count=2)]),
+        _game(game_in_player=[]),
+        _game(game_in_player=[{"customer_id": 1}, {"customer_id": 1}]),  # 중복 참가자는 목록 전체 교체
+        _game(prize=100),
+    ]
+    for new in cases:
+        ops = diff_game_json(old, new)
+        assert ops
+        assert apply_game_patch(old, ops) == new
+
+
+def test_identical_state_has_no_ops():
+    assert diff_game_json(_game(), _game()) == []
+
+
+class _FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text)["data"])
+
+    async def close(self):
+        pass
+
+
+def test_patch_is_sent_only_to_opted_in_devices():
+    async def run():
+        manager = DeviceSocketManager()
+        legacy, patched = _FakeWebSocket(), _FakeWebSocket()
+        await manager.connect("legacy", legacy)
+        await manager.connect("patched", patched, PATCH_PROTOCOL)
+        for device_uid in ("legacy", "patched"):
+            manager._bind_device_table(device_uid, 10)
+        manager.set_table_game(10, 1)
+
+        manager._publish_game_state(_game())
+        manager._publish_game_state(_game(game_status="in-progress"))
+        await asyncio.sleep(0)
+        for device_uid in ("legacy", "patched"):
+            await manager.disconnect(device_uid)
+        return legacy.sent, patched.sent
+
+    legacy_sent, patched_sent = asyncio.run(run())
+    assert [message["event"] for message in legacy_sent] == ["game_connect"]
+    assert legacy_sent[0]["game_data"]["game_status"] == "in-progress"
+    assert patched_sent == [{"event": "game_patch", "game_id": 1, "seq": 2,
+                             "ops": [{"op": "set", "key": "game_status", "value": "in-progress"}]}]
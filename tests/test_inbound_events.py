@@ -0,0 +1,105 @@
+
+import asyncio
+import threading
+
+import models
+from central_socket import ReverbTestController
+from database import db_manager, store_context
+
+PURCHASE_EVENT = 'App\\Events\\ToAdminPanel\\PurchaseEvent'
+REGISTER_EVENT = 'App\\Events\\ToAdminPanel\\RegisterEvent'
+USE_POINT_EVENT = 'App\\Events\\ToAdminPanel\\UsePointEvent'
+
+
+def _purchase(uuid, status="ok"):
+    return {"purchaseLog": {
+        "payment_type": "card", "purchase_type": "BUYIN", "game_id": 1, "customer_id": 5, "uuid": uuid,
+        "purchased_at": "2024-01-01 10:00:00", "item": "x", "payment_status": "done", "status": status,
+        "price": 10, "used_points": 0,
+    }}
+
+
+def _customer(name):
+    return {"customer": {
+        "id": 5, "name": name, "phone_number": "1", "email": None, "uuid": "c5", "game_join_count": 0,
+        "visit_count": 0, "register_at": "2024-01-01 10:00:00", "last_visit_at": "2024-01-01 10:00:00", "remark": "",
+    }}
+
+
+def _apply(controller, store_id, events):
+    # _inbound_loop와 같은 순서: 세션 생성 -> 작업 스레드에서 반영 -> 결과 기록
+    result = controller._apply_inbound_events(db_manager.get_db_direct(store_id), store_id, events)
+    controller._record_inbound_result(store_id, result)
+    return result["effects"]
+
+
+def test_identical_redelivery_is_skipped(store):
+    controller = ReverbTestController()
+    point = {"point": {"customer_id": 5, "uuid": "u1", "reason": "r", "amount": 3}}
+    events = [(PURCHASE_EVENT, _purchase("p1")), (REGISTER_EVENT, _customer("a")), (USE_POINT_EVENT, point)]
+    _apply(controller, store, events)
+    # 재연결 후 같은 이벤트가 다시 전달됨 (메모리 캐시가 비어 있어도 DB 기록으로 판별)
+    controller._processed_keys.clear()
+    _apply(controller, store, list(events))
+
+    assert controller.inbound_duplicate_count == 3
+    db = db_manager.get_db_direct(store)
+    try:
+        assert db.query(models.PurchaseData).filter(models.PurchaseData.uuid == "p1").count() == 1
+        assert db.query(models.UserData).count() == 1
+        assert db.query(models.PointHistoryData).count() == 1
+    finally:
+        db.close()
+
+
+def test_same_entity_with_changed_payload_is_applied(store):
+    controller = ReverbTestController()
+    _apply(controller, store, [(PURCHASE_EVENT, _purchase("p2")), (REGISTER_EVENT, _customer("before"))])
+    _apply(controller, store, [(PURCHASE_EVENT, _purchase("p2", status="refunded")), (REGISTER_EVENT, _customer("after"))])
+
+    assert controller.inbound_duplicate_count == 0
+    db = db_manager.get_db_direct(store)
+    try:
+        purchases = db.query(models.PurchaseData).filter(models.PurchaseData.uuid == "p2").all()
+        assert [purchase.status for purchase in purchases] == ["refunded"]
+        assert db.get(models.UserData, 5).name == "after"
+    finally:
+        db.close()
+
+
+def test_event_without_identity_is_not_deduped(store):
+    controller = ReverbTestController()
+    point = {"point": {"customer_id": 5, "reason": "r", "amount": 3}}
+    _apply(controller, store, [(REGISTER_EVENT, _customer("a")), (USE_POINT_EVENT, point)])
+    # 포인트 내역 식별자가 없으면 내용이 같아도 별개의 사용 내역으로 반영
+    _apply(controller, store, [(USE_POINT_EVENT, dict(point))])
+
+    assert controller.inbound_duplicate_count == 0
+    db = db_manager.get_db_direct(store)
+    try:
+        assert db.query(models.PointHistoryData).count() == 2
+    finally:
+        db.close()
+
+
+def test_inbound_loop_prepares_store_on_event_loop(store, monkeypatch):
+    controller = ReverbTestController()
+    prepare_threads = []
+    prepare_store = db_manager._prepare_store
+
+    def record_thread(store_id):
+        prepare_threads.append(threading.current_thread())
+        return prepare_store(store_id)
+
+    monkeypatch.setattr(db_manager, "_prepare_store", record_thread)
+
+    async def run():
+        with store_context(store):
+            await controller.enqueue_inbound(PURCHASE_EVENT, _purchase("p3"))
+            await controller.enqueue_inbound(REGISTER_EVENT, _customer("loop"))
+        await controller._inbound.join()
+        controller._inbound_task.cancel()
+
+    asyncio.run(run())
+    assert controller.inbound_applied_count == 2
+    assert prepare_threads and all(thread is threading.main_thread() for thread in prepare_threads)
@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+import central_socket
+from central_socket import MessageQueueManager, ReverbTestController
+
+
+def _message(i):
+    return {"event": "E", "channel": "ch", "data": {"tenant_id": "t", "dataType": "SavePoint", "data": i}}
+
+
+def test_stale_ack_after_compaction_keeps_new_messages(tmp_path):
+    queue = MessageQueueManager(str(tmp_path))
+    for i in range(400):
+        queue.save_message("t", _message(i))
+    generation, pending = queue.read_pending_batch("t")
+    queue.ack("t", pending[199][0], generation)
+
+    # 재전송 도중 압축되고 새 메시지가 추가됨
+    assert queue.compact("t")
+    queue.save_message("t", _message(999))
+
+    # 압축 전 파일 기준 오프셋은 무시되어야 함
+    assert queue.ack("t", pending[-1][0], generation) is False
+    remaining = [data["message"]["data"]["data"] for _, data in queue.read_pending("t")]
+    assert remaining[-1] == 999
+    assert remaining == list(range(200, 400)) + [999]
+
+
+class _FakeWebSocket:
+    def __init__(self, controller, append_at):
+        self.controller = controller
+        self.append_at = append_at
+        self.sent = []
+
+    async def send(self, text):
+        self.sent.append(json.loads(text)["data"]["data"])
+        if len(self.sent) == self.append_at:
+            # 재전송 중 새 알림이 들어오고 압축이 끼어듦
+            self.controller.enqueue_message("E", "ch", "SavePoint", 999)
+            await asyncio.sleep(0)
+            self.controller.queue_manager.compact(self.controller.tenant_id)
+
+    async def close(self):
+        pass
+
+
+def test_messages_appended_during_replay_are_delivered(tmp_path, monkeypatch):
+    monkeypatch.setattr(central_socket, "JOURNAL_ACK_BATCH", 50)
+
+    async def run():
+        controller = ReverbTestController()
+        controller.queue_manager = MessageQueueManager(str(tmp_path))
+        controller.tenant_id = "t"
+        for i in range(400):
+            controller.queue_manager.save_message("t", _message(i))
+        controller.websocket = _FakeWebSocket(controller, append_at=120)
+        controller.is_connected = controller.is_subscribed = True
+
+        assert await controller.process_queued_messages()
+        await controller.drain_outbound()
+        return controller
+
+    controller = asyncio.run(run())
+    sent = controller.websocket.sent
+    assert 999 in sent
+    assert set(range(400)) <= set(sent)
+    assert controller.queue_manager.read_pending("t") == []
@@ -0,0 +1,46 @@
+from sqlalchemy import create_engine
+
+import models  # noqa: F401 - 테이블 메타데이터 등록
+from database import Base
+from migrations import HOT_QUERY_PLANS, MIGRATIONS, run_migrations, verify_query_plans
+
+
+def test_purchase_uuid_duplicates_are_removed_before_unique_index(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'store.db'}")
+    try:
+        with engine.begin() as connection:
+            # 고유 인덱스가 없던 기존 스키마 (마이그레이션 2까지 적용된 DB)
+            connection.exec_driver_sql("CREATE TABLE purchase_data (id INTEGER PRIMARY KEY, uuid VARCHAR, status VARCHAR)")
+            connection.exec_driver_sql("CREATE INDEX ix_purchase_data_uuid ON purchase_data (uuid)")
+            connection.exec_driver_sql("CREATE TABLE processed_event_data (event_key VARCHAR PRIMARY KEY, processed_at DATETIME)")
+            connection.exec_driver_sql(
+                "INSERT INTO purchase_data (id, uuid, status) VALUES "
+                "(1, 'a', 'first'), (2, 'a', 'second'), (3, 'b', 'only'), (4, NULL, 'x'), (5, NULL, 'y')"
+            )
+            connection.exec_driver_sql("PRAGMA user_version = 2")
+
+        assert run_migrations(engine) == [3]
+
+        with engine.connect() as connection:
+            rows = connection.exec_driver_sql("SELECT id, uuid, status FROM purchase_data ORDER BY id").all()
+            assert [tuple(row) for row in rows] == [(1, "a", "first"), (3, "b", "only"), (4, None, "x"), (5, None, "y")]
+            indexes = {row[1]: row[2] for row in connection.exec_driver_sql("PRAGMA index_list(purchase_data)")}
+            assert indexes["ix_purchase_data_uuid"] == 1
+            columns = [row[1] for row in connection.exec_driver_sql("PRAGMA table_info(processed_event_data)")]
+            assert "payload_hash" in columns
+    finally:
+        engine.dispose()
+
+
+def test_hot_queries_use_their_indexes_on_fresh_store_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'store.db'}")
+    try:
+        Base.metadata.create_all(bind=engine)
+        assert run_migrations(engine) == [version for version, _, _ in sorted(MIGRATIONS)]
+        with engine.connect() as connection:
+            assert verify_query_plans(connection) == []
+            for description, sql, params, index_name in HOT_QUERY_PLANS:
+                plan = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params)]
+                assert not any(detail.startswith("SCAN") for detail in plan), (description, plan)
+    finally:
+        engine.dispose()
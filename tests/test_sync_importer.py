@@ -0,0 +1,70 @@
+import asyncio
+import json
+from datetime import datetime
+
+import models
+from database import db_manager
+from sync_importer import StoreSyncImporter
+
+async def _chunks(payload):
+    yield json.dumps(payload).encode("utf-8")
+
+
+def _purchase(id, uuid, status):
+    return {"id": id, "uuid": uuid, "payment_type": "LOCAL_PAY", "purchase_type": "Game", "customer_id": 1,
+            "purchased_at": "2024-01-01 10:00:00", "item": "BUYIN", "payment_status": status, "status": status,
+            "price": 10, "used_points": 0}
+
+
+def test_delta_upsert_does_not_overwrite_conflicting_local_rows(store):
+    # 비동기 엔진은 만든 이벤트 루프에 묶이므로 같은 루프에서 사용하고 정리
+    async def run():
+        try:
+            await _run_delta_upsert(store)
+        finally:
+            await db_manager.evict_store_engine(store)
+
+    asyncio.run(run())
+
+
+async def _run_delta_upsert(store_id):
+    db = db_manager.get_db_direct(store_id)
+    try:
+        # 오프라인 중 로컬에서 만든 구매 (중앙 서버에는 아직 없음)
+        db.add(models.PurchaseData(id=1, uuid="local-only", status="WAITING", payment_status="WAITING", price=10))
+        # 로컬에서 결제 완료 처리했지만 아직 전송 대기 중인 구매
+        db.add(models.PurchaseData(id=2, uuid="pending", status="COMPLETED", payment_status="COMPLETED", price=10))
+        # 중앙 서버와 같은 uuid지만 로컬 id가 다른 구매
+        db.add(models.PurchaseData(id=3, uuid="shared", status="WAITING", payment_status="WAITING", price=10))
+        db.add(models.PointHistoryData(id=1, uuid="local-point", amount=5, created_at=datetime.now()))
+        db.commit()
+    finally:
+        db.close()
+
+    payload = {
+        "purchases": [
+            _purchase(1, "central-1", "COMPLETED"),  # 로컬 id 1과 충돌
+            _purchase(2, "pending", "WAITING"),
+            _purchase(70, "shared", "COMPLETED"),
+        ],
+        "points": [{"id": 1, "uuid": "central-point", "amount": 7}],
+    }
+    importer = StoreSyncImporter(db_manager.async_engines[store_id], upsert=True,
+                                 protected={"purchases": {"pending"}})
+    await importer.import_stream(_chunks(payload))
+
+    db = db_manager.get_db_direct(store_id)
+    try:
+        purchases = {purchase.uuid: purchase for purchase in db.query(models.PurchaseData).all()}
+        assert purchases["local-only"].id == 1 and purchases["local-only"].status == "WAITING"
+        assert purchases["central-1"].id not in (1, 2, 3)
+        assert purchases["pending"].status == "COMPLETED"
+        assert purchases["shared"].id == 3 and purchases["shared"].status == "COMPLETED"
+        assert len(purchases) == 4
+
+        points = {point.uuid: point for point in db.query(models.PointHistoryData).all()}
+        assert points["local-point"].amount == 5
+        assert points["central-point"].amount == 7
+    finally:
+        db.close()
+    assert importer.skipped == {"purchases": 1}